@@ -0,0 +1,80 @@
+"""
+Benchmark do createLink: uma URL por chamada (comportamento antigo) x AffiliateLinkClient em lote,
+contra o stub local. Também confere se cada link voltou para a URL certa.
+
+    python -m benchmarks.bench_affiliate --urls 300 --latency 0.05 --item-error-rate 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from benchmarks.stubs import StubServer, create_link_app
+from src.affiliate_link_generator import AffiliateLinkClient
+
+TAG = "bench-tag"
+
+
+async def run_legacy(api_url: str, urls: list, delay: float) -> int:
+    # Como o código antigo: uma chamada ao createLink por URL, em sequência, com pausa entre elas.
+    ok = 0
+    headers = {"Authorization": "Bearer token", "Content-Type": "application/json", "Accept": "application/json"}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        for url in urls:
+            async with session.post(api_url, headers=headers, json={"urls": [url], "tag": TAG}) as response:
+                body = await response.json(content_type=None) if response.status == 200 else {}
+            if body.get("urls") and body["urls"][0].get("short_url"):
+                ok += 1
+            await asyncio.sleep(delay)
+    return ok
+
+
+async def run_batched(api_url: str, urls: list, args) -> tuple[list, list, dict]:
+    async with AffiliateLinkClient("token", TAG, api_url=api_url, batch_size=args.batch_size,
+                                   concurrency=args.concurrency, requests_per_second=args.rps,
+                                   retry_base_delay=0.05) as client:
+        shorts, longs = await client.generate(urls)
+        return shorts, longs, dict(client.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--urls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--item-error-rate", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=10)
+    parser.add_argument("--legacy-urls", type=int, default=30, help="URLs no modo antigo (é lento)")
+    parser.add_argument("--legacy-delay", type=float, default=0.6)
+    args = parser.parse_args()
+
+    urls = [f"https://www.mercadolivre.com.br/produto-{n}/p/MLB{n}?pdp_filters=deal" for n in range(args.urls)]
+    app = create_link_app(latency=args.latency, item_error_rate=args.item_error_rate,
+                          throttle_rate=args.throttle_rate)
+    with StubServer(app) as server:
+        api_url = server.url("/affiliate-program/api/v2/affiliates/createLink")
+
+        legacy_urls = urls[:args.legacy_urls]
+        start = time.perf_counter()
+        ok = asyncio.run(run_legacy(api_url, legacy_urls, args.legacy_delay))
+        elapsed = time.perf_counter() - start
+        print(f"antigo   links={ok}/{len(legacy_urls)} tempo={elapsed:.2f}s links/s={ok / elapsed:.1f}")
+
+        start = time.perf_counter()
+        shorts, longs, stats = asyncio.run(run_batched(api_url, urls, args))
+        elapsed = time.perf_counter() - start
+        ok = sum(short is not None for short in shorts)
+        print(f"em lote  links={ok}/{len(urls)} tempo={elapsed:.2f}s links/s={ok / elapsed:.1f} stats={stats}")
+        print(f"stub: {app['stats']}")
+
+    mismatched = [url for url, long_url in zip(urls, longs) if long_url and not long_url.startswith(url)]
+    if mismatched:
+        raise SystemExit(f"{len(mismatched)} links associados à URL errada, ex.: {mismatched[0]}")
+    print("mapeamento URL -> link: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark do crawler: laço serial com requests (comportamento antigo) x AsyncCrawler.
+
+    python -m benchmarks.bench_crawler --pages 20 --latency 0.3 --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+
+import requests
+
+from benchmarks.stubs import StubServer, offer_pages_app
+from src.mercadolivre_scraper import SCRAPING_HEADERS, AsyncCrawler, offer_page_urls
+
+
+def run_serial(urls: list[str]) -> int:
+    ok = 0
+    for url in urls:
+        try:
+            response = requests.get(url, headers=SCRAPING_HEADERS, timeout=60)
+            response.raise_for_status()
+            ok += 1
+        except requests.exceptions.RequestException as e:
+            print(f"serial: erro em {url}: {e}")
+    return ok
+
+
+async def run_async(urls: list[str], concurrency: int, host_rps: float) -> tuple[int, dict]:
+    async with AsyncCrawler(concurrency=concurrency, host_max_in_flight=concurrency,
+                            host_rps=host_rps, retry_base_delay=0.05) as crawler:
+        pages = await crawler.fetch_all(urls)
+        return sum(page is not None for page in pages), dict(crawler.stats)
+
+
+def report(label: str, ok: int, elapsed: float):
+    print(f"{label:<10} páginas={ok:<4} tempo={elapsed:7.2f}s  páginas/s={ok / elapsed:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--host-rps", type=float, default=0, help="0 = sem limite de taxa por host")
+    args = parser.parse_args()
+
+    with StubServer(offer_pages_app(latency=args.latency, error_rate=args.error_rate)) as server:
+        urls = offer_page_urls(args.pages, template=server.url("/ofertas?page={page}"))
+
+        start = time.perf_counter()
+        ok = run_serial(urls)
+        report("serial", ok, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ok, stats = asyncio.run(run_async(urls, args.concurrency, args.host_rps))
+        report("async", ok, time.perf_counter() - start)
+        print(f"async stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark do NotificationDispatcher contra stubs locais do Bot API do Telegram e da API do Zatten.
+
+Mede a vazão de cada canal e o isolamento de falhas: com o WhatsApp lento, instável ou
+fora do ar e as chamadas limitadas a --notify-concurrency como no pipeline, as ofertas
+têm que sair do dispatch no mesmo tempo que com o Telegram sozinho, e o WhatsApp tem
+que entregar tudo o que os retries permitem.
+
+    python -m benchmarks.bench_dispatcher --offers 30 --chats 2 --numbers 2
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+from benchmarks.stubs import StubServer, telegram_app, zatten_app
+from src.database_manager import DeliveryLog
+from src.notification_dispatcher import NotificationDispatcher, TelegramChannel, ZattenChannel
+from src.telegram_notifier import TelegramNotifier
+from src.zatten_notifier import ZattenNotifier
+
+# Zatten -> (latência, taxa de 502, taxa de 429)
+SCENARIOS = {
+    "telegram sozinho": None,
+    "ambos saudáveis": (0.05, 0.0, 0.0),
+    "zatten lento e instável": (0.5, 0.3, 0.1),
+    "zatten fora do ar": (0.05, 1.0, 0.0),
+}
+
+
+def _rows(offers: int) -> list:
+    return [{"item_id": f"MLB{n}", "Nome": f"Oferta {n}", "Imagem": f"https://img.example/{n}.jpg"}
+            for n in range(offers)]
+
+
+def _format(row: dict) -> str:
+    return f"*{row['Nome']}*"
+
+
+async def run(telegram_url: str, zatten_url: str | None, args) -> tuple[float, list, dict]:
+    log = DeliveryLog(sqlite3.connect(":memory:"))
+    telegram = TelegramNotifier("123:bench", api_url=telegram_url, global_rate=0, chat_rate=0, max_retries=1)
+    channels = [TelegramChannel(telegram, [f"-100{n}" for n in range(args.chats)], _format,
+                                retry_base_delay=args.retry_base_delay)]
+    if zatten_url:
+        zatten = ZattenNotifier("bench-key", "bench-attendant", api_url=zatten_url)
+        channels.append(ZattenChannel(zatten, [f"55119{n:08d}" for n in range(args.numbers)], _format,
+                                      rate=args.zatten_rate, burst=args.zatten_rate,
+                                      max_attempts=args.max_attempts, retry_base_delay=args.retry_base_delay))
+    rows = _rows(args.offers)
+    start = time.perf_counter()
+    slots = asyncio.Semaphore(args.notify_concurrency)
+
+    async def notify(row: dict) -> list:
+        # Como o pipeline: uma chamada de dispatch por oferta, no máximo notify_concurrency em andamento.
+        async with slots:
+            return await dispatcher.dispatch([row])
+
+    async with NotificationDispatcher(channels, log) as dispatcher:
+        delivered = await asyncio.gather(*(notify(row) for row in rows))
+        # Tempo até o pipeline liberar a última oferta; os envios atrasados do WhatsApp terminam no close().
+        elapsed = time.perf_counter() - start
+    per_channel = {
+        channel: {"entregues": ok, "falhas": total - ok, "última_entrega_s": round(last, 2),
+                  "tentativas": attempts}
+        for channel, ok, total, last, attempts in log.conn.execute(
+            "SELECT channel, SUM(ok), COUNT(*), MAX(seconds), SUM(attempts) FROM deliveries GROUP BY channel")
+    }
+    return elapsed, [ok for (ok,) in delivered], per_channel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, default=30)
+    parser.add_argument("--chats", type=int, default=2)
+    parser.add_argument("--numbers", type=int, default=2)
+    parser.add_argument("--zatten-rate", type=float, default=20, help="limite do canal de WhatsApp (mensagens/s)")
+    parser.add_argument("--notify-concurrency", type=int, default=5, help="como NOTIFY_CONCURRENCY do pipeline")
+    parser.add_argument("--max-attempts", type=int, default=6)
+    parser.add_argument("--retry-base-delay", type=float, default=0.2)
+    parser.add_argument("--isolation-tolerance", type=float, default=0.5,
+                        help="atraso máximo do Telegram (s) em relação a rodar sozinho")
+    args = parser.parse_args()
+
+    telegram_alone = None
+    failures = []
+    for label, zatten in SCENARIOS.items():
+        tg = telegram_app(chat_limit=10 ** 6, global_limit=10 ** 6)
+        za = zatten_app(*zatten) if zatten else None
+        with StubServer(tg) as tg_server:
+            if za is None:
+                elapsed, delivered, channels = asyncio.run(run(tg_server.url(), None, args))
+            else:
+                with StubServer(za) as za_server:
+                    elapsed, delivered, channels = asyncio.run(run(tg_server.url(), za_server.url(), args))
+        print(f"\n== {label}: {elapsed:.2f}s, ofertas entregues em algum canal={sum(delivered)}/{len(delivered)} ==")
+        for channel, stats in channels.items():
+            rate = stats["entregues"] / stats["última_entrega_s"] if stats["última_entrega_s"] else 0
+            print(f"  {channel:<9} {stats}  ({rate:.1f} mensagens/s)")
+        if za is not None:
+            print(f"  stub zatten: {za['stats']}")
+
+        telegram = channels["telegram"]
+        if telegram["entregues"] != args.offers * args.chats:
+            failures.append(f"{label}: Telegram entregou {telegram['entregues']}/{args.offers * args.chats}")
+        if telegram_alone is None:
+            telegram_alone = elapsed
+        elif elapsed > telegram_alone + args.isolation_tolerance:
+            failures.append(f"{label}: pipeline liberado em {elapsed:.2f}s "
+                            f"(Telegram sozinho: {telegram_alone:.2f}s) — o WhatsApp atrasou o Telegram")
+        if za is not None and sum(channels["whatsapp"][k] for k in ("entregues", "falhas")) != args.offers * args.numbers:
+            failures.append(f"{label}: envios do WhatsApp sem registro no DeliveryLog")
+        if not all(delivered):
+            failures.append(f"{label}: ofertas sem entrega em nenhum canal")
+
+    if failures:
+        print("\nFALHAS:")
+        for failure in failures:
+            print(f"  {failure}")
+        raise SystemExit(1)
+    print("\nIsolamento OK: o Telegram não foi atrasado pelo WhatsApp em nenhum cenário.")
+
+
+if __name__ == "__main__":
+    main()
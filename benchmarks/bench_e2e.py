@@ -0,0 +1,281 @@
+"""
+Benchmark ponta a ponta, offline: roda o main.py de verdade (scraping -> links de afiliado
+-> envio) contra stubs locais das páginas de ofertas, do /oauth/token, do createLink e do
+Bot API do Telegram (e, com --zatten, da API de WhatsApp do Zatten).
+
+Cada execução é um subprocesso com banco, relatório de métricas e CSV de debug num
+diretório temporário. As execuções seguintes reaproveitam o mesmo banco: a 1ª mede o
+caso frio, as demais o caso com cache de links, token, histórico e páginas (o stub de
+/ofertas responde com ETag, e as execuções quentes recebem 304 das páginas iguais).
+
+Mede o tempo total, a vazão de cada estágio (a partir do run_report.json), o tempo até a
+1ª mensagem contra a barreira do ranking top-k e o pico de RSS, e compara com a baseline
+salva: uma regressão acima da tolerância falha a execução.
+
+    python -m benchmarks.bench_e2e --pages 20
+    python -m benchmarks.bench_e2e --pages 20 --page-error-rate 0.1 --link-throttle-rate 0.2
+    python -m benchmarks.bench_e2e --pages 20 --update-baseline
+    python -m benchmarks.bench_e2e --pages 20 --zatten --zatten-error-rate 0.2
+    python -m benchmarks.bench_e2e --recorded benchmarks/recorded   # páginas gravadas
+    python -m benchmarks.bench_e2e --record-to benchmarks/recorded --pages 5   # grava da rede
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stubs import StubServer, create_link_app, oauth_app, offer_pages_app, telegram_app, zatten_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "e2e.json")
+
+# Estágio -> (contador de itens, estágio do run_report com o tempo gasto).
+THROUGHPUT = {
+    "fetch": ("pages_fetched", "fetch"),
+    "parse": ("cards_parsed", "parse"),
+    "history": ("offers_filtered", "history"),
+    "link": ("offers_linked", "link"),
+    "rank": ("offers_linked", "rank"),
+    "notify": ("messages_sent", "notify"),
+}
+
+
+def _counter(report: dict, name: str) -> float:
+    return sum(entry["value"] for entry in report["counters"].get(name, []))
+
+
+def _throughput(report: dict) -> dict:
+    result = {}
+    for stage, (counter, timed_stage) in THROUGHPUT.items():
+        seconds = report["stages"].get(timed_stage, {}).get("seconds")
+        items = _counter(report, counter)
+        if seconds and items:
+            result[stage] = {"items": items, "seconds": seconds, "per_second": round(items / seconds, 2)}
+    return result
+
+
+def _run_main(env: dict, workdir: str) -> tuple[float, float, int, str]:
+    """
+    Roda o main.py num subprocesso. Retorna (segundos, pico de RSS em MB, código de saída, caminho do log).
+    """
+    log_path = os.path.join(workdir, f"main-{time.time_ns()}.log")
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")], cwd=workdir, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss vem em KB no Linux.
+    return elapsed, usage.ru_maxrss / 1024, process.returncode, log_path
+
+
+def _milestone(report: dict, name: str) -> float | None:
+    entries = report["histograms"].get(f"pipeline_{name}_seconds")
+    return round(entries[0]["sum"], 3) if entries else None
+
+
+def _scenario_key(args) -> str:
+    source = "recorded" if args.recorded else "synthetic"
+    key = (f"{source}-pages{args.pages}-lat{args.page_latency}/{args.link_latency}/{args.telegram_latency}"
+           f"-err{args.page_error_rate}/{args.oauth_error_rate}/{args.link_error_rate}/{args.link_throttle_rate}"
+           f"/{args.telegram_error_rate}")
+    if args.zatten:
+        key += f"-zatten{args.zatten_latency}/{args.zatten_error_rate}"
+    if args.env:
+        key += "-env" + ",".join(sorted(args.env))
+    return key
+
+
+def _compare(label: str, current: dict, baseline: dict, tolerance: float, min_stage_seconds: float) -> list:
+    regressions = []
+    if current["wall_seconds"] > baseline["wall_seconds"] * (1 + tolerance):
+        regressions.append(f"{label}: tempo total {current['wall_seconds']:.2f}s > baseline {baseline['wall_seconds']:.2f}s")
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"{label}: pico de RSS {current['peak_rss_mb']:.1f} MB > baseline {baseline['peak_rss_mb']:.1f} MB")
+    ttfm, base_ttfm = current.get("time_to_first_message"), baseline.get("time_to_first_message")
+    if ttfm is not None and base_ttfm is not None and ttfm > base_ttfm * (1 + tolerance):
+        regressions.append(f"{label}: tempo até a 1ª mensagem {ttfm:.2f}s > baseline {base_ttfm:.2f}s")
+    for stage, base in baseline["throughput"].items():
+        # Estágios muito curtos na baseline são ruído de medição, não regressão.
+        if base["seconds"] < min_stage_seconds:
+            continue
+        now = current["throughput"].get(stage)
+        if now is None or now["per_second"] < base["per_second"] * (1 - tolerance):
+            got = f"{now['per_second']:.1f}" if now else "n/a"
+            regressions.append(f"{label}: vazão de {stage} {got}/s < baseline {base['per_second']:.1f}/s")
+    return regressions
+
+
+def _print_run(label: str, result: dict, stubs: dict, report: dict):
+    print(f"\n== {label}: {result['wall_seconds']:.2f}s, pico de RSS {result['peak_rss_mb']:.1f} MB ==")
+    ranking, first = result.get("time_to_ranking"), result.get("time_to_first_message")
+    if ranking is not None and first is not None:
+        # O top-k é uma barreira: a 1ª mensagem não sai antes do fim do crawl e dos links.
+        print(f"  1ª mensagem em {first:.2f}s: top-k liberado em {ranking:.2f}s + {first - ranking:.2f}s de envio")
+    for stage, entry in result["throughput"].items():
+        print(f"  {stage:<8} {entry['items']:>7.0f} itens em {entry['seconds']:7.3f}s  {entry['per_second']:>10.1f}/s")
+    if "page_cache_pages" in report["counters"]:
+        pages = {entry["labels"]["status"]: entry["value"] for entry in report["counters"]["page_cache_pages"]}
+        print(f"  cache de páginas: {pages} bytes_economizados={_counter(report, 'page_cache_bytes_saved'):.0f} "
+              f"parse_economizado={_counter(report, 'page_cache_parse_seconds_saved'):.3f}s")
+    print("  stubs: " + " ".join(f"{name}={stats}" for name, stats in stubs.items()))
+
+
+async def _record(args):
+    from src.mercadolivre_scraper import AsyncCrawler, offer_page_urls
+    from src.offer_extractor import count_cards
+
+    os.makedirs(args.record_to, exist_ok=True)
+    recorded = 0
+    async with AsyncCrawler() as crawler:
+        for page, html in enumerate(await crawler.fetch_all(offer_page_urls(args.pages)), start=1):
+            if html is None:
+                print(f"página {page}: falhou")
+                continue
+            if not count_cards(html):
+                # Captcha ou página de bloqueio: não serve como fixture
+                print(f"página {page}: nenhum card de oferta, descartada")
+                continue
+            recorded += 1
+            path = os.path.join(args.record_to, f"page-{page:03d}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            print(f"página {page}: {len(html):,} bytes -> {path}")
+    if not recorded:
+        raise SystemExit("nenhuma página gravada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=2, help="execuções com o mesmo banco (1ª fria, demais quentes)")
+    parser.add_argument("--recorded", help="diretório com páginas .html gravadas (padrão: páginas sintéticas)")
+    parser.add_argument("--record-to", help="grava as páginas reais de /ofertas neste diretório e sai")
+    parser.add_argument("--page-latency", type=float, default=0.1)
+    parser.add_argument("--page-error-rate", type=float, default=0.0)
+    parser.add_argument("--oauth-latency", type=float, default=0.05)
+    parser.add_argument("--oauth-error-rate", type=float, default=0.0)
+    parser.add_argument("--link-latency", type=float, default=0.05)
+    parser.add_argument("--link-error-rate", type=float, default=0.0, help="URLs individuais sem link")
+    parser.add_argument("--link-throttle-rate", type=float, default=0.0, help="lotes inteiros com 429")
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--zatten", action="store_true", help="liga o canal de WhatsApp (stub do Zatten)")
+    parser.add_argument("--zatten-latency", type=float, default=0.05)
+    parser.add_argument("--zatten-error-rate", type=float, default=0.0)
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="variável extra para o main.py (ex.: --env TELEGRAM_ALBUM_MODE=1)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="regressão relativa tolerada (0.3 = 30%%)")
+    parser.add_argument("--min-stage-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.record_to:
+        asyncio.run(_record(args))
+        return
+
+    pages = offer_pages_app(latency=args.page_latency, error_rate=args.page_error_rate, recorded_dir=args.recorded,
+                            etag=True)
+    oauth = oauth_app(latency=args.oauth_latency, error_rate=args.oauth_error_rate)
+    links = create_link_app(latency=args.link_latency, item_error_rate=args.link_error_rate,
+                            throttle_rate=args.link_throttle_rate)
+    telegram = telegram_app(latency=args.telegram_latency, error_rate=args.telegram_error_rate)
+    zatten = zatten_app(latency=args.zatten_latency, error_rate=args.zatten_error_rate)
+    services = [("páginas", pages), ("oauth", oauth), ("createLink", links), ("telegram", telegram)]
+    if args.zatten:
+        services.append(("zatten", zatten))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, StubServer(pages) as pages_server, \
+            StubServer(oauth) as oauth_server, StubServer(links) as links_server, \
+            StubServer(telegram) as telegram_server, StubServer(zatten) as zatten_server:
+        env = {
+            **os.environ,
+            "PYTHONUNBUFFERED": "1",
+            "BOT_DB_PATH": os.path.join(workdir, "bot_data.sqlite3"),
+            "METRICS_REPORT_PATH": os.path.join(workdir, "run_report.json"),
+            "METRICS_PROMETHEUS_PATH": os.path.join(workdir, "run_report.prom"),
+            "OFFERS_URL_TEMPLATE": pages_server.url("/ofertas?page={page}"),
+            "SCRAPING_PAGES": str(args.pages),
+            "OAUTH_TOKEN_URL": oauth_server.url("/oauth/token"),
+            "AFFILIATE_API_URL": links_server.url("/affiliate-program/api/v2/affiliates/createLink"),
+            "TELEGRAM_API_URL": telegram_server.url(),
+            "ML_AFFILIATE_TAG": "bench",
+            "ML_CLIENT_ID": "bench-client",
+            "ML_CLIENT_SECRET": "bench-secret",
+            "ML_REFRESH_TOKEN": "TG-seed",
+            "TELEGRAM_BOT_TOKEN": "bench-token",
+            "TELEGRAM_CHAT_ID": "-1001",
+            "TOKEN_STORE_ALLOW_PLAINTEXT": "1",  # banco temporário do benchmark
+        }
+        for name in ("TOKEN_STORE_KEY", "PROFILE_STAGES", "ZATTEN_API_KEY", "ZATTEN_PHONE_NUMBER", "ZATTEN_ATTENDANT_ID"):
+            env.pop(name, None)
+        if args.zatten:
+            env.update({
+                "ZATTEN_API_URL": zatten_server.url(),
+                "ZATTEN_API_KEY": "bench-key",
+                "ZATTEN_PHONE_NUMBER": "5511900000001",
+                "ZATTEN_RATE": "20",
+                "DISPATCH_RETRY_BASE_DELAY": "0.2",
+            })
+        env.update(item.split("=", 1) for item in args.env)
+
+        for run in range(1, args.runs + 1):
+            label = "fria" if run == 1 else f"quente-{run - 1}"
+            before = {name: dict(app["stats"]) for name, app in services}
+            elapsed, rss_mb, returncode, log_path = _run_main(env, workdir)
+            if returncode != 0:
+                with open(log_path) as f:
+                    print(f.read()[-3000:])
+                raise SystemExit(f"main.py terminou com código {returncode} na execução {label}")
+            with open(env["METRICS_REPORT_PATH"]) as f:
+                report = json.load(f)
+            stubs = {name: {key: value - before[name].get(key, 0) for key, value in app["stats"].items()
+                            if isinstance(value, (int, float))}
+                     for name, app in services}
+            results[label] = {
+                "wall_seconds": round(elapsed, 3),
+                "peak_rss_mb": round(rss_mb, 1),
+                "throughput": _throughput(report),
+                "time_to_ranking": _milestone(report, "time_to_ranking"),
+                "time_to_first_message": _milestone(report, "time_to_first_message"),
+            }
+            _print_run(label, results[label], stubs, report)
+
+    key = _scenario_key(args)
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines[key] = results
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nBaseline de '{key}' salva em {args.baseline}")
+        return
+
+    if key not in baselines:
+        print(f"\nSem baseline para '{key}' (rode com --update-baseline para criar).")
+        return
+    regressions = []
+    for label, result in results.items():
+        if label in baselines[key]:
+            regressions += _compare(label, result, baselines[key][label], args.tolerance, args.min_stage_seconds)
+    if regressions:
+        print("\nREGRESSÕES:")
+        for regression in regressions:
+            print(f"  {regression}")
+        raise SystemExit(1)
+    print(f"\nSem regressões em relação à baseline '{key}' (tolerância {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
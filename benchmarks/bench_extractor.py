@@ -0,0 +1,96 @@
+"""
+Benchmark do src/offer_extractor.py contra o extrator original (benchmarks/legacy_extractor.py).
+
+Mede cards/s e pico de memória de cada backend (RSS do processo e heap Python via
+tracemalloc; a memória C do lxml/lexbor só aparece no RSS), cada um num subprocesso
+próprio para que os picos não se misturem. A paridade campo a campo com o extrator
+original fica em tests/test_offer_extractor.py.
+
+    python -m benchmarks.bench_extractor --pages 20 --rounds 3
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import render_offer_page
+from src.offer_extractor import available_backends, extract_offers
+
+LEGACY = 'legacy'
+
+
+def _pages(count: int) -> list[str]:
+    return [render_offer_page(page, seed=7) for page in range(1, count + 1)]
+
+
+def _legacy_rows(html: str) -> list[dict]:
+    from benchmarks.legacy_extractor import parse_products_page
+    return parse_products_page(html)
+
+
+def run_backend(backend: str, fixtures_path: str, rounds: int) -> dict:
+    with open(fixtures_path, encoding="utf-8") as f:
+        pages = json.load(f)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    extract = _legacy_rows if backend == LEGACY else (lambda html: extract_offers(html, backend))
+    cards = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            cards += len(extract(html))
+    elapsed = time.perf_counter() - start
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "backend": backend,
+        "cards": cards,
+        "seconds": elapsed,
+        "cards_per_sec": cards / elapsed,
+        "peak_rss_kb": peak_rss,
+        "rss_growth_kb": peak_rss - baseline_rss,
+        "python_heap_peak_kb": heap_peak // 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_backend(args.run, args.fixtures, args.rounds)))
+        return
+
+    pages = _pages(args.pages)
+
+    # As páginas vão para um arquivo: o subprocesso só as carrega, sem o pico de renderização.
+    fixtures = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8")
+    with fixtures:
+        json.dump(pages, fixtures)
+
+    print(f"\n{'backend':<12}{'cards':>8}{'tempo (s)':>12}{'cards/s':>12}{'pico RSS (MB)':>16}{'crescimento (MB)':>19}{'heap Python (MB)':>19}")
+    for backend in [LEGACY, *available_backends()]:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_extractor", "--run", backend,
+             "--fixtures", fixtures.name, "--rounds", str(args.rounds)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{backend:<12}{result['cards']:>8}{result['seconds']:>12.2f}{result['cards_per_sec']:>12.0f}"
+              f"{result['peak_rss_kb'] / 1024:>16.1f}{result['rss_growth_kb'] / 1024:>19.1f}"
+              f"{result['python_heap_peak_kb'] / 1024:>19.1f}")
+    os.unlink(fixtures.name)
+
+
+if __name__ == "__main__":
+    main()
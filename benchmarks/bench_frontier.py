@@ -0,0 +1,88 @@
+"""
+Benchmark da CrawlFrontier contra um stub com várias listagens: uma boa, uma categoria que
+para de ter 'MAIS VENDIDO' cedo, uma que repete os itens da primeira e uma curta que acaba.
+
+Compara o crawl ingênuo (todas as páginas de todas as listagens) com a fronteira (parada
+antecipada + deduplicação), com e sem orçamento global: requisições, itens únicos
+qualificados e itens por requisição.
+
+    python -m benchmarks.bench_frontier --pages 20 --budget 30
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.stubs import StubServer, listing_pages_app
+from src.crawl_frontier import CrawlFrontier, load_seeds
+from src.mercadolivre_scraper import AsyncCrawler
+from src.offer_extractor import extract_offers
+
+FLAG = 'MAIS VENDIDO'
+
+
+def _listings(pages: int) -> dict:
+    return {
+        "ofertas": {"pages": pages, "id_offset": 0},
+        "celulares": {"pages": pages, "id_offset": 10_000_000, "best_seller_pages": 3},
+        "relampago": {"pages": pages, "id_offset": 0},
+        "moda": {"pages": 4, "id_offset": 20_000_000},
+    }
+
+
+def _crawler() -> AsyncCrawler:
+    return AsyncCrawler(concurrency=8, host_max_in_flight=8, host_rps=0)
+
+
+async def naive(seeds: str, pages: int) -> tuple[int, set]:
+    urls = [listing.url_template.format(page=page) for listing in load_seeds(seeds, pages)
+            for page in range(1, listing.max_pages + 1)]
+    qualifying = set()
+    async with _crawler() as crawler:
+        async for _, html in crawler.iter_pages(urls):
+            if html is not None:
+                qualifying.update(offer.item_id for offer in extract_offers(html) if offer.flag == FLAG)
+    return len(urls), qualifying
+
+
+async def frontier_crawl(seeds: str, pages: int, budget: int) -> tuple[int, set, CrawlFrontier]:
+    frontier = CrawlFrontier(load_seeds(seeds, pages), budget=budget)
+    qualifying = set()
+    async with _crawler() as crawler:
+        async for url, html in frontier.iter_pages(crawler):
+            if html is not None:
+                fresh = frontier.observe(url, extract_offers(html))
+                qualifying.update(offer.item_id for offer in fresh if offer.flag == FLAG)
+    return frontier.requested, qualifying, frontier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20, help="max_pages de cada listagem")
+    parser.add_argument("--budget", type=int, default=30, help="orçamento global do 3º cenário")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    app = listing_pages_app(_listings(args.pages), latency=args.latency)
+    with StubServer(app) as server:
+        seeds = json.dumps([{"name": name, "url": server.url(f"/listagem/{name}?page={{page}}")}
+                            for name in _listings(args.pages)])
+        start = time.perf_counter()
+        requests, everything = asyncio.run(naive(seeds, args.pages))
+        elapsed = time.perf_counter() - start
+        print(f"{'ingênuo':<22} requisições={requests:>3} itens_qualificados={len(everything):>4} "
+              f"por_requisição={len(everything) / requests:5.1f} tempo={elapsed:.2f}s")
+
+        for label, budget in (("fronteira", 0), (f"fronteira (orçamento {args.budget})", args.budget)):
+            start = time.perf_counter()
+            requests, found, frontier = asyncio.run(frontier_crawl(seeds, args.pages, budget))
+            elapsed = time.perf_counter() - start
+            print(f"{label:<22} requisições={requests:>3} itens_qualificados={len(found):>4} "
+                  f"por_requisição={len(found) / requests:5.1f} tempo={elapsed:.2f}s "
+                  f"cobertura={len(found & everything) / len(everything):.0%}")
+            print(f"  {frontier.summary()}")
+        print(f"stub: {app['stats']}")
+
+
+if __name__ == "__main__":
+    main()
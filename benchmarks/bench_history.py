@@ -0,0 +1,62 @@
+"""
+Benchmark do OfferHistory: gravação e consulta em lote de N produtos (padrão 100 mil).
+
+    python -m benchmarks.bench_history --items 100000 --batch 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.database_manager import OfferHistory, open_database
+
+
+def _rows(count: int, rng: random.Random, price_shift: float = 0.0) -> list:
+    rows = []
+    for n in range(count):
+        price = 1000 + (n * 7919) % 500000
+        if price_shift and rng.random() < 0.2:
+            price = int(price * (1 - price_shift))
+        rows.append({'item_id': f"MLB{1000000000 + n}", 'Nome': f"Produto {n}", 'preco_por_centavos': price})
+    return rows
+
+
+def _timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s  {count / elapsed:12,.0f} itens/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = open_database(os.path.join(tmp, "history.sqlite3"))
+        history = OfferHistory(conn, resend_after_hours=24, min_price_drop_pct=5)
+        first_run = _rows(args.items, rng)
+        second_run = _rows(args.items, rng, price_shift=0.1)
+        batches = lambda rows: [rows[i:i + args.batch] for i in range(0, len(rows), args.batch)]
+        ids = [row['item_id'] for row in first_run]
+
+        _timed("1ª execução: select_new_or_changed", args.items,
+               lambda: [history.select_new_or_changed(batch) for batch in batches(first_run)])
+        _timed("mark_sent (todos)", args.items, lambda: history.mark_sent(ids))
+        _timed("lookup (todos, em lotes)", args.items,
+               lambda: [history.lookup([row['item_id'] for row in batch]) for batch in batches(first_run)])
+        selected = _timed("2ª execução: select_new_or_changed", args.items,
+                          lambda: sum(len(history.select_new_or_changed(batch)) for batch in batches(second_run)))
+        (points,) = conn.execute("SELECT COUNT(*) FROM price_points").fetchone()
+        print(f"selecionados na 2ª execução (queda >= 5%): {selected}; pontos de preço gravados: {points}")
+        print(f"stats: {history.summary()}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark do cache de páginas (GET condicional + parse incremental) contra o stub de /ofertas.
+
+Roda o mesmo crawl várias vezes com o mesmo banco, como execuções seguidas do bot:
+
+- fria: nada no cache, tudo é baixado e parseado;
+- sem mudanças: o servidor responde 304 a todas as páginas;
+- `--churn` dos cards mudou: as páginas voltam com 200 e só os cards alterados são parseados;
+- tracking_id por requisição: o HTML nunca se repete (sem 304), mas os fingerprints dos cards sim.
+
+Compara bytes baixados e tempo de parse com o crawl sem cache e confere que as ofertas
+reaproveitadas são iguais às de um parse completo da mesma página.
+
+    python -m benchmarks.bench_page_cache --pages 20 --churn 0.1
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+from benchmarks.stubs import StubServer, offer_pages_app
+from src.database_manager import PageCache
+from src.mercadolivre_scraper import AsyncCrawler
+from src.offer_extractor import extract_offers
+from src.page_cache import IncrementalPageParser
+
+
+def _crawler() -> AsyncCrawler:
+    return AsyncCrawler(concurrency=8, host_max_in_flight=8, host_rps=0, raw=True)
+
+
+def _urls(server: StubServer, pages: int) -> list:
+    return [server.url(f"/ofertas?page={page}") for page in range(1, pages + 1)]
+
+
+def _key(offer) -> tuple:
+    # O link muda com o tracking_id; o item_id não.
+    return offer.item_id, offer.nome, offer.preco_de, offer.preco_por, offer.flag, offer.parcelas
+
+
+async def full_crawl(urls: list) -> tuple[int, float, dict]:
+    """Sem cache: bytes baixados, tempo de parse e as ofertas de cada página."""
+    parse_seconds = 0.0
+    offers = {}
+    async with _crawler() as crawler:
+        async for url, html in crawler.iter_pages(urls):
+            start = time.perf_counter()
+            offers[url] = extract_offers(html)
+            parse_seconds += time.perf_counter() - start
+        return crawler.stats["bytes"], parse_seconds, offers
+
+
+async def cached_crawl(urls: list, parser: IncrementalPageParser) -> tuple[float, dict]:
+    parser.reset()
+    offers = {}
+    start = time.perf_counter()
+    async with _crawler() as crawler:
+        pages = await asyncio.gather(*(parser.fetch(crawler, url) for url in urls))
+    for url, page in zip(urls, pages):
+        offers[url] = (await parser.offers(url, page)).offers
+    parser.flush()
+    return time.perf_counter() - start, offers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.1, help="fração dos cards que muda entre execuções")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    failures = []
+    for label, tracking in (("ETag", False), ("tracking_id por requisição", True)):
+        print(f"\n== stub com {label} ==")
+        app = offer_pages_app(latency=args.latency, etag=True, churn=args.churn, tracking=tracking)
+        # emit="all": todas as ofertas voltam, para conferir as reaproveitadas com o parse completo
+        page_parser = IncrementalPageParser(PageCache(sqlite3.connect(":memory:")), emit="all")
+        with StubServer(app) as server:
+            urls = _urls(server, args.pages)
+            runs = [("fria", 0), ("sem mudanças", 0), (f"{args.churn:.0%} dos cards mudou", 1)]
+            for run, version in runs:
+                app["state"]["version"] = version
+                elapsed, offers = asyncio.run(cached_crawl(urls, page_parser))
+                stats = dict(page_parser.stats)
+                full_bytes, full_parse, expected = asyncio.run(full_crawl(urls))
+                print(f"{run:<22} tempo={elapsed:.2f}s baixados={stats['bytes_downloaded']:>9} "
+                      f"(sem cache {full_bytes}) parse={stats['parse_seconds']:.3f}s (sem cache {full_parse:.3f}s)")
+                print(f"  {page_parser.summary()}")
+                mismatched = [url for url in urls
+                              if [_key(offer) for offer in offers[url]] != [_key(offer) for offer in expected[url]]]
+                if mismatched:
+                    failures.append(f"{label} / {run}: ofertas diferentes do parse completo em {len(mismatched)} páginas")
+                if run == "sem mudanças" and not stats["not_modified"] + stats["unchanged"] == args.pages:
+                    failures.append(f"{label} / {run}: páginas reparseadas sem mudança")
+                if run != "fria" and stats["cards_parsed"] > args.churn * 2 * sum(map(len, expected.values())):
+                    failures.append(f"{label} / {run}: {stats['cards_parsed']} cards parseados")
+            print(f"stub: {app['stats']}")
+
+    if failures:
+        print("\nFALHAS:")
+        for failure in failures:
+            print(f"  {failure}")
+        raise SystemExit(1)
+    print("\nOfertas do cache iguais às do parse completo em todas as execuções.")
+
+
+if __name__ == "__main__":
+    main()
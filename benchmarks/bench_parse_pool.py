@@ -0,0 +1,55 @@
+"""
+Benchmark do parse em ProcessPoolExecutor: páginas/s com 1..N workers sobre páginas de fixture,
+comparado ao parse no próprio processo (0 workers).
+
+    python -m benchmarks.bench_parse_pool --pages 200 --max-workers 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.fixtures import render_offer_page
+from src.offer_extractor import available_backends, extract_offers, extract_offers_in_pool, start_parse_pool
+
+
+async def _parse_all(pool, pages: list, backend: str) -> list:
+    results = await asyncio.gather(*(extract_offers_in_pool(pool, html, backend) for html in pages))
+    return [offer for offers in results for offer in offers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--cards", type=int, default=48)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", default=None, help=f"backend de parse ({', '.join(available_backends())})")
+    args = parser.parse_args()
+    backend = args.backend or available_backends()[0]
+
+    # Bytes crus, como o AsyncCrawler(raw=True) entrega ao pool
+    pages = [render_offer_page(page, cards=args.cards).encode() for page in range(1, args.pages + 1)]
+    total_mb = sum(len(html) for html in pages) / 1e6
+    print(f"{args.pages} páginas ({total_mb:.1f} MB), backend={backend}, CPUs={os.cpu_count()}")
+
+    start = time.perf_counter()
+    expected = [offer for html in pages for offer in extract_offers(html, backend)]
+    baseline = args.pages / (time.perf_counter() - start)
+    print(f"{'no processo':<14} {baseline:10.1f} páginas/s")
+
+    for workers in range(1, args.max_workers + 1):
+        pool = start_parse_pool(workers, backend)
+        try:
+            start = time.perf_counter()
+            offers = asyncio.run(_parse_all(pool, pages, backend))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+        if offers != expected:
+            raise SystemExit(f"{workers} workers: ofertas diferentes do parse no próprio processo")
+        rate = args.pages / elapsed
+        print(f"{f'{workers} workers':<14} {rate:10.1f} páginas/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
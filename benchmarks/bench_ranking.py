@@ -0,0 +1,128 @@
+"""
+Benchmark do ETL + ranking: código original (DataFrame, apply por linha, sort_values de duas
+cópias, head(5)) x ETL em lote vetorizado com dtypes compactos x o que roda no pipeline
+(offer_to_row por oferta com o flag certo e o heap top-k de src/ranking.TopK), sobre as
+mesmas N ofertas sintéticas (padrão 1 milhão, o critério de aceitação).
+
+O pipeline recebe as ofertas página a página e só guarda o top-k, então o pico de alocação
+dele é o de uma linha por vez; o ETL vetorizado precisa de todas as ofertas de uma vez (e das
+colunas), por isso fica aqui como referência e não no caminho do bot.
+
+    python -m benchmarks.bench_ranking --rows 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.offer_extractor import Offer
+from src.pipeline import offer_to_row
+from src.ranking import FLAG_MAIS_VENDIDO, TopK
+
+FLAGS = ['MAIS VENDIDO', 'OFERTA DO DIA', 'OFERTA RELÂMPAGO', None]
+PARCELAS = ['em 10x R$ 12 , 90 sem juros', 'em 6x R$ 99,90', '']
+
+
+def synthetic_offers(rows: int, seed: int = 0) -> list[Offer]:
+    rng = random.Random(seed)
+    offers = []
+    for n in range(rows):
+        de_centavos = rng.randrange(1_000, 500_000)
+        offers.append(Offer(
+            f'https://http2.mlstatic.com/D_{n}-O.webp', f'Produto {n}', de_centavos,
+            int(de_centavos * rng.uniform(0.3, 1.0)), f'https://www.mercadolivre.com.br/p/MLB{n}',
+            rng.choices(FLAGS, weights=[0.4, 0.3, 0.2, 0.1])[0], rng.choice(PARCELAS),
+        ))
+    return offers
+
+
+def legacy_etl_and_rank(offers: list[Offer]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Cópia fiel do ETL de perform_scraping e do ranking de main() antes do pipeline em streaming.
+    df = pd.DataFrame([offer.to_row() for offer in offers])
+    df = df[df['flag'] == 'MAIS VENDIDO']
+    df['Preço De'] = pd.to_numeric(df['Preço De'], errors='coerce').fillna(0).apply(lambda x: int(np.round(x)))
+    df['Preço Por'] = pd.to_numeric(df['Preço Por'], errors='coerce').fillna(0).apply(lambda x: int(np.round(x)))
+    df['%_desconto'] = 0.0
+    df.loc[(df['Preço De'].notna()) & (df['Preço Por'].notna()) & (df['Preço De'] > 0), '%_desconto'] = \
+        ((df['Preço De'] - df['Preço Por']) / df['Preço De'] * 100)
+    df['%_desconto'] = df['%_desconto'].fillna(0).astype(int)
+    df['Parcelas'] = df['Parcelas'].str.replace(r'R\$\s*(\d+\.?\d*)\s*,\s*(\d+)', r'R$\g<1>,\g<2>', regex=True)
+    df_descontos = df.sort_values('%_desconto', ascending=False).copy()
+    df_preco_por = df.sort_values('Preço Por', ascending=True).copy()
+    return df_descontos.head(5), df_preco_por.head(5)
+
+
+def vectorized_etl_and_rank(offers: list[Offer]) -> tuple[list, list]:
+    # O mesmo ETL em lote, vetorizado e com dtypes compactos (preços em reais int32, desconto
+    # int16, flag como máscara) e top-k por argpartition; só as 5+5 vencedoras viram linha.
+    n = len(offers)
+    mais_vendido = np.fromiter((offer.flag == FLAG_MAIS_VENDIDO for offer in offers), dtype=bool, count=n)
+    idx = np.flatnonzero(mais_vendido)
+    de = np.rint(np.fromiter((offers[i].preco_de or 0 for i in idx), dtype=np.int64, count=len(idx)) / 100)
+    por = np.rint(np.fromiter((offers[i].preco_por or 0 for i in idx), dtype=np.int64, count=len(idx)) / 100)
+    de, por = de.astype(np.int32), por.astype(np.int32)
+    desconto = np.zeros(len(idx), dtype=np.int16)
+    positive = de > 0
+    desconto[positive] = ((de[positive] - por[positive]) / de[positive] * 100).astype(np.int16)
+    k = min(5, len(idx))
+    if not k:
+        return [], []
+    top_discount = np.argpartition(-desconto, k - 1)[:k]
+    top_price = np.argpartition(por, k - 1)[:k]
+    return ([offer_to_row(offers[idx[i]]) for i in top_discount],
+            [offer_to_row(offers[idx[i]]) for i in top_price])
+
+
+def streaming_etl_and_rank(offers: list[Offer]) -> tuple[list, list]:
+    # Os estágios de filtro e ranking do OfferPipeline, sem as filas.
+    by_discount, by_price = TopK(5), TopK(5, {'preco': 1})
+    for offer in offers:
+        if offer.flag == FLAG_MAIS_VENDIDO:
+            row = offer_to_row(offer)
+            by_discount.push(row)
+            by_price.push(row)
+    return by_discount.rows(), by_price.rows()
+
+
+def measure(label: str, fn, offers: list[Offer]):
+    # Tempo e pico em execuções separadas: o tracemalloc deixa o código Python puro várias vezes mais lento.
+    start = time.perf_counter()
+    result = fn(offers)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(offers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} tempo={elapsed:7.2f}s  pico de alocação={peak / 2 ** 20:8.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    offers = synthetic_offers(args.rows)
+    pd.options.mode.chained_assignment = None  # o código original gera SettingWithCopyWarning
+    old_discount, old_price = measure("original", legacy_etl_and_rank, offers)
+    results = {
+        "vetorizado": measure("vetorizado", vectorized_etl_and_rank, offers),
+        "pipeline": measure("pipeline", streaming_etl_and_rank, offers),
+    }
+
+    # Os valores do top-5 têm que bater (a ordem de empates pode diferir: o sort original não é estável).
+    diverged = False
+    for label, (new_discount, new_price) in results.items():
+        same = (sorted(old_discount['%_desconto']) == sorted(row['%_desconto'] for row in new_discount)
+                and sorted(old_price['Preço Por']) == sorted(row['Preço Por'] for row in new_price))
+        print(f"top-5 {label} equivalente ao original: {'OK' if same else 'DIVERGE'}")
+        diverged = diverged or not same
+    if diverged:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark do TelegramNotifier contra um Bot API falso local: mensagens/s com vários
+chats em paralelo, tratamento de 429 (retry_after) e modo álbum.
+
+A segunda parte mede o cache de file_id: as mesmas ofertas enviadas em duas "execuções",
+com e sem pré-download/compactação das imagens.
+
+    python -m benchmarks.bench_telegram --chats 4 --messages 40 --chat-limit 10 --chat-window 2
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+from benchmarks.stubs import StubServer, telegram_app
+from src.database_manager import TelegramFileCache
+from src.telegram_notifier import TelegramNotifier
+
+
+async def run(api_url: str, args, album: bool) -> tuple[int, dict]:
+    # O limitador do cliente fica propositalmente acima do limite do servidor
+    # (--client-chat-rate) para exercitar o caminho do 429/retry_after.
+    async with TelegramNotifier("123:bench", api_url=api_url, global_rate=args.global_rate,
+                                chat_rate=args.client_chat_rate, chat_burst=args.chat_limit,
+                                max_retries=10) as notifier:
+        async def send_chat(chat_id: str) -> int:
+            messages = [(f"https://img.example/{chat_id}/{n}.jpg", f"*Oferta {n}*") for n in range(args.messages)]
+            if album:
+                responses = await notifier.send_album(chat_id, messages)
+            else:
+                responses = await asyncio.gather(*(notifier.send_message(chat_id, caption, image_url=image)
+                                                   for image, caption in messages))
+            return sum(1 for response in responses if response.get("ok"))
+
+        ok = sum(await asyncio.gather(*(send_chat(f"-100{n}") for n in range(args.chats))))
+        return ok, dict(notifier.stats)
+
+
+async def run_file_cache(server: StubServer, offers: int, prefetch: bool) -> list:
+    cache = TelegramFileCache(sqlite3.connect(":memory:"))
+    images = [server.url(f"/img/{n}.jpg") for n in range(offers)]
+    runs = []
+    for _ in range(2):
+        async with TelegramNotifier("123:bench", api_url=server.url(), global_rate=0, chat_rate=0,
+                                    file_cache=cache, prefetch_images=prefetch) as notifier:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(notifier.send_message("-1001", f"*Oferta {n}*", image_url=image)
+                                               for n, image in enumerate(images)))
+            runs.append((time.perf_counter() - start, sum(r.get("ok", False) for r in responses), dict(notifier.stats)))
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=40, help="mensagens por chat")
+    parser.add_argument("--chat-limit", type=int, default=10, help="limite do servidor por chat na janela")
+    parser.add_argument("--chat-window", type=float, default=2.0)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--client-chat-rate", type=float, default=8)
+    parser.add_argument("--file-cache-offers", type=int, default=20)
+    parser.add_argument("--download-latency", type=float, default=0.3,
+                        help="tempo que o Telegram falso leva para baixar uma foto por URL")
+    args = parser.parse_args()
+
+    for album in (False, True):
+        app = telegram_app(chat_limit=args.chat_limit, chat_window=args.chat_window)
+        with StubServer(app) as server:
+            start = time.perf_counter()
+            ok, stats = asyncio.run(run(server.url(), args, album))
+            elapsed = time.perf_counter() - start
+        delivered = app["stats"]["messages"]
+        label = "álbum" if album else "individual"
+        print(f"{label:<11} respostas_ok={ok} mensagens_entregues={delivered} tempo={elapsed:.2f}s "
+              f"mensagens/s={delivered / elapsed:.1f} 429s={app['stats']['throttled']} cliente={stats}")
+        expected = args.chats * args.messages
+        if delivered != expected:
+            raise SystemExit(f"{label}: esperado {expected} mensagens entregues, servidor recebeu {delivered}")
+
+    print()
+    for prefetch in (False, True):
+        app = telegram_app(chat_limit=10 ** 6, global_limit=10 ** 6, download_latency=args.download_latency)
+        with StubServer(app) as server:
+            runs = asyncio.run(run_file_cache(server, args.file_cache_offers, prefetch))
+        label = "prefetch" if prefetch else "url"
+        for n, (elapsed, ok, stats) in enumerate(runs, start=1):
+            print(f"file_id/{label:<8} execução {n}: ok={ok} tempo={elapsed:.2f}s hits={stats['file_id_hits']} "
+                  f"misses={stats['file_id_misses']} bytes_evitados={stats['bytes_avoided']} "
+                  f"bytes_enviados={stats['bytes_uploaded']} bytes_economizados_na_compactação={stats['prefetch_bytes_saved']}")
+        print(f"file_id/{label:<8} servidor: {app['stats']['url_photos']} fotos por URL "
+              f"({app['stats']['downloaded_bytes']} bytes baixados), {app['stats']['file_id_photos']} por file_id, "
+              f"{app['stats']['uploads']} uploads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Páginas de ofertas sintéticas com a mesma marcação dos cards do Mercado Livre,
+usadas pelos stubs locais e pelos benchmarks.
+"""
+import random
+
+CARD_CLASS = 'andes-card poly-card poly-card--grid-card poly-card--large andes-card--flat andes-card--padding-0 andes-card--animated'
+FLAGS = ['MAIS VENDIDO', 'MAIS VENDIDO', 'OFERTA DO DIA', 'OFERTA RELÂMPAGO', None]
+
+
+def _money(reais: int, cents: int, css: str, tag: str = 'span') -> str:
+    fraction = f"{reais:,}".replace(',', '.')
+    cents_html = f'<span class="andes-money-amount__cents">{cents:02d}</span>' if cents else ''
+    return (
+        f'<{tag} class="{css}" aria-label="{reais} reais">'
+        f'<span class="andes-money-amount__currency-symbol">R$</span>'
+        f'<span class="andes-money-amount__fraction">{fraction}</span>{cents_html}</{tag}>'
+    )
+
+
+def render_card(item_id: int, rng: random.Random, flags: list = FLAGS) -> str:
+    preco_de = rng.randint(30, 5000)
+    preco_por = max(1, int(preco_de * rng.uniform(0.4, 0.95)))
+    cents_de, cents_por = rng.choice([0, 90, 99]), rng.choice([0, 49, 90])
+    flag = rng.choice(flags)
+    parcelas = rng.randint(2, 12)
+    lazy = rng.random() < 0.3
+    image = f'https://http2.mlstatic.com/D_Q_NP_{item_id}-O.webp'
+    img = (
+        f'<img class="poly-component__picture" src="data:image/gif;base64,R0lGOD" data-src="{image}">'
+        if lazy else f'<img class="poly-component__picture" src="{image}">'
+    )
+    flag_html = f'<span class="poly-component__highlight">{flag}</span>' if flag else ''
+    return (
+        f'<div class="{CARD_CLASS}"><div class="poly-card__portada">{img}</div>'
+        f'<div class="poly-card__content">{flag_html}'
+        f'<h3 class="poly-component__title-wrapper"><a class="poly-component__title" '
+        f'href="https://www.mercadolivre.com.br/produto-{item_id}/p/MLB{item_id}?pdp_filters=deal%3AMLB779362-1#polycard_client=offers">'
+        f'Produto de teste {item_id}</a></h3>'
+        f'<div class="poly-component__price">'
+        + _money(preco_de, cents_de, 'andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma', 's')
+        + '<div class="poly-price__current">'
+        + _money(preco_por, cents_por, 'andes-money-amount andes-money-amount--cents-superscript')
+        + '</div>'
+        f'<span class="poly-price__installments">em <span>{parcelas}x</span> '
+        + _money(preco_por // parcelas, 0, 'andes-money-amount andes-money-amount--cents-comma')
+        + ' sem juros</span></div></div></div>'
+    )
+
+
+def render_offer_page(page: int, cards: int = 48, seed: int = 0, first_id: int = None, flags: list = FLAGS,
+                      version: int = 0, churn: float = 0.0) -> str:
+    """
+    Renderiza uma página de ofertas determinística (mesma página + seed => mesmo HTML).
+    `first_id` é o ID do primeiro card (padrão: derivado da página); `flags`, os selos sorteados.
+    A cada `version`, uma fração `churn` dos cards muda de preço/selo (o resto fica igual).
+    """
+    rng = random.Random(seed * 100003 + page)
+    if first_id is None:
+        first_id = 1000000000 + page * 1000
+    rendered = []
+    for n in range(cards):
+        card = render_card(first_id + n, rng, flags)
+        changed = [v for v in range(1, version + 1) if random.Random(f"{seed}-{page}-{n}-{v}").random() < churn]
+        if changed:
+            card = render_card(first_id + n, random.Random(f"{seed}-{page}-{n}-{changed[-1]}"), flags)
+        rendered.append(card)
+    body = ''.join(rendered)
+    return (
+        '<!DOCTYPE html><html><head><title>Ofertas</title></head><body>'
+        f'<section class="items_container">{body}</section></body></html>'
+    )
@@ -0,0 +1,93 @@
+"""
+Extrator original (BeautifulSoup + html.parser), mantido como referência
+para a verificação de paridade e para o benchmark do src/offer_extractor.py.
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+
+def parse_products_page(html: str) -> list[dict]:
+    """
+    Extrai os cards de produto de uma página de ofertas.
+    """
+    dados = []
+    soup = BeautifulSoup(html, 'html.parser')
+    produtos = soup.find_all('div', class_='andes-card poly-card poly-card--grid-card poly-card--large andes-card--flat andes-card--padding-0 andes-card--animated')
+
+    for produto in produtos:
+        imagem_tag = produto.find('img', class_='poly-component__picture')
+        imagem = imagem_tag.get('src') if imagem_tag else None
+        if imagem and imagem.startswith('data:image'):
+            imagem = imagem_tag.get('data-src')
+
+        nome_tag = produto.find('h3', class_='poly-component__title-wrapper')
+        nome = nome_tag.text if nome_tag else None
+
+        preco_de = None
+        preco_de_tag = produto.find('s', class_='andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma')
+        if preco_de_tag:
+            fraction_span = preco_de_tag.find('span', class_='andes-money-amount__fraction')
+            cents_span = preco_de_tag.find('span', class_='andes-money-amount__cents')
+            reais_str_raw = fraction_span.get_text(strip=True) if fraction_span else ''
+            centavos_str_raw = cents_span.get_text(strip=True) if cents_span else '00'
+            reais_str = reais_str_raw.replace('.', '').replace(',', '')
+            centavos_str = centavos_str_raw 
+            try:
+                if reais_str or centavos_str != '00':
+                    preco_de = float(f"{reais_str}.{centavos_str}")
+                else:
+                    preco_de = None
+            except ValueError as e:
+                print(f"DEBUG - ValueError ao converter Preço De: '{reais_str}.{centavos_str}' - Erro: {e}")
+                preco_de = None
+
+        preco_por = None
+        preco_por_tag = produto.find('span', class_='andes-money-amount andes-money-amount--cents-superscript')
+        if preco_por_tag:
+            fraction_span = preco_por_tag.find('span', class_='andes-money-amount__fraction')
+            cents_span = preco_por_tag.find('span', class_='andes-money-amount__cents')
+            reais_str_raw = fraction_span.get_text(strip=True) if fraction_span else ''
+            centavos_str_raw = cents_span.get_text(strip=True) if cents_span else '00'
+            reais_str = reais_str_raw.replace('.', '').replace(',', '')
+            centavos_str = centavos_str_raw
+            try:
+                if reais_str or centavos_str != '00':
+                    preco_por = float(f"{reais_str}.{centavos_str}")
+                else:
+                    preco_por = None
+                
+            except ValueError as e:
+                print(f"DEBUG - ValueError ao converter Preço Por: '{reais_str}.{centavos_str}' - Erro: {e}")
+                preco_por = None
+
+        link_tag = produto.find('a', class_ = 'poly-component__title')
+        link = link_tag.get('href') if link_tag else None
+
+        span_tag = produto.find('span', class_= 'poly-component__highlight')
+        span_text = span_tag.get_text(strip=True) if span_tag else None
+
+        parcelas = ''
+        parcelas_tag = produto.find('span', class_='poly-price__installments')
+        if parcelas_tag:
+            full_parcelas_text = parcelas_tag.get_text(separator=' ', strip=True)
+            parcelas = re.sub(r'\\s+', ' ', full_parcelas_text).strip()
+            price_in_installment_tag = parcelas_tag.find('span', class_='andes-money-amount--cents-comma')
+            if price_in_installment_tag and price_in_installment_tag.get('aria-label'):
+                aria_label_installment = price_in_installment_tag.get('aria-label')
+                match_installment = re.search(r'(\\d[\\d\\.,]*)\\s*reales(?:\\s*con\\s*(\\d+)\\s*centavos)?', aria_label_installment)
+                if match_installment:
+                    reais_inst = match_installment.group(1).replace('.', '')
+                    centavos_inst = match_installment.group(2) if match_installment.group(2) else '00'
+                    pass 
+
+        dados.append({
+            'Imagem': imagem,
+            'Nome': nome,
+            'Preço De': preco_de,
+            'Preço Por': preco_por,
+            'Link': link,
+            'flag': span_text,
+            'Parcelas': parcelas
+            })
+    return dados
@@ -0,0 +1,403 @@
+"""
+Servidores HTTP locais que imitam os serviços externos do bot, para benchmarks offline.
+Cada stub roda num event loop próprio em uma thread, então funciona tanto com
+clientes síncronos (requests) quanto assíncronos (aiohttp).
+"""
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+
+from aiohttp import web
+
+from benchmarks.fixtures import FLAGS, render_offer_page
+
+
+class StubServer:
+    """
+    Sobe uma `web.Application` em 127.0.0.1 numa porta livre, em thread separada.
+
+    Uso:
+        with StubServer(app) as server:
+            requests.get(server.url("/ofertas?page=1"))
+    """
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.port = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def url(self, path: str = "") -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def offer_pages_app(latency: float = 0.1, error_rate: float = 0.0, cards: int = 48, seed: int = 0,
+                    recorded_dir: str = None, etag: bool = False, churn: float = 0.0,
+                    tracking: bool = False) -> web.Application:
+    """
+    Stub de https://www.mercadolivre.com.br/ofertas?page=N.
+    `latency` em segundos por resposta; `error_rate` devolve 503 com essa probabilidade.
+    Com `recorded_dir`, serve as páginas gravadas (*.html, em ordem de nome, repetidas
+    em ciclo) em vez das sintéticas.
+
+    Com `etag`, responde com ETag e devolve 304 a um If-None-Match igual. `app["state"]["version"]`
+    (0 no início) faz uma fração `churn` dos cards mudar a cada incremento. Com `tracking`,
+    os links dos cards ganham um tracking_id novo a cada requisição (o HTML nunca se repete).
+    """
+    rng = random.Random(seed)
+    pages = {}
+    recorded = sorted(glob.glob(os.path.join(recorded_dir, "*.html"))) if recorded_dir else []
+    if recorded_dir and not recorded:
+        raise ValueError(f"Nenhuma página .html em {recorded_dir}")
+    app = web.Application()
+    app["stats"] = {"requests": 0, "errors": 0, "not_modified": 0, "bytes": 0}
+    app["state"] = {"version": 0}
+
+    async def ofertas(request):
+        app["stats"]["requests"] += 1
+        await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            app["stats"]["errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        page = int(request.query.get("page", "1"))
+        key = (page, app["state"]["version"])
+        if key not in pages and recorded:
+            with open(recorded[(page - 1) % len(recorded)], encoding="utf-8") as f:
+                pages[key] = f.read()
+        elif key not in pages:
+            pages[key] = render_offer_page(page, cards=cards, seed=seed, version=app["state"]["version"], churn=churn)
+        html = pages[key]
+        if tracking:
+            html = html.replace("#polycard_client", f"&tracking_id={rng.getrandbits(64):016x}#polycard_client")
+        headers = {}
+        if etag:
+            headers["ETag"] = '"' + hashlib.blake2b(html.encode(), digest_size=8).hexdigest() + '"'
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                app["stats"]["not_modified"] += 1
+                return web.Response(status=304, headers=headers)
+        app["stats"]["bytes"] += len(html.encode())
+        return web.Response(text=html, content_type="text/html", headers=headers)
+
+    app.router.add_get("/ofertas", ofertas)
+    return app
+
+
+
+def listing_pages_app(listings: dict, latency: float = 0.05, cards: int = 48) -> web.Application:
+    """
+    Stub de várias listagens de ofertas (categorias, tipos de oferta) em GET /listagem/{nome}?page=N.
+
+    `listings` = {nome: {"pages": páginas com cards (depois, página vazia), "id_offset": deslocamento
+    dos IDs (listagens com o mesmo deslocamento repetem os mesmos itens), "best_seller_pages": páginas
+    com cards 'MAIS VENDIDO' (depois, nenhum card qualifica)}}. Conta as requisições por listagem.
+    """
+    app = web.Application()
+    app["stats"] = {"requests": 0, "by_listing": {name: 0 for name in listings}}
+    without_best_seller = [flag for flag in FLAGS if flag != 'MAIS VENDIDO']
+    rendered = {}
+
+    async def listing(request):
+        name = request.match_info["name"]
+        config = listings.get(name)
+        if config is None:
+            return web.Response(status=404, text="Not Found")
+        app["stats"]["requests"] += 1
+        app["stats"]["by_listing"][name] += 1
+        await asyncio.sleep(latency)
+        page = int(request.query.get("page", "1"))
+        if (name, page) not in rendered:
+            if page > config.get("pages", 20):
+                html = render_offer_page(page, cards=0)
+            else:
+                flags = FLAGS if page <= config.get("best_seller_pages", 10 ** 6) else without_best_seller
+                first_id = 1000000000 + config.get("id_offset", 0) + page * 1000
+                html = render_offer_page(page, cards=cards, seed=config.get("id_offset", 0), first_id=first_id,
+                                         flags=flags)
+            rendered[(name, page)] = html
+        return web.Response(text=rendered[(name, page)], content_type="text/html")
+
+    app.router.add_get("/listagem/{name}", listing)
+    return app
+
+def create_link_app(latency: float = 0.05, item_error_rate: float = 0.0, throttle_rate: float = 0.0,
+                    max_batch: int = 50, seed: int = 0) -> web.Application:
+    """
+    Stub do POST /affiliate-program/api/v2/affiliates/createLink.
+    `item_error_rate` faz URLs individuais voltarem sem links (falha parcial);
+    `throttle_rate` responde 429 ao lote inteiro com essa probabilidade.
+    """
+    rng = random.Random(seed)
+    app = web.Application()
+    app["stats"] = {"requests": 0, "urls": 0, "throttled": 0, "item_errors": 0}
+
+    async def create_link(request):
+        stats = app["stats"]
+        stats["requests"] += 1
+        await asyncio.sleep(latency)
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({"message": "invalid_token"}, status=401)
+        if throttle_rate and rng.random() < throttle_rate:
+            stats["throttled"] += 1
+            return web.json_response({"message": "too_many_requests"}, status=429)
+        payload = await request.json()
+        urls = payload.get("urls") or []
+        if len(urls) > max_batch:
+            return web.json_response({"message": f"max {max_batch} urls"}, status=400)
+        items = []
+        for url in urls:
+            stats["urls"] += 1
+            if item_error_rate and rng.random() < item_error_rate:
+                stats["item_errors"] += 1
+                items.append({"origin_url": url, "error": "internal_error"})
+                continue
+            code = abs(hash((url, payload.get("tag")))) % 10 ** 8
+            items.append({
+                "origin_url": url,
+                "short_url": f"https://mercadolivre.com/sec/{code:08d}",
+                "long_url": f"{url}{'&' if '?' in url else '?'}matt_tool={payload.get('tag')}",
+            })
+        return web.json_response({"urls": items})
+
+    app.router.add_post("/affiliate-program/api/v2/affiliates/createLink", create_link)
+    return app
+
+
+def oauth_app(latency: float = 0.05, expires_in: int = 21600, seed_refresh_token: str = "TG-seed",
+              error_rate: float = 0.0, seed: int = 0) -> web.Application:
+    """
+    Stub do POST /oauth/token (grant_type=refresh_token) do Mercado Livre.
+    Cada refresh token vale uma única vez e é trocado por um novo, como na API real;
+    reusar um token já trocado responde 400 invalid_grant. `error_rate` devolve 503
+    (sem consumir o refresh token) com essa probabilidade.
+    """
+    rng = random.Random(seed)
+    app = web.Application()
+    app["stats"] = {"requests": 0, "issued": 0, "invalid_grant": 0, "errors": 0}
+    valid = {seed_refresh_token}
+
+    async def token(request):
+        stats = app["stats"]
+        stats["requests"] += 1
+        await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "temporarily_unavailable"}, status=503)
+        form = await request.post()
+        if form.get("grant_type") != "refresh_token" or not form.get("client_id") or not form.get("client_secret"):
+            return web.json_response({"error": "invalid_request"}, status=400)
+        refresh_token = form.get("refresh_token")
+        if refresh_token not in valid:
+            stats["invalid_grant"] += 1
+            return web.json_response({"error": "invalid_grant", "message": "Error validating grant."}, status=400)
+        valid.discard(refresh_token)
+        stats["issued"] += 1
+        new_refresh = f"TG-refresh-{stats['issued']}"
+        valid.add(new_refresh)
+        return web.json_response({
+            "access_token": f"APP_USR-access-{stats['issued']}",
+            "token_type": "Bearer",
+            "expires_in": app["expires_in"],
+            "refresh_token": new_refresh,
+        })
+
+    app["expires_in"] = expires_in
+    app.router.add_post("/oauth/token", token)
+    return app
+
+
+def telegram_app(latency: float = 0.02, chat_limit: int = 20, chat_window: float = 60.0,
+                 global_limit: int = 30, global_window: float = 1.0, download_latency: float = 0.0,
+                 image_bytes: int = 150_000, error_rate: float = 0.0, seed: int = 0) -> web.Application:
+    """
+    Stub do Bot API (sendMessage, sendPhoto, sendMediaGroup) que aplica limites por chat e
+    globais em janela deslizante e responde 429 com `retry_after`, como o Telegram.
+
+    Fotos por URL custam `download_latency` extra (o Telegram baixa a imagem) e são contadas
+    em `downloaded_bytes`; fotos por `file_id` conhecido não; uploads multipart também são aceitos.
+    Também serve imagens de teste em GET /img/{name}. `error_rate` devolve 502 com essa probabilidade.
+    """
+    rng = random.Random(seed)
+    app = web.Application()
+    app["stats"] = {"requests": 0, "messages": 0, "throttled": 0, "errors": 0, "by_method": {},
+                    "url_photos": 0, "file_id_photos": 0, "uploads": 0, "downloaded_bytes": 0, "uploaded_bytes": 0}
+    app["delivered"] = []
+    chat_sent = {}
+    global_sent = []
+    files = {}
+
+    def _over(timestamps: list, limit: int, window: float, now: float, count: int) -> float:
+        while timestamps and now - timestamps[0] >= window:
+            timestamps.pop(0)
+        if len(timestamps) + count > limit:
+            return window - (now - timestamps[0]) if timestamps else window
+        return 0.0
+
+    async def _photo(photo) -> dict | None:
+        stats = app["stats"]
+        if isinstance(photo, web.FileField):
+            data = photo.file.read()
+            stats["uploads"] += 1
+            stats["uploaded_bytes"] += len(data)
+            size = len(data)
+        elif isinstance(photo, str) and photo.startswith("file-"):
+            if photo not in files:
+                return None
+            stats["file_id_photos"] += 1
+            return {"file_id": photo, "file_size": files[photo], "width": 800}
+        else:
+            await asyncio.sleep(download_latency)
+            stats["url_photos"] += 1
+            stats["downloaded_bytes"] += image_bytes
+            size = image_bytes
+        file_id = f"file-{len(files) + 1}"
+        files[file_id] = size
+        return {"file_id": file_id, "file_size": size, "width": 800}
+
+    async def api(request):
+        stats = app["stats"]
+        stats["requests"] += 1
+        method = request.match_info["method"]
+        stats["by_method"][method] = stats["by_method"].get(method, 0) + 1
+        await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"ok": False, "error_code": 502, "description": "Bad Gateway"}, status=502)
+        if request.content_type.startswith("multipart/"):
+            payload = dict(await request.post())
+        else:
+            payload = await request.json()
+        chat_id = str(payload.get("chat_id"))
+        media = payload.get("media") or []
+        if isinstance(media, str):
+            media = json.loads(media)
+        count = len(media) if method == "sendMediaGroup" else 1
+        if method not in ("sendMessage", "sendPhoto", "sendMediaGroup") or not chat_id:
+            return web.json_response({"ok": False, "error_code": 400, "description": "Bad Request"}, status=400)
+
+        now = asyncio.get_running_loop().time()
+        timestamps = chat_sent.setdefault(chat_id, [])
+        wait = max(_over(timestamps, chat_limit, chat_window, now, count),
+                   _over(global_sent, global_limit, global_window, now, count))
+        if wait:
+            stats["throttled"] += 1
+            retry_after = max(1, int(wait + 0.999))
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }, status=429)
+
+        photos = []
+        if method == "sendPhoto":
+            photos = [await _photo(payload.get("photo"))]
+        elif method == "sendMediaGroup":
+            photos = [await _photo(item.get("media")) for item in media]
+        if any(photo is None for photo in photos):
+            return web.json_response({"ok": False, "error_code": 400,
+                                      "description": "Bad Request: wrong file identifier/HTTP URL specified"},
+                                     status=400)
+
+        timestamps.extend([now] * count)
+        global_sent.extend([now] * count)
+        stats["messages"] += count
+        app["delivered"].append((chat_id, method, count))
+        messages = []
+        for photo in photos or [None]:
+            message = {"message_id": stats["messages"] + len(messages), "chat": {"id": chat_id}}
+            if photo is not None:
+                message["photo"] = [{**photo, "width": 90, "file_id": photo["file_id"] + "-thumb"}, photo]
+            messages.append(message)
+        result = messages if method == "sendMediaGroup" else messages[0]
+        return web.json_response({"ok": True, "result": result})
+
+    async def image(request):
+        if "test_image" not in app:
+            app["test_image"] = _test_jpeg(image_bytes)
+        return web.Response(body=app["test_image"], content_type="image/jpeg")
+
+    app.router.add_post("/bot{token}/{method}", api)
+    app.router.add_get("/img/{name}", image)
+    return app
+
+
+
+def zatten_app(latency: float = 0.05, error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1,
+               send_path: str = "/v1/messages/send", seed: int = 0) -> web.Application:
+    """
+    Stub da API de mensagens do Zatten (WhatsApp).
+    `error_rate` devolve 502 e `throttle_rate` devolve 429 com o header Retry-After,
+    cada um com essa probabilidade; `app["latency"]` pode ser alterado com o stub no ar.
+    """
+    rng = random.Random(seed)
+    app = web.Application()
+    app["stats"] = {"requests": 0, "messages": 0, "media": 0, "throttled": 0, "errors": 0}
+    app["delivered"] = []
+    app["latency"] = latency
+
+    async def send(request):
+        stats = app["stats"]
+        stats["requests"] += 1
+        await asyncio.sleep(app["latency"])
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "bad_gateway"}, status=502)
+        if throttle_rate and rng.random() < throttle_rate:
+            stats["throttled"] += 1
+            return web.json_response({"error": "too_many_requests"}, status=429,
+                                     headers={"Retry-After": str(retry_after)})
+        payload = await request.json()
+        if not payload.get("number") or not payload.get("body"):
+            return web.json_response({"error": "number e body são obrigatórios"}, status=400)
+        stats["messages"] += 1
+        stats["media"] += bool(payload.get("mediaUrl"))
+        app["delivered"].append((payload["number"], payload["body"]))
+        return web.json_response({"id": f"wamid-{stats['messages']}", "status": "sent"})
+
+    app.router.add_post(send_path, send)
+    return app
+
+def _test_jpeg(size: int) -> bytes:
+    """
+    Imagem de teste com ~`size` bytes (JPEG de ruído se o Pillow estiver instalado).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(size)
+    side = 600
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
@@ -1,16 +1,25 @@
+import argparse
 import asyncio
-import pandas as pd
+import csv
 import os
+import signal
 import sys 
-import re 
-import numpy as np 
-from src.affiliate_link_generator import generate_affiliate_links_with_playwright, perform_ml_login, load_cookies_from_json # Importa tudo do affiliate_link_generator
-from src.telegram_notifier import send_telegram_message 
-
-# Importações para o scraping do Mercado Livre
-from bs4 import BeautifulSoup
-import requests
-import time as time_sleep_module 
+import time
+from functools import partial
+from zoneinfo import ZoneInfo
+from src.affiliate_link_generator import generate_affiliate_links_with_cache, AffiliateLinkClient
+from src.telegram_notifier import TelegramNotifier
+from src.mercadolivre_scraper import AsyncCrawler
+from src.crawl_frontier import CrawlFrontier, load_seeds
+from src.offer_extractor import start_parse_pool
+from src.page_cache import PAGE_CACHE_ENABLED, IncrementalPageParser
+from src.pipeline import OfferPipeline
+from src.ranking import parse_weights
+from src.database_manager import AffiliateLinkCache, DeliveryLog, OfferHistory, PageCache, TelegramFileCache, TokenStore, open_database
+from src.notification_dispatcher import NotificationDispatcher, TelegramChannel, ZattenChannel
+from src.zatten_notifier import ZattenNotifier
+from src.token_manager import OAuthTokenManager
+from src.metrics import run_metrics
 
 # --- Configurações Iniciais ---
 ML_AFFILIATE_TAG = os.getenv("ML_AFFILIATE_TAG")
@@ -32,215 +41,315 @@ if not ML_AFFILIATE_TAG:
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     print("AVISO: Credenciais do Telegram não definidas. O bot não enviará mensagens para o Telegram.")
 
-# --- Constantes para scraping ---
-MAX_RETRIES = 3
-TIMEOUT_SECONDS = 60
-SCRAPING_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
-}
-
-# --- Funções do scraping original (adaptadas) ---
-def perform_scraping():
-    print("Starting web scraping...")
-    dados = []
-    for i in range(1, 21): 
-        url = f'https://www.mercadolivre.com.br/ofertas?page={i}'
-        response = None
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = requests.get(url, headers=SCRAPING_HEADERS, timeout=TIMEOUT_SECONDS)
-                response.raise_for_status()
-                break
-            except requests.exceptions.Timeout as e:
-                print(f"Attempt {attempt + 1}/{MAX_RETRIES}: Timeout accessing {url}. Error: {e}")
-                if attempt < MAX_RETRIES - 1:
-                    time_sleep_module.sleep(5 * (attempt + 1))
-                else:
-                    print(f"All {MAX_RETRIES} attempts failed for {url}.")
-                    response = None
-                    break
-            except requests.exceptions.RequestException as e:
-                print(f"Unexpected request error for {url}: {e}")
-                response = None
-                break
-
-        if response and response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            produtos = soup.find_all('div', class_='andes-card poly-card poly-card--grid-card poly-card--large andes-card--flat andes-card--padding-0 andes-card--animated')
-
-            for produto in produtos:
-                imagem_tag = produto.find('img', class_='poly-component__picture')
-                imagem = imagem_tag.get('src') if imagem_tag else None
-                if imagem and imagem.startswith('data:image'):
-                    imagem = imagem_tag.get('data-src')
-
-                nome_tag = produto.find('h3', class_='poly-component__title-wrapper')
-                nome = nome_tag.text if nome_tag else None
-
-                preco_de = None
-                preco_de_tag = produto.find('s', class_='andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma')
-                if preco_de_tag:
-                    fraction_span = preco_de_tag.find('span', class_='andes-money-amount__fraction')
-                    cents_span = preco_de_tag.find('span', class_='andes-money-amount__cents')
-                    reais_str_raw = fraction_span.get_text(strip=True) if fraction_span else ''
-                    centavos_str_raw = cents_span.get_text(strip=True) if cents_span else '00'
-                    reais_str = reais_str_raw.replace('.', '').replace(',', '')
-                    centavos_str = centavos_str_raw 
-                    try:
-                        if reais_str or centavos_str != '00':
-                            preco_de = float(f"{reais_str}.{centavos_str}")
-                        else:
-                            preco_de = None
-                    except ValueError as e:
-                        print(f"DEBUG - ValueError ao converter Preço De: '{reais_str}.{centavos_str}' - Erro: {e}")
-                        preco_de = None
-
-                preco_por = None
-                preco_por_tag = produto.find('span', class_='andes-money-amount andes-money-amount--cents-superscript')
-                if preco_por_tag:
-                    fraction_span = preco_por_tag.find('span', class_='andes-money-amount__fraction')
-                    cents_span = preco_por_tag.find('span', class_='andes-money-amount__cents')
-                    reais_str_raw = fraction_span.get_text(strip=True) if fraction_span else ''
-                    centavos_str_raw = cents_span.get_text(strip=True) if cents_span else '00'
-                    reais_str = reais_str_raw.replace('.', '').replace(',', '')
-                    centavos_str = centavos_str_raw
-                    try:
-                        if reais_str or centavos_str != '00':
-                            preco_por = float(f"{reais_str}.{centavos_str}")
-                        else:
-                            preco_por = None
-                        
-                    except ValueError as e:
-                        print(f"DEBUG - ValueError ao converter Preço Por: '{reais_str}.{centavos_str}' - Erro: {e}")
-                        preco_por = None
-
-                link_tag = produto.find('a', class_ = 'poly-component__title')
-                link = link_tag.get('href') if link_tag else None
-
-                span_tag = produto.find('span', class_= 'poly-component__highlight')
-                span_text = span_tag.get_text(strip=True) if span_tag else None
-
-                parcelas = ''
-                parcelas_tag = produto.find('span', class_='poly-price__installments')
-                if parcelas_tag:
-                    full_parcelas_text = parcelas_tag.get_text(separator=' ', strip=True)
-                    parcelas = re.sub(r'\\s+', ' ', full_parcelas_text).strip()
-                    price_in_installment_tag = parcelas_tag.find('span', class_='andes-money-amount--cents-comma')
-                    if price_in_installment_tag and price_in_installment_tag.get('aria-label'):
-                        aria_label_installment = price_in_installment_tag.get('aria-label')
-                        match_installment = re.search(r'(\\d[\\d\\.,]*)\\s*reales(?:\\s*con\\s*(\\d+)\\s*centavos)?', aria_label_installment)
-                        if match_installment:
-                            reais_inst = match_installment.group(1).replace('.', '')
-                            centavos_inst = match_installment.group(2) if match_installment.group(2) else '00'
-                            pass 
-
-
-                    dados.append({
-                        'Imagem': imagem,
-                        'Nome': nome,
-                        'Preço De': preco_de,
-                        'Preço Por': preco_por,
-                        'Link': link,
-                        'flag': span_text,
-                        'Parcelas': parcelas
-                        })
-            else:
-                print(f'Error accessing page {i}: {response.status_code if response else "No response"}')
-        
-        df = pd.DataFrame(dados)
-        print(f"Initial data scraped: {len(df)} products")
-
-        # ETL steps (do código original)
-        df = df[df['flag'] == 'MAIS VENDIDO']
-        print(f"Data after filtering by 'MAIS VENDIDO' flag: {len(df)} products")
-
-        df['Preço De'] = pd.to_numeric(df['Preço De'], errors='coerce').fillna(0).apply(lambda x: int(np.round(x)))
-        df['Preço Por'] = pd.to_numeric(df['Preço Por'], errors='coerce').fillna(0).apply(lambda x: int(np.round(x)))
-
-        df['%_desconto'] = 0.0
-        df.loc[(df['Preço De'].notna()) & (df['Preço Por'].notna()) & (df['Preço De'] > 0), '%_desconto'] = \
-            ((df['Preço De'] - df['Preço Por']) / df['Preço De'] * 100)
-        df['%_desconto'] = df['%_desconto'].fillna(0).astype(int)
-
-        regex_pattern = r'R\$\s*(\d+\.?\d*)\s*,\s*(\d+)'
-        replacement_pattern = r'R$\g<1>,\g<2>'
-        df['Parcelas'] = df['Parcelas'].str.replace(regex_pattern, replacement_pattern, regex=True)
-        
-        return df
+# Credenciais do Zatten (WhatsApp); ZATTEN_PHONE_NUMBER aceita vários números separados por vírgula
+ZATTEN_API_KEY = os.getenv("ZATTEN_API_KEY")
+ZATTEN_PHONE_NUMBER = os.getenv("ZATTEN_PHONE_NUMBER")
+if not ZATTEN_API_KEY or not ZATTEN_PHONE_NUMBER:
+    print("AVISO: Credenciais do Zatten não definidas. O bot não enviará mensagens para o WhatsApp.")
 
-# --- Função Principal do Bot ---
-async def main():
-    print("Iniciando o Bot de Ofertas Mercado Livre (Novo Projeto)...")
-    
-    # 1. Scraping das Ofertas
-    products_df = perform_scraping()
-    if products_df.empty:
-        print("Nenhum produto encontrado após o scraping ou filtro. Encerrando.")
-        return
-
-    # 2. Geração de Links de Afiliado com Playwright
-    # ATENÇÃO: A função generate_affiliate_links_with_playwright agora usa OAuth
-    short_links, long_links = await generate_affiliate_links_with_playwright(
-        products_df["Link"].tolist(), ML_AFFILIATE_TAG
+# --- Configurações do crawler ---
+SCRAPING_PAGES = int(os.getenv("SCRAPING_PAGES", "20")) # páginas de cada listagem sem max_pages próprio
+CRAWL_SEEDS = os.getenv("CRAWL_SEEDS") # listagens do crawl em JSON (ver src/crawl_frontier.py); padrão: só /ofertas
+SCRAPING_CONCURRENCY = int(os.getenv("SCRAPING_CONCURRENCY", "8"))
+SCRAPING_HOST_MAX_IN_FLIGHT = int(os.getenv("SCRAPING_HOST_MAX_IN_FLIGHT", "4"))
+SCRAPING_HOST_RPS = float(os.getenv("SCRAPING_HOST_RPS", "4"))
+SCRAPING_PARSER_BACKEND = os.getenv("SCRAPING_PARSER_BACKEND") # selectolax, lxml ou bs4 (padrão: o mais rápido instalado)
+SCRAPING_PARSE_WORKERS = int(os.getenv("SCRAPING_PARSE_WORKERS", "0")) # processos de parse (0 = no próprio processo)
+
+# --- Configurações do pipeline ---
+TOP_OFFERS = int(os.getenv("TOP_OFFERS", "5"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+PIPELINE_LINK_BATCH_SIZE = int(os.getenv("PIPELINE_LINK_BATCH_SIZE", "20"))
+RANKING_WEIGHTS = parse_weights(os.getenv("RANKING_WEIGHTS")) # ex.: "desconto=1,economia=0.1" (padrão: só desconto)
+TELEGRAM_ALBUM_MODE = os.getenv("TELEGRAM_ALBUM_MODE", "").lower() in ("1", "true", "yes")
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "5")) # ofertas em envio ao mesmo tempo (todos os canais)
+
+# --- Configurações do modo daemon (main.py --daemon) ---
+DAEMON_SCHEDULE = os.getenv("BOT_SCHEDULE", "45 9,11,14,19,22 * * *") # cron(s) dos envios, separados por ';' (mesmos horários do workflow)
+DAEMON_TIMEZONE = os.getenv("BOT_TIMEZONE", "UTC")
+DAEMON_POLL_INTERVAL_SECONDS = float(os.getenv("BOT_POLL_INTERVAL_SECONDS", "1800")) # coleta entre envios (0 = desliga)
+DAEMON_CANDIDATES = int(os.getenv("BOT_CANDIDATES", "50")) # melhores itens de cada coleta guardados para o próximo envio
+DAEMON_CANDIDATE_MAX_AGE_HOURS = float(os.getenv("BOT_CANDIDATE_MAX_AGE_HOURS", "6"))
+
+def format_offer_message(row) -> str:
+    """
+    Texto da mensagem de uma oferta (Markdown do Telegram).
+    """
+    return (
+        f"*{row['Nome']}*\n\n"
+        f"~De: R$ {row['Preço De']}~\n"
+        f"*Por: R$ {row['Preço Por']}*\n"
+        f"{row['%_desconto']}% OFF\n\n"
+        f"{row['Parcelas']}\n\n"
+        f"Compre aqui: {row['short_links']}"
     )
-    
-    products_df['short_links'] = short_links
-    products_df['long_links'] = long_links 
 
-    # Garantir que short_links e long_links sejam preenchidos mesmo se a geração falhar
-    # Usar os links originais se a geração de links de afiliado falhar
-    products_df['short_links'] = products_df['short_links'].fillna(products_df['Link'])
-    products_df['long_links'] = products_df['long_links'].fillna(products_df['Link'])
+def format_whatsapp_message(row) -> str:
+    """
+    Texto da mensagem de uma oferta no WhatsApp: link no fim para gerar a prévia.
+    """
+    return (
+        f"*{row['Nome']}*\n\n"
+        f"~De: R$ {row['Preço De']}~\n"
+        f"*Por: R$ {row['Preço Por']}* ({row['%_desconto']}% OFF)\n"
+        f"_{row['Parcelas']}_\n\n"
+        f"{row['short_links']}"
+    )
+
+# --- Estado do bot entre ciclos ---
+class BotRuntime:
+    """
+    Recursos do bot que sobrevivem entre ciclos: banco e caches, token OAuth, sessões HTTP
+    (crawler, afiliados, Telegram, Zatten) e pool de parse. Uma execução avulsa abre, roda um ciclo
+    de envio e fecha; o daemon mantém tudo aberto e alterna ciclos de coleta e de envio.
+
+    Ciclos de coleta raspam, filtram, gravam o histórico e geram os links (aquecendo o cache),
+    mas não enviam: os melhores itens ficam como candidatos para o próximo ciclo de envio.
+    """
+
+    def __init__(self):
+        self.parse_pool = None
+        self.db = None
+        self.crawler = None
+        self.link_client = None
+        self.oauth_tokens = None
+        self.telegram = None
+        self.zatten = None
+        self.dispatcher = None
+        self.page_parser = None
+        self.telegram_chats = [chat.strip() for chat in (TELEGRAM_CHAT_ID or "").split(",") if chat.strip()]
+        self.zatten_numbers = [number.strip() for number in (ZATTEN_PHONE_NUMBER or "").split(",") if number.strip()]
+        # item_id -> linha já com links, acumulada pelos ciclos de coleta desde o último envio
+        self.candidates = {}
+        self.last_stats = None
+
+    async def open(self):
+        try:
+            return await self._open()
+        except BaseException:
+            # Falha no meio da abertura: libera o pool de parse, o banco e o que já tiver sido aberto
+            await self.close()
+            raise
+
+    async def _open(self):
+        # Pool de parse criado antes de qualquer sessão HTTP (os workers são processos filhos)
+        self.parse_pool = start_parse_pool(SCRAPING_PARSE_WORKERS, SCRAPING_PARSER_BACKEND)
+
+        # O Access Token vem do banco local enquanto for válido (sem chamada OAuth); a renovação,
+        # quando precisa, é única e compartilhada por todos os lotes, e o refresh token rotacionado
+        # é salvo no banco. O mesmo cliente de afiliados (sessão HTTP + limitador) atende todos os lotes
+        self.db = open_database()
+        self.link_cache = AffiliateLinkCache(self.db)
+        self.offer_history = OfferHistory(self.db)
+        self.oauth_tokens = OAuthTokenManager.from_env(partial(TokenStore, self.db))
+        if self.oauth_tokens is not None:
+            self.link_client = AffiliateLinkClient(self.oauth_tokens, ML_AFFILIATE_TAG)
+
+        # Um notificador assíncrono para todos os chats (TELEGRAM_CHAT_ID aceita vários IDs separados por vírgula)
+        # Fotos já enviadas são reaproveitadas pelo file_id salvo no banco
+        # Cada oferta vai para o Telegram e para o WhatsApp (Zatten) em paralelo, com filas,
+        # limitadores e retries independentes por canal; as entregas ficam no DeliveryLog
+        channels = []
+        if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+            # Uma tentativa por chamada: os retries do Telegram ficam só no dispatcher
+            self.telegram = TelegramNotifier(TELEGRAM_BOT_TOKEN, max_retries=1, file_cache=TelegramFileCache(self.db))
+            channels.append(TelegramChannel(self.telegram, self.telegram_chats, format_offer_message,
+                                            album_size=10 if TELEGRAM_ALBUM_MODE else 1))
+        if ZATTEN_API_KEY and self.zatten_numbers:
+            self.zatten = ZattenNotifier.from_env()
+            channels.append(ZattenChannel(self.zatten, self.zatten_numbers, format_whatsapp_message))
+        self.delivery_log = DeliveryLog(self.db)
+        self.dispatcher = NotificationDispatcher(channels, self.delivery_log)
+
+        # Páginas que não mudaram desde a última execução não são baixadas (304) nem parseadas
+        if PAGE_CACHE_ENABLED:
+            self.page_parser = IncrementalPageParser(PageCache(self.db))
+
+        crawler = AsyncCrawler(
+            concurrency=SCRAPING_CONCURRENCY,
+            host_max_in_flight=SCRAPING_HOST_MAX_IN_FLIGHT,
+            host_rps=SCRAPING_HOST_RPS,
+            raw=self.parse_pool is not None,
+        )
+        await crawler.__aenter__()
+        self.crawler = crawler
+        return self
+
+    async def close(self):
+        if self.crawler is not None:
+            await self.crawler.__aexit__(None, None, None)
+        if self.link_client is not None:
+            await self.link_client.close()
+        if self.oauth_tokens is not None:
+            await self.oauth_tokens.close()
+        if self.dispatcher is not None:
+            # Espera os retries pendentes e fecha os clientes do Telegram e do Zatten
+            await self.dispatcher.close()
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+        if self.db is not None:
+            self.db.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
+    async def link_misses(self, urls: list) -> tuple[list, list]:
+        if self.link_client is None:
+            return [None] * len(urls), [None] * len(urls)
+        return await self.link_client.generate(urls)
 
-    print("\nProdutos processados com links de afiliado (ou originais se falha):")
-    print(products_df[['Nome', 'Preço Por', 'short_links']].head())
+    async def link_batch(self, urls: list) -> tuple[list, list]:
+        # Só os produtos sem link em cache vão para a API (e só eles disparam a renovação do token)
+        return await generate_affiliate_links_with_cache(urls, self.link_cache, self.link_misses)
+
+    async def notify(self, row: dict) -> bool:
+        if not self.dispatcher.channels:
+            print(f"Nenhum canal de envio configurado. Pulando envio de '{row['Nome']}'.")
+            return False
+        ok = (await self.dispatcher.dispatch([row]))[0]
+        if ok:
+            print(f"Mensagem para '{row['Nome']}' enviada com sucesso.")
+        else:
+            print(f"Falha ao enviar mensagem para '{row['Nome']}' em todos os canais.")
+        return ok
+
+    async def notify_album(self, rows: list) -> list:
+        if not self.dispatcher.channels:
+            print(f"Nenhum canal de envio configurado. Pulando envio de {len(rows)} ofertas.")
+            return [False] * len(rows)
+        results = await self.dispatcher.dispatch(rows)
+        print(f"Álbum com {len(rows)} ofertas: {sum(results)} enviadas.")
+        return results
+
+    def _prune_candidates(self):
+        oldest = time.time() - DAEMON_CANDIDATE_MAX_AGE_HOURS * 3600
+        self.candidates = {item_id: row for item_id, row in self.candidates.items() if row['coletado_em'] >= oldest}
+
+    async def run_cycle(self, post: bool = True):
+        """
+        Scraping -> filtro 'MAIS VENDIDO' -> histórico -> links de afiliado -> top-k -> Telegram, em streaming.
+        Com `post=False` (coleta), o top-k vira candidato para o próximo envio em vez de ser enviado.
+        """
+        run_metrics.reset()
+        self._prune_candidates()
+        # Uma fronteira nova por ciclo: a deduplicação e a parada antecipada valem dentro do ciclo
+        frontier = CrawlFrontier(load_seeds(CRAWL_SEEDS, SCRAPING_PAGES))
+        fetch = None
+        if self.page_parser is not None:
+            self.page_parser.reset()
+            fetch = partial(self.page_parser.fetch, self.crawler)
+        pipeline = OfferPipeline(
+            frontier.iter_pages(self.crawler, fetch=fetch),
+            self.link_batch,
+            self.notify if post else None,
+            top_k=TOP_OFFERS if post else DAEMON_CANDIDATES,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            link_batch_size=PIPELINE_LINK_BATCH_SIZE,
+            parser_backend=SCRAPING_PARSER_BACKEND,
+            history=self.offer_history,
+            notify_album=self.notify_album if post and TELEGRAM_ALBUM_MODE else None,
+            weights=RANKING_WEIGHTS,
+            parse_executor=self.parse_pool,
+            parse_workers=SCRAPING_PARSE_WORKERS,
+            carry_over=list(self.candidates.values()) if post else None,
+            notify_concurrency=NOTIFY_CONCURRENCY,
+            frontier=frontier,
+            page_parser=self.page_parser,
+        )
+        try:
+            stats = await pipeline.run()
+        finally:
+            # Mesmo com falha: só os cards descartados pelo filtro ou entregues contam como tratados
+            if self.page_parser is not None:
+                self.page_parser.flush()
+            # O relatório sai mesmo se o pipeline falhar (o workflow o publica como artifact)
+            run_metrics.write_report()
+        if post:
+            self.candidates = {}
+        else:
+            now = time.time()
+            for row in pipeline.ranked:
+                row.setdefault('coletado_em', now)
+                self.candidates[row['item_id']] = row
+            print(f"Candidatos para o próximo envio: {len(self.candidates)}")
+        self.last_stats = stats
+        print(f"\nCrawl: {frontier.summary()}")
+        self.print_summary(stats)
+        return stats
+
+    async def post(self):
+        return await self.run_cycle(post=True)
+
+    async def poll(self):
+        return await self.run_cycle(post=False)
+
+    def print_summary(self, stats):
+        print(f"\nResumo do pipeline: {stats.summary()}")
+        print(f"Tempo por estágio: {run_metrics.stage_summary()}")
+        if self.page_parser is not None:
+            print(f"Cache de páginas: {self.page_parser.summary()}")
+        if self.link_client is not None:
+            print(f"Links de afiliado: {self.link_client.stats}")
+            print(f"Token OAuth: {self.oauth_tokens.summary()}")
+        print(f"Cache de links de afiliado: {self.link_cache.summary()}")
+        print(f"Histórico de ofertas: {self.offer_history.summary()}")
+        print(f"Envios por canal: {self.dispatcher.summary()}")
+        if self.telegram is not None:
+            print(f"Telegram: {self.telegram.stats}")
+            print(f"Cache de file_id do Telegram: {self.telegram.file_cache.summary()}")
+        if self.zatten is not None:
+            print(f"Zatten: {self.zatten.stats}")
+        if not stats.filtered:
+            print("Nenhum produto encontrado após o scraping ou filtro.")
+
+
+def save_debug_sample(rows: list, path: str = "debug_scraped_products_sample.csv"):
+    # Salva os primeiros produtos processados para verificar o scraping (csv da stdlib: sem carregar o pandas)
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"DEBUG: Amostra de produtos raspados salva em {path}")
+
+
+# --- Função Principal do Bot ---
+async def main():
+    print("Iniciando o Bot de Ofertas Mercado Livre (Novo Projeto)...")
+    async with BotRuntime() as runtime:
+        stats = await runtime.post()
 
     # --- NOVO BLOCO PARA SALVAR ARTIFACTS DE DEBUG ---
-    # Salva os primeiros 10 produtos raspados para verificar o scraping
-    debug_scrape_file = "debug_scraped_products_sample.csv"
-    products_df.head(10).to_csv(debug_scrape_file, index=False)
-    print(f"DEBUG: Amostra de produtos raspados salva em {debug_scrape_file}")
+    save_debug_sample(stats.sample)
     # --- FIM NOVO BLOCO ---
 
-    # 3. Filtrar e Preparar para Envio (do código original)
-    df_descontos = products_df.sort_values('%_desconto', ascending=False).copy()
-    df_preco_por = products_df.sort_values('Preço Por', ascending=True).copy()
-
-    df_descontos['status'] = 'Não enviado'
-    df_preco_por['status'] = 'Não enviado'
-
-    # --- Lógica de Envio para Telegram ---
-    print("\nIniciando envio de mensagens para o Telegram...")
-    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-        print("Enviando produtos com maiores descontos para o Telegram...")
-        for index, row in df_descontos.head(5).iterrows(): 
-            message_text = (
-                f"*{row['Nome']}*\n\n"
-                f"~De: R$ {row['Preço De']}~\n"
-                f"*Por: R$ {row['Preço Por']}*\n"
-                f"{row['%_desconto']}% OFF\n\n"
-                f"{row['Parcelas']}\n\n"
-                f"Compre aqui: {row['short_links']}"
-            )
-            response = send_telegram_message(
-                TELEGRAM_BOT_TOKEN, 
-                TELEGRAM_CHAT_ID, 
-                message_text, 
-                image_url=row['Imagem'] 
-            )
-            if response and response.get('ok'):
-                print(f"Mensagem para '{row['Nome']}' enviada com sucesso para o Telegram.")
-            else:
-                print(f"Falha ao enviar mensagem para '{row['Nome']}' para o Telegram: {response}")
-            await asyncio.sleep(2) 
-        
-    else:
-        print("Credenciais do Telegram não configuradas. Pulando envio para Telegram.")
-    # --- Fim Lógica de Envio para Telegram ---
-
-    print("\nDEBUG: Envio para Zatten seria aqui (requer instância de WhatsApp conectada).")
-    print("DEBUG: Salvamento do histórico em banco de dados ou CSV seria aqui.")
-    
+
+# --- Modo daemon: um processo residente com agendador interno ---
+async def daemon():
+    from src.scheduler import Scheduler, parse_schedules
+
+    tz = ZoneInfo(DAEMON_TIMEZONE)
+    schedules = parse_schedules(DAEMON_SCHEDULE, tz)
+    print(f"Iniciando o Bot de Ofertas em modo daemon (envios: {DAEMON_SCHEDULE} {DAEMON_TIMEZONE}; "
+          f"coleta a cada {DAEMON_POLL_INTERVAL_SECONDS}s)...")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with BotRuntime() as runtime:
+        scheduler = Scheduler(schedules, post=runtime.post, poll=runtime.poll,
+                              poll_interval=DAEMON_POLL_INTERVAL_SECONDS)
+        await scheduler.run(stop)
+    print(f"Daemon encerrado: {scheduler.stats}")
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Bot de ofertas do Mercado Livre")
+    parser.add_argument("--daemon", action="store_true",
+                        help="processo residente: envios nos horários de BOT_SCHEDULE e coleta a cada BOT_POLL_INTERVAL_SECONDS")
+    args = parser.parse_args()
+    asyncio.run(daemon() if args.daemon else main())
@@ -2,151 +2,220 @@ import os
 import json
 import asyncio
 import time
-import requests # Importa requests para chamadas de API OAuth
-from playwright.async_api import async_playwright, Page, BrowserContext, expect
+from urllib.parse import urlsplit
+import aiohttp
 
-# Função para carregar os cookies do JSON (não mais usada para login principal, mas mantida)
-def load_cookies_from_json(json_string: str) -> list:
-    # ... (manter o código da função load_cookies_from_json exatamente como na última versão robusta) ...
-    # Eu vou omitir para não repetir, mas use a versão completa que te enviei antes.
-    # Esta função não será o método principal de login agora, mas é bom mantê-la.
-    pass # Substitua esta linha pelo código completo da função load_cookies_from_json
+from src.database_manager import AffiliateLinkCache
+from src.metrics import run_metrics
+from src.offer_extractor import canonical_item_id
+from src.rate_limiter import TokenBucket, backoff_delay
+from src.token_manager import OAuthTokenManager
 
+# --- Configurações da API de afiliados ---
+AFFILIATE_API_URL = os.getenv("AFFILIATE_API_URL", "https://api.mercadolibre.com/affiliate-program/api/v2/affiliates/createLink")
+AFFILIATE_BATCH_SIZE = int(os.getenv("AFFILIATE_BATCH_SIZE", "20"))
+AFFILIATE_CONCURRENCY = int(os.getenv("AFFILIATE_CONCURRENCY", "4"))
+AFFILIATE_REQUESTS_PER_SECOND = float(os.getenv("AFFILIATE_REQUESTS_PER_SECOND", "2"))
+AFFILIATE_MAX_RETRIES = 3
+AFFILIATE_TIMEOUT_SECONDS = 10
+AFFILIATE_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
-# Função para obter/atualizar o Access Token usando o Refresh Token
-async def refresh_access_token(client_id: str, client_secret: str, refresh_token: str) -> dict:
+_ORIGIN_FIELDS = ("origin_url", "original_url", "url")
+
+
+def _url_key(url: str) -> str:
+    # Sem esquema, query e fragmento: a API pode devolver a URL normalizada ou sem os parâmetros.
+    parts = urlsplit(url)
+    return f"{parts.netloc.lower().removeprefix('www.')}{parts.path.rstrip('/')}"
+
+
+def _match_batch_results(urls: list, items: list) -> dict:
     """
-    Obtém um novo access_token e refresh_token usando o refresh_token existente.
+    Associa os itens devolvidos pelo createLink às URLs enviadas: pela URL de origem
+    (exata ou normalizada) ou pelo ID do produto (MLB...). A posição no lote só vale se
+    nenhum item trouxer a URL de origem e vier exatamente um item por URL; um item que
+    não casa com nenhuma URL (ou casa com mais de uma) fica sem link.
+    Retorna {url: (short_url, long_url)} apenas para as URLs com os dois links.
     """
-    print("DEBUG: Tentando renovar o Access Token com Refresh Token...")
-    token_url = "https://api.mercadolibre.com/oauth/token"
-    payload = {
-        "grant_type": "refresh_token",
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "refresh_token": refresh_token
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-    try:
-        response = requests.post(token_url, data=payload, headers=headers)
-        response.raise_for_status()
-        new_tokens = response.json()
-        print("DEBUG: Access Token renovado com sucesso.")
-        return new_tokens
-    except requests.exceptions.HTTPError as e:
-        print(f"ERRO: Falha ao renovar Access Token HTTP: {e}")
-        print(f"Resposta do servidor: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"ERRO: Falha ao renovar Access Token Request: {e}")
-        return None
-
-# Função para gerar links de afiliado usando a API do Mercado Livre (OAuth)
-async def generate_affiliate_link_via_api(access_token: str, original_url: str, affiliate_tag: str) -> dict:
+    by_key, by_item_id = {}, {}
+    for url in urls:
+        for index, key in ((by_key, _url_key(url)), (by_item_id, canonical_item_id(url))):
+            if key:
+                # Duas URLs do lote com a mesma chave: ambígua, não serve para casar.
+                index[key] = url if index.get(key, url) == url else None
+
+    items = [item for item in items if isinstance(item, dict)]
+    has_origin = any(item.get(field) for item in items for field in _ORIGIN_FIELDS)
+    by_position = not has_origin and len(items) == len(urls)
+    results = {}
+    for position, item in enumerate(items):
+        origin = next((item[field] for field in _ORIGIN_FIELDS if item.get(field)), None)
+        if origin in urls:
+            target = origin
+        elif origin:
+            target = by_key.get(_url_key(origin)) or by_item_id.get(canonical_item_id(origin))
+        elif by_position:
+            target = urls[position]
+        else:
+            target = by_item_id.get(canonical_item_id(item.get("item_id") or item.get("id") or ""))
+        short_url, long_url = item.get("short_url"), item.get("long_url")
+        if target is None:
+            run_metrics.inc("affiliate_links_unmatched")
+            print(f"AVISO: item do createLink sem URL correspondente no lote: {origin or item}")
+        elif short_url and long_url:
+            results[target] = (short_url, long_url)
+    return results
+
+
+class AffiliateLinkClient:
     """
-    Gera um link de afiliado do Mercado Livre usando a API oficial.
+    Cliente em lote do createLink: várias URLs por chamada, lotes concorrentes numa
+    sessão aiohttp compartilhada e limitados por token bucket. Em falhas parciais,
+    só as URLs que falharam são reenviadas.
+
+    `access_token` pode ser a string do token ou um OAuthTokenManager; com o gerenciador,
+    cada chamada usa o token atual e um 401 força uma renovação antes de tentar de novo.
+
+    Uso:
+        async with AffiliateLinkClient(access_token, tag) as client:
+            shorts, longs = await client.generate(urls)
     """
-    # ATENÇÃO: Você precisará confirmar o endpoint exato para gerar links de afiliado via API.
-    # O endpoint abaixo é um palpite baseado no que vimos no scraping.
-    # Se este endpoint não funcionar, a API de afiliados pode não ter um endpoint público para isso.
-    affiliate_api_url = "https://api.mercadolibre.com/affiliate-program/api/v2/affiliates/createLink"
-    # OU pode ser algo como: "https://api.mercadolibre.com/users/me/affiliate_links" (exemplo)
-
-    payload = {"urls": [original_url], "tag": affiliate_tag}
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-
-    try:
-        response = requests.post(affiliate_api_url, headers=headers, data=json.dumps(payload), timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        print(f"ERRO API Afiliado HTTP: {e}")
-        print(f"Resposta do servidor: {e.response.text}")
-        return {"error": str(e), "response_content": e.response.text}
-    except requests.exceptions.RequestException as e:
-        print(f"ERRO API Afiliado Request: {e}")
-        return {"error": str(e)}
-
-# A função perform_ml_login não será mais o método principal de login
-async def perform_ml_login(page: Page, username: str, password: str) -> bool:
-    # ... (manter o código da função perform_ml_login exatamente como na última versão) ...
-    pass # Substitua esta linha pelo código completo da função perform_ml_login
-
-# A função generate_affiliate_links_with_playwright será refatorada para usar OAuth
-async def generate_affiliate_links_with_playwright(product_urls: list, affiliate_tag: str) -> tuple[list, list]:
+
+    def __init__(self, access_token: str | OAuthTokenManager, affiliate_tag: str, api_url: str = AFFILIATE_API_URL,
+                 batch_size: int = AFFILIATE_BATCH_SIZE, concurrency: int = AFFILIATE_CONCURRENCY,
+                 requests_per_second: float = AFFILIATE_REQUESTS_PER_SECOND,
+                 max_retries: int = AFFILIATE_MAX_RETRIES, retry_base_delay: float = 1.0):
+        self.access_token = access_token
+        self.affiliate_tag = affiliate_tag
+        self.api_url = api_url
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.stats = {"requests": 0, "retries": 0, "links": 0, "failures": 0}
+        self._concurrency = concurrency
+        self._bucket = TokenBucket(requests_per_second)
+        self._semaphore = None
+        self._session = None
+
+    def _open(self):
+        # A sessão é criada sob demanda, já dentro do event loop.
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._concurrency, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=AFFILIATE_TIMEOUT_SECONDS),
+            )
+
+    async def __aenter__(self):
+        self._open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, urls: list) -> tuple[dict, bool]:
+        """
+        Uma chamada ao createLink. Retorna ({url: (short, long)}, pode_tentar_de_novo).
+        """
+        tokens = self.access_token if isinstance(self.access_token, OAuthTokenManager) else None
+        access_token = await tokens.get_token() if tokens is not None else self.access_token
+        if not access_token:
+            return {}, False
+        payload = {"urls": urls, "tag": self.affiliate_tag}
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        async with self._semaphore:
+            await self._bucket.acquire()
+            self.stats["requests"] += 1
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with self._session.post(self.api_url, headers=headers, data=json.dumps(payload)) as response:
+                    status = response.status
+                    if response.status != 200:
+                        text = await response.text()
+                        if response.status == 429:
+                            run_metrics.inc("throttled", service="affiliate")
+                        print(f"ERRO API Afiliado HTTP {response.status} (lote de {len(urls)}): {text[:200]}")
+                        if response.status == 401 and tokens is not None:
+                            tokens.invalidate()
+                            return {}, True
+                        return {}, response.status in AFFILIATE_RETRYABLE_STATUS
+                    body = await response.json(content_type=None)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                print(f"ERRO API Afiliado Request (lote de {len(urls)}): {e or e.__class__.__name__}")
+                return {}, True
+            finally:
+                run_metrics.observe_request("affiliate_create_link", time.perf_counter() - start, status)
+        items = body.get("urls") if isinstance(body, dict) else None
+        return _match_batch_results(urls, items or []), True
+
+    async def _generate_batch(self, urls: list) -> dict:
+        results = {}
+        pending = urls
+        for attempt in range(self.max_retries):
+            found, retryable = await self._post(pending)
+            results.update(found)
+            pending = [url for url in pending if url not in results]
+            if not pending or not retryable or attempt == self.max_retries - 1:
+                break
+            self.stats["retries"] += 1
+            run_metrics.inc("retries", service="affiliate")
+            await asyncio.sleep(backoff_delay(attempt, self.retry_base_delay))
+        for url in pending:
+            print(f"AVISO: API não retornou short/long URL para {url}.")
+        return results
+
+    async def generate(self, product_urls: list) -> tuple[list, list]:
+        """
+        Gera (shorts, longs) na mesma ordem de `product_urls`; falhas viram None.
+        """
+        self._open()
+        unique_urls = [url for url in dict.fromkeys(product_urls) if url]
+        batches = [unique_urls[i:i + self.batch_size] for i in range(0, len(unique_urls), self.batch_size)]
+        results = {}
+        for found in await asyncio.gather(*(self._generate_batch(batch) for batch in batches)):
+            results.update(found)
+        self.stats["links"] += len(results)
+        self.stats["failures"] += len(unique_urls) - len(results)
+        run_metrics.inc("affiliate_links_generated", len(results))
+        run_metrics.inc("affiliate_links_failed", len(unique_urls) - len(results))
+        shorts = [results.get(url, (None, None))[0] for url in product_urls]
+        longs = [results.get(url, (None, None))[1] for url in product_urls]
+        return shorts, longs
+
+# Consulta o cache antes da API: só os produtos sem link em cache são enviados a `generate`
+async def generate_affiliate_links_with_cache(product_urls: list, cache: AffiliateLinkCache, generate) -> tuple[list, list]:
     """
-    Gera links de afiliado do Mercado Livre usando a API OAuth 2.0.
+    `generate` é uma corrotina (urls) -> (shorts, longs), chamada apenas para os cache misses
+    (uma URL por ID canônico). Os links gerados são gravados no cache.
     """
-    print("Iniciando geração de links de afiliado com API OAuth 2.0...")
-    
-    # Obter credenciais OAuth dos secrets
-    ml_client_id = os.getenv("ML_CLIENT_ID")
-    ml_client_secret = os.getenv("ML_CLIENT_SECRET")
-    ml_refresh_token = os.getenv("ML_REFRESH_TOKEN")
-
-    if not all([ml_client_id, ml_client_secret, ml_refresh_token, affiliate_tag]):
-        print("ERRO FATAL: Credenciais OAuth ou TAG de afiliado incompletas. Verifique os GitHub Secrets.")
-        return [None] * len(product_urls), [None] * len(product_urls)
-    
-    current_access_token = None
-    
-    # 1. Obter/Renovar Access Token usando Refresh Token
-    new_tokens = await refresh_access_token(ml_client_id, ml_client_secret, ml_refresh_token)
-    if new_tokens and new_tokens.get("access_token"):
-        current_access_token = new_tokens["access_token"]
-        # ATENÇÃO: O refresh_token é de uso único. O novo refresh_token deve ser salvo!
-        # Para um bot em GitHub Actions, isso significa atualizar o secret ML_REFRESH_TOKEN.
-        # Isso é complexo e geralmente requer uma API externa ou intervenção manual.
-        # Por enquanto, vamos usar o novo refresh_token para a próxima execução.
-        # Em um sistema de produção, você precisaria de um serviço que atualize o secret.
-        # Ou, para simplificar, você pode gerar um novo refresh_token manualmente quando o antigo expirar.
-        print(f"DEBUG: NOVO REFRESH TOKEN OBTIDO: {new_tokens.get('refresh_token')}")
-        print("AVISO: Você precisará atualizar o secret ML_REFRESH_TOKEN no GitHub com este novo valor manualmente após esta execução, ou implementar uma forma de fazê-lo automaticamente.")
-        # Para este projeto, vamos assumir que você atualizará o secret manualmente quando este aviso aparecer.
-    else:
-        print("ERRO FATAL: Não foi possível obter ou renovar o Access Token. Verifique as credenciais OAuth.")
-        return [None] * len(product_urls), [None] * len(product_urls)
-
-    shorts = []
-    longs = []
-    quantidade_total = 0
-
-    # 2. Gerar links para cada URL de produto usando o Access Token
-    for original_url in product_urls:
-        try:
-            api_response = await generate_affiliate_link_via_api(current_access_token, original_url, affiliate_tag)
-            
-            if api_response and api_response.get("urls"):
-                item = api_response["urls"][0]
-                short_url = item.get("short_url")
-                long_url = item.get("long_url")
-
-                if not short_url or not long_url:
-                    shorts.append(None)
-                    longs.append(None)
-                    print(f"AVISO: API não retornou short/long URL para {original_url}. Resposta: {api_response}")
-                else:
-                    shorts.append(short_url)
-                    longs.append(long_url)
-                    quantidade_total += 1
-                    print(f"Link gerado ({quantidade_total} de {len(product_urls)}) para {original_url}: {short_url}")
-            else:
-                shorts.append(None)
-                longs.append(None)
-                print(f"ERRO: Resposta inesperada da API para {original_url}: {api_response}")
-
-        except Exception as e:
-            print(f"ERRO ao gerar link de afiliado para {original_url} via API: {e}")
-            shorts.append(None)
-            longs.append(None)
-        
-        await asyncio.sleep(0.6) # Manter um pequeno delay entre as chamadas de API
-
-    print("Geração de links de afiliado via API OAuth concluída.")
+    item_ids = [canonical_item_id(url) for url in product_urls]
+    cached = cache.get_many(item_ids)
+
+    misses = {}
+    for item_id, url in zip(item_ids, product_urls):
+        if url and item_id not in cached and item_id not in misses:
+            misses[item_id] = url
+    if misses:
+        shorts, longs = await generate(list(misses.values()))
+        generated = {
+            item_id: (short_url, long_url)
+            for item_id, short_url, long_url in zip(misses, shorts, longs)
+            if short_url and long_url
+        }
+        cache.put_many(generated)
+        cached.update(generated)
+    run_metrics.inc("affiliate_links_cached", len(item_ids) - len(misses))
+
+    shorts = [cached.get(item_id, (None, None))[0] for item_id in item_ids]
+    longs = [cached.get(item_id, (None, None))[1] for item_id in item_ids]
     return shorts, longs
-
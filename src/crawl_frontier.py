@@ -0,0 +1,243 @@
+"""
+Fronteira do crawl: várias listagens de ofertas (categorias, tipos de oferta) numa execução.
+
+A configuração vem de CRAWL_SEEDS, uma lista JSON (ou o caminho de um arquivo .json) como:
+
+    [
+      {"name": "ofertas", "max_pages": 20},
+      {"name": "celulares", "category": "MLB1055", "max_pages": 5},
+      {"name": "relampago", "deal_type": "lightning", "max_pages": 5, "weight": 2},
+      {"name": "outra", "url": "https://www.mercadolivre.com.br/ofertas?container_id=X&page={page}"}
+    ]
+
+Sem `url`, a listagem parte de OFFERS_URL_TEMPLATE com `category` / `deal_type` na query.
+Sem CRAWL_SEEDS, a única listagem é /ofertas com SCRAPING_PAGES páginas (o comportamento antigo).
+
+As páginas são pedidas em rodízio ponderado entre as listagens, dentro de um orçamento
+global de requisições. Os itens são deduplicados por ID entre todas as listagens, e uma
+listagem para de paginar quando rende menos de `min_new_per_page` itens novos qualificados
+('MAIS VENDIDO') por `patience` páginas seguidas, ou quando uma página vem vazia.
+"""
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from urllib.parse import urlencode
+
+from src.mercadolivre_scraper import OFFERS_URL_TEMPLATE, AsyncCrawler
+from src.metrics import run_metrics
+from src.offer_extractor import Offer
+
+CRAWL_SEEDS = os.getenv("CRAWL_SEEDS")
+# Máximo de páginas pedidas por execução, somando todas as listagens (0 = só os max_pages de cada uma).
+CRAWL_REQUEST_BUDGET = int(os.getenv("CRAWL_REQUEST_BUDGET") or "0")
+CRAWL_MIN_NEW_PER_PAGE = float(os.getenv("CRAWL_MIN_NEW_PER_PAGE", "1"))
+CRAWL_PATIENCE = int(os.getenv("CRAWL_PATIENCE", "2"))
+# Páginas de uma mesma listagem em andamento ao mesmo tempo: quanto menor, mais cedo a parada reage.
+CRAWL_LISTING_IN_FLIGHT = int(os.getenv("CRAWL_LISTING_IN_FLIGHT", "4"))
+
+
+@dataclass
+class Listing:
+    """Uma listagem semente e o estado do crawl dela na execução."""
+    name: str
+    url_template: str
+    max_pages: int = 20
+    weight: float = 1.0
+    next_page: int = 1
+    in_flight: int = 0
+    requested: int = 0
+    fetched: int = 0
+    failed: int = 0
+    new_items: int = 0
+    duplicates: int = 0
+    low_yield_streak: int = 0
+    stopped: str | None = None
+
+    def summary(self) -> str:
+        if self.stopped:
+            state = f"parada: {self.stopped}"
+        else:
+            state = "orçamento esgotado" if self.next_page <= self.max_pages else "completa"
+        return (f"{self.name}: páginas={self.fetched}/{self.max_pages} (falhas={self.failed}) "
+                f"novos={self.new_items} repetidos={self.duplicates} ({state})")
+
+
+def _listing_template(seed: dict, base_template: str) -> str:
+    if seed.get("url"):
+        return seed["url"]
+    params = {key: seed[field] for field, key in (("category", "category"), ("deal_type", "promotion_type"))
+              if seed.get(field)}
+    if not params:
+        return base_template
+    return f"{base_template}{'&' if '?' in base_template else '?'}{urlencode(params)}"
+
+
+def load_seeds(spec: str = CRAWL_SEEDS, default_pages: int = 20,
+               base_template: str = OFFERS_URL_TEMPLATE) -> list[Listing]:
+    """
+    Listagens a partir de CRAWL_SEEDS (JSON ou caminho de arquivo JSON); sem spec, só /ofertas.
+    """
+    if not spec:
+        return [Listing("ofertas", base_template, default_pages)]
+    if not spec.lstrip().startswith("["):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    listings = []
+    for position, seed in enumerate(json.loads(spec), start=1):
+        template = _listing_template(seed, base_template)
+        if "{page}" not in template:
+            raise ValueError(f"URL da listagem {seed.get('name', position)!r} precisa de {{page}}: {template}")
+        listings.append(Listing(seed.get("name") or f"listagem-{position}", template,
+                                int(seed.get("max_pages", default_pages)), float(seed.get("weight", 1.0))))
+    return listings
+
+
+class CrawlFrontier:
+    """
+    Decide qual página baixar a seguir e filtra os itens já vistos.
+
+    `iter_pages(crawler)` gera (url, html) como AsyncCrawler.iter_pages; quem consome tem que
+    chamar `observe(url, ofertas)` depois do parse de cada página baixada: é esse retorno que
+    libera novas páginas da listagem, decide a parada antecipada e deduplica os itens.
+
+    - Rodízio ponderado: a próxima página é da listagem ativa com menos pedidos/`weight`.
+    - `budget`: total de páginas pedidas na execução (0 = soma dos max_pages).
+    - `max_in_flight`: páginas pedidas e ainda não observadas, somando as listagens
+      (padrão: a concorrência do crawler), para a parada não chegar com tudo já pedido.
+
+    Uso:
+        frontier = CrawlFrontier(load_seeds())
+        async for url, html in frontier.iter_pages(crawler):
+            novas = frontier.observe(url, extract_offers(html))
+    """
+
+    def __init__(self, listings: list[Listing], budget: int = CRAWL_REQUEST_BUDGET,
+                 min_new_per_page: float = CRAWL_MIN_NEW_PER_PAGE, patience: int = CRAWL_PATIENCE,
+                 listing_in_flight: int = CRAWL_LISTING_IN_FLIGHT, max_in_flight: int = None,
+                 flag: str = 'MAIS VENDIDO'):
+        if not listings:
+            raise ValueError("Nenhuma listagem para o crawl.")
+        self.listings = listings
+        self.budget = budget if budget > 0 else sum(listing.max_pages for listing in listings)
+        self.min_new_per_page = min_new_per_page
+        self.patience = max(1, patience)
+        self.listing_in_flight = max(1, listing_in_flight)
+        self.max_in_flight = max_in_flight
+        self.flag = flag
+        self.requested = 0
+        self.seen = set()
+        self._urls = set()
+        self._pending = {}
+        self._changed = None
+
+    def _in_flight(self) -> int:
+        return sum(listing.in_flight for listing in self.listings)
+
+    def _next(self) -> tuple[Listing, str] | None:
+        if self.requested >= self.budget or self._in_flight() >= self.max_in_flight:
+            return None
+        active = [listing for listing in self.listings
+                  if not listing.stopped and listing.next_page <= listing.max_pages
+                  and listing.in_flight < self.listing_in_flight]
+        if not active:
+            return None
+        # min() devolve o primeiro em empate: a ordem das sementes desempata.
+        listing = min(active, key=lambda candidate: candidate.requested / candidate.weight)
+        url = listing.url_template.format(page=listing.next_page)
+        listing.next_page += 1
+        listing.requested += 1
+        listing.in_flight += 1
+        self.requested += 1
+        return listing, url
+
+    async def iter_pages(self, crawler: AsyncCrawler, fetch: Callable[[str], Awaitable] = None):
+        """
+        Gera (url, html) à medida que as páginas chegam; html é None se o download falhou.
+        `fetch` troca o crawler.fetch (ex.: o GET condicional de IncrementalPageParser).
+        """
+        if self.max_in_flight is None:
+            self.max_in_flight = crawler.concurrency
+        self._changed = asyncio.Event()
+        fetch_page = fetch or crawler.fetch
+        tasks = set()
+
+        async def fetch(listing: Listing, url: str):
+            return listing, url, await fetch_page(url)
+
+        try:
+            while True:
+                self._changed.clear()
+                while (request := self._next()) is not None:
+                    if request[1] in self._urls:
+                        # A mesma URL em duas listagens: baixa uma vez só (e não gasta orçamento).
+                        request[0].in_flight -= 1
+                        self.requested -= 1
+                        continue
+                    self._urls.add(request[1])
+                    self._pending[request[1]] = request[0]
+                    tasks.add(asyncio.create_task(fetch(*request)))
+                if not tasks and not self._in_flight():
+                    return
+                waiter = asyncio.create_task(self._changed.wait())
+                done, _ = await asyncio.wait(tasks | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                for task in done - {waiter}:
+                    tasks.discard(task)
+                    listing, url, html = task.result()
+                    if html is None:
+                        self._pending.pop(url, None)
+                        listing.in_flight -= 1
+                        listing.failed += 1
+                    yield url, html
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def observe(self, url: str, offers: list[Offer]) -> list[Offer]:
+        """
+        Registra o resultado do parse de uma página e devolve só as ofertas ainda não vistas.
+        """
+        listing = self._pending.pop(url, None)
+        if listing is None:
+            return offers
+        listing.in_flight -= 1
+        listing.fetched += 1
+        fresh = []
+        qualifying = 0
+        for offer in offers:
+            key = offer.item_id or offer.link
+            if key in self.seen:
+                listing.duplicates += 1
+                continue
+            self.seen.add(key)
+            fresh.append(offer)
+            qualifying += offer.flag == self.flag
+        listing.new_items += qualifying
+        run_metrics.inc("frontier_pages", listing=listing.name)
+        run_metrics.inc("frontier_new_items", qualifying, listing=listing.name)
+        run_metrics.inc("frontier_duplicates", len(offers) - len(fresh), listing=listing.name)
+
+        if not listing.stopped:
+            if not offers:
+                self._stop(listing, "página vazia")
+            elif qualifying < self.min_new_per_page:
+                listing.low_yield_streak += 1
+                if listing.low_yield_streak >= self.patience:
+                    self._stop(listing, f"menos de {self.min_new_per_page:g} item(ns) novo(s) por página "
+                                        f"em {listing.low_yield_streak} páginas seguidas")
+            else:
+                listing.low_yield_streak = 0
+        if self._changed is not None:
+            self._changed.set()
+        return fresh
+
+    def _stop(self, listing: Listing, reason: str):
+        listing.stopped = reason
+        run_metrics.inc("frontier_early_stops", listing=listing.name)
+        run_metrics.inc("frontier_pages_skipped", listing.max_pages - listing.next_page + 1, listing=listing.name)
+
+    def summary(self) -> str:
+        return (f"páginas pedidas={self.requested}/{self.budget} itens únicos={len(self.seen)}\n  "
+                + "\n  ".join(listing.summary() for listing in self.listings))
@@ -0,0 +1,632 @@
+"""
+Persistência local do bot em SQLite.
+
+- AffiliateLinkCache: links de afiliado por ID canônico do produto (MLB...), com TTL,
+  limite de tamanho e uma camada LRU em memória na frente.
+- OfferHistory: histórico de ofertas vistas/enviadas e pontos de preço, para não
+  reenviar a mesma oferta e detectar quedas de preço entre execuções.
+- TelegramFileCache: `file_id` do Telegram por imagem, para não reenviar a mesma foto.
+- TokenStore: tokens OAuth do Mercado Livre entre execuções (opcionalmente criptografados).
+- DeliveryLog: resultado do envio de cada oferta por canal e destino (Telegram, WhatsApp).
+- PageCache: validadores HTTP e fingerprints dos cards de cada página de listagem, e a
+  oferta já parseada de cada card, para pular o download e o parse do que não mudou.
+"""
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+DB_PATH = os.getenv("BOT_DB_PATH", "bot_data.sqlite3")
+AFFILIATE_CACHE_TTL_HOURS = float(os.getenv("AFFILIATE_CACHE_TTL_HOURS", "168"))
+AFFILIATE_CACHE_MAX_ENTRIES = int(os.getenv("AFFILIATE_CACHE_MAX_ENTRIES", "50000"))
+AFFILIATE_CACHE_MEMORY_ENTRIES = int(os.getenv("AFFILIATE_CACHE_MEMORY_ENTRIES", "2048"))
+
+# Limite de variáveis por consulta (SQLITE_MAX_VARIABLE_NUMBER antigo é 999).
+_SQL_CHUNK = 500
+
+
+def open_database(path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Abre (ou cria) o banco do bot com WAL e escrita assíncrona no disco.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _chunks(values: list, size: int = _SQL_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class AffiliateLinkCache:
+    """
+    Cache de (short_url, long_url) por ID canônico do produto.
+
+    Leituras passam primeiro por um LRU em memória e depois pelo SQLite.
+    Entradas mais velhas que o TTL são ignoradas; acima de `max_entries`,
+    as menos usadas recentemente são removidas.
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None, ttl_hours: float = AFFILIATE_CACHE_TTL_HOURS,
+                 max_entries: int = AFFILIATE_CACHE_MAX_ENTRIES,
+                 memory_entries: int = AFFILIATE_CACHE_MEMORY_ENTRIES):
+        self.conn = conn if conn is not None else open_database()
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.stats = {"hits": 0, "memory_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS affiliate_links ("
+            " item_id TEXT PRIMARY KEY,"
+            " short_url TEXT NOT NULL,"
+            " long_url TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_affiliate_links_last_used ON affiliate_links(last_used)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_affiliate_links_created_at ON affiliate_links(created_at)")
+        self.conn.commit()
+
+    def _remember(self, item_id: str, entry: tuple):
+        self._memory[item_id] = entry
+        self._memory.move_to_end(item_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, item_ids: list) -> dict:
+        """
+        Retorna {item_id: (short_url, long_url)} para os IDs presentes e dentro do TTL.
+        """
+        now = time.time()
+        found = {}
+        pending = []
+        for item_id in dict.fromkeys(item_id for item_id in item_ids if item_id):
+            entry = self._memory.get(item_id)
+            if entry is not None and now - entry[2] <= self.ttl_seconds:
+                self._memory.move_to_end(item_id)
+                found[item_id] = entry[:2]
+                self.stats["memory_hits"] += 1
+            else:
+                pending.append(item_id)
+
+        from_disk = []
+        for chunk in _chunks(pending):
+            rows = self.conn.execute(
+                f"SELECT item_id, short_url, long_url, created_at FROM affiliate_links"
+                f" WHERE item_id IN ({','.join('?' * len(chunk))}) AND created_at >= ?",
+                (*chunk, now - self.ttl_seconds),
+            ).fetchall()
+            for item_id, short_url, long_url, created_at in rows:
+                found[item_id] = (short_url, long_url)
+                self._remember(item_id, (short_url, long_url, created_at))
+                from_disk.append(item_id)
+
+        if from_disk:
+            self.conn.executemany("UPDATE affiliate_links SET last_used = ? WHERE item_id = ?",
+                                  [(now, item_id) for item_id in from_disk])
+            self.conn.commit()
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(pending) - len(from_disk)
+        return found
+
+    def put_many(self, links: dict):
+        """
+        Grava {item_id: (short_url, long_url)} e aplica o limite de tamanho.
+        """
+        now = time.time()
+        rows = [(item_id, short_url, long_url, now, now)
+                for item_id, (short_url, long_url) in links.items()
+                if item_id and short_url and long_url]
+        if not rows:
+            return
+        self.conn.executemany(
+            "INSERT INTO affiliate_links (item_id, short_url, long_url, created_at, last_used)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(item_id) DO UPDATE SET short_url = excluded.short_url,"
+            " long_url = excluded.long_url, created_at = excluded.created_at, last_used = excluded.last_used",
+            rows,
+        )
+        for item_id, short_url, long_url, created_at, _ in rows:
+            self._remember(item_id, (short_url, long_url, created_at))
+        self.stats["writes"] += len(rows)
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        # Remove expirados e, se ainda passar do limite, os menos usados recentemente.
+        expired = self.conn.execute("DELETE FROM affiliate_links WHERE created_at < ?",
+                                    (time.time() - self.ttl_seconds,)).rowcount
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM affiliate_links").fetchone()
+        overflow = max(0, count - self.max_entries)
+        if overflow:
+            self.conn.execute(
+                "DELETE FROM affiliate_links WHERE item_id IN"
+                " (SELECT item_id FROM affiliate_links ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+        evicted = expired + overflow
+        if evicted:
+            self._memory.clear()
+            self.stats["evictions"] += evicted
+
+    def summary(self) -> str:
+        total = self.stats["hits"] + self.stats["misses"]
+        rate = self.stats["hits"] / total * 100 if total else 0.0
+        return (
+            f"hits={self.stats['hits']} (memória={self.stats['memory_hits']}) misses={self.stats['misses']} "
+            f"taxa_de_acerto={rate:.1f}% links_sem_chamada_api={self.stats['hits']} "
+            f"gravações={self.stats['writes']} remoções={self.stats['evictions']}"
+        )
+
+
+HISTORY_RESEND_AFTER_HOURS = float(os.getenv("HISTORY_RESEND_AFTER_HOURS", "24"))
+HISTORY_MIN_PRICE_DROP_PCT = float(os.getenv("HISTORY_MIN_PRICE_DROP_PCT", "5"))
+
+
+class OfferState(NamedTuple):
+    """Último estado conhecido de um produto no histórico."""
+    item_id: str
+    last_price: int | None
+    last_seen: float
+    last_sent: float | None
+    last_sent_price: int | None = None
+
+
+class OfferHistory:
+    """
+    Histórico de ofertas entre execuções: um registro por produto (ID canônico) e
+    pontos de preço com data (um novo ponto só quando o preço muda).
+
+    Todas as operações são em lote: cada chamada faz um número fixo de consultas,
+    independente do tamanho do lote (os IDs vão para uma tabela temporária e entram num JOIN).
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None, resend_after_hours: float = HISTORY_RESEND_AFTER_HOURS,
+                 min_price_drop_pct: float = HISTORY_MIN_PRICE_DROP_PCT):
+        self.conn = conn if conn is not None else open_database()
+        self.resend_after_seconds = resend_after_hours * 3600
+        self.min_price_drop_pct = min_price_drop_pct
+        self.stats = {"seen": 0, "new": 0, "price_drops": 0, "recently_sent": 0, "selected": 0, "marked_sent": 0}
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS offers ("
+            " item_id TEXT PRIMARY KEY,"
+            " nome TEXT,"
+            " last_price INTEGER,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " last_sent REAL,"
+            " last_sent_price INTEGER);"
+            "CREATE TABLE IF NOT EXISTS price_points ("
+            " item_id TEXT NOT NULL,"
+            " seen_at REAL NOT NULL,"
+            " price INTEGER,"
+            " PRIMARY KEY (item_id, seen_at)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_offers_last_sent ON offers(last_sent);"
+            "CREATE TEMP TABLE IF NOT EXISTS batch_ids (item_id TEXT PRIMARY KEY) WITHOUT ROWID;"
+        )
+        self.conn.commit()
+
+    def lookup(self, item_ids: list) -> dict:
+        """
+        Retorna {item_id: OfferState} para os IDs já vistos.
+        """
+        self.conn.execute("DELETE FROM batch_ids")
+        self.conn.executemany("INSERT OR IGNORE INTO batch_ids (item_id) VALUES (?)",
+                              ((item_id,) for item_id in item_ids if item_id))
+        rows = self.conn.execute(
+            "SELECT o.item_id, o.last_price, o.last_seen, o.last_sent, o.last_sent_price"
+            " FROM batch_ids b JOIN offers o ON o.item_id = b.item_id"
+        ).fetchall()
+        return {row[0]: OfferState(*row) for row in rows}
+
+    def record(self, offers: list, states: dict = None, now: float = None):
+        """
+        Grava uma observação de cada oferta: [(item_id, nome, preco_centavos), ...].
+        `states` (de lookup) evita reconsultar quais preços mudaram.
+        """
+        now = now if now is not None else time.time()
+        offers = [offer for offer in offers if offer[0]]
+        if states is None:
+            states = self.lookup([item_id for item_id, _, _ in offers])
+        self.conn.executemany(
+            "INSERT INTO offers (item_id, nome, last_price, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(item_id) DO UPDATE SET nome = excluded.nome,"
+            " last_price = excluded.last_price, last_seen = excluded.last_seen",
+            ((item_id, nome, price, now, now) for item_id, nome, price in offers),
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO price_points (item_id, seen_at, price) VALUES (?, ?, ?)",
+            ((item_id, now, price) for item_id, _, price in offers
+             if item_id not in states or states[item_id].last_price != price),
+        )
+        self.conn.commit()
+        self.stats["seen"] += len(offers)
+
+    def select_new_or_changed(self, rows: list, now: float = None) -> list:
+        """
+        Filtra as linhas (com 'item_id', 'Nome' e 'preco_por_centavos'), descartando produtos
+        já enviados nas últimas `resend_after_hours` horas, a menos que o preço tenha caído
+        pelo menos `min_price_drop_pct`% em relação ao preço do último envio (ou, sem ele, ao
+        último visto): uma queda gradual entre execuções também conta.
+        Todas as linhas são gravadas no histórico.
+        """
+        now = now if now is not None else time.time()
+        states = self.lookup([row['item_id'] for row in rows])
+        selected = []
+        for row in rows:
+            state = states.get(row['item_id'])
+            price = row['preco_por_centavos']
+            if state is None:
+                self.stats["new"] += 1
+                selected.append(row)
+            elif state.last_sent is None or now - state.last_sent > self.resend_after_seconds:
+                selected.append(row)
+            elif ((reference := state.last_sent_price or state.last_price) and price is not None
+                  and (reference - price) / reference * 100 >= self.min_price_drop_pct):
+                self.stats["price_drops"] += 1
+                selected.append(row)
+            else:
+                self.stats["recently_sent"] += 1
+        self.record([(row['item_id'], row['Nome'], row['preco_por_centavos']) for row in rows], states, now)
+        self.stats["selected"] += len(selected)
+        return selected
+
+    def mark_sent(self, item_ids: list, now: float = None):
+        now = now if now is not None else time.time()
+        self.conn.executemany(
+            "UPDATE offers SET last_sent = ?, last_sent_price = last_price WHERE item_id = ?",
+            ((now, item_id) for item_id in item_ids if item_id),
+        )
+        self.conn.commit()
+        self.stats["marked_sent"] += len(item_ids)
+
+    def summary(self) -> str:
+        return (
+            f"vistos={self.stats['seen']} novos={self.stats['new']} quedas_de_preço={self.stats['price_drops']} "
+            f"enviados_recentemente={self.stats['recently_sent']} selecionados={self.stats['selected']} "
+            f"marcados_como_enviados={self.stats['marked_sent']}"
+        )
+
+
+class TelegramFileCache:
+    """
+    Mapeia a imagem de um produto (URL ou "sha256:<hash do conteúdo>") para o `file_id`
+    que o Telegram devolveu no primeiro envio, para reenviar sem novo download/upload.
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None):
+        self.conn = conn if conn is not None else open_database()
+        self.stats = {"hits": 0, "misses": 0, "bytes_avoided": 0, "invalidated": 0}
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS telegram_files ("
+            " image_key TEXT PRIMARY KEY,"
+            " file_id TEXT NOT NULL,"
+            " file_size INTEGER,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, image_key: str) -> tuple | None:
+        """
+        Retorna (file_id, file_size) ou None.
+        """
+        row = self.conn.execute("SELECT file_id, file_size FROM telegram_files WHERE image_key = ?",
+                                (image_key,)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.conn.execute("UPDATE telegram_files SET last_used = ? WHERE image_key = ?", (time.time(), image_key))
+        self.conn.commit()
+        self.stats["hits"] += 1
+        self.stats["bytes_avoided"] += row[1] or 0
+        return row
+
+    def put(self, image_keys: list, file_id: str, file_size: int = None):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO telegram_files (image_key, file_id, file_size, created_at, last_used) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(image_key) DO UPDATE SET file_id = excluded.file_id,"
+            " file_size = excluded.file_size, last_used = excluded.last_used",
+            ((key, file_id, file_size, now, now) for key in image_keys if key),
+        )
+        self.conn.commit()
+
+    def invalidate(self, image_key: str):
+        self.conn.execute("DELETE FROM telegram_files WHERE image_key = ?", (image_key,))
+        self.conn.commit()
+        self.stats["invalidated"] += 1
+
+    def summary(self) -> str:
+        return (
+            f"hits={self.stats['hits']} misses={self.stats['misses']} "
+            f"bytes_evitados={self.stats['bytes_avoided']} invalidados={self.stats['invalidated']}"
+        )
+
+
+class DeliveryLog:
+    """
+    Registro de entregas: uma linha por (oferta, canal, destino) e envio, com o número de
+    tentativas e o erro final, para saber o que chegou em cada canal. `uncertain` marca os
+    envios que falharam sem resposta (timeout, conexão caída) e podem ter chegado.
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None):
+        self.conn = conn if conn is not None else open_database()
+        self.stats = {"delivered": 0, "failed": 0, "uncertain": 0}
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            " item_id TEXT,"
+            " channel TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " ok INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " seconds REAL,"
+            " uncertain INTEGER NOT NULL DEFAULT 0,"
+            " delivered_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_deliveries_item ON deliveries(item_id, channel);"
+        )
+        self.conn.commit()
+
+    def record(self, results: list, now: float = None):
+        """
+        Grava os resultados: [(item_id, canal, destino, ok, tentativas, erro, segundos, incerto), ...].
+        """
+        now = now if now is not None else time.time()
+        self.conn.executemany(
+            "INSERT INTO deliveries (item_id, channel, target, ok, attempts, error, seconds, uncertain, delivered_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((item_id, channel, target, int(ok), attempts, error, seconds, int(uncertain), now)
+             for item_id, channel, target, ok, attempts, error, seconds, uncertain in results),
+        )
+        self.conn.commit()
+        for result in results:
+            self.stats["delivered" if result[3] else "uncertain" if result[7] else "failed"] += 1
+
+    def summary(self) -> str:
+        return (f"entregues={self.stats['delivered']} falhas={self.stats['failed']} "
+                f"incertos={self.stats['uncertain']}")
+
+
+PAGE_CACHE_TTL_HOURS = float(os.getenv("PAGE_CACHE_TTL_HOURS", "72"))
+
+
+class CachedPage(NamedTuple):
+    """Última versão conhecida de uma página: validadores HTTP e os fingerprints dos cards, na ordem."""
+    url: str
+    etag: str | None
+    last_modified: str | None
+    fingerprint: str
+    cards: list
+    size: int
+    parse_seconds: float
+
+
+class CachedCard(NamedTuple):
+    """Card conhecido: campos do Offer e quando a oferta dele foi tratada (None se ainda não foi)."""
+    offer: tuple
+    handled_at: float | None
+
+
+class PageCache:
+    """
+    Cache das páginas de listagem entre execuções.
+
+    - listing_pages: por URL, o ETag/Last-Modified da última resposta, o fingerprint da página e os
+      fingerprints dos cards, o tamanho do HTML e quanto custa parseá-la inteira.
+    - page_cards: por fingerprint de card, os campos do Offer já extraídos e quando a oferta
+      dele foi tratada (descartada pelo filtro ou entregue); NULL enquanto não foi.
+
+    As gravações ficam em memória até `flush()`, chamado ao fim de toda execução (mesmo com
+    falha): o parse vale de qualquer jeito, e só os cards marcados em `mark_handled` contam
+    como tratados. Páginas e cards não vistos há mais de `ttl_hours` são descartados.
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None, ttl_hours: float = PAGE_CACHE_TTL_HOURS):
+        self.conn = conn if conn is not None else open_database()
+        self.ttl_seconds = ttl_hours * 3600
+        self.stats = {"pages": 0, "cards": 0, "handled": 0, "expired": 0}
+        self._pages = {}
+        self._cards = {}
+        self._touched = set()
+        self._handled = {}
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS listing_pages ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " fingerprint TEXT NOT NULL,"
+            " cards TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " parse_seconds REAL NOT NULL,"
+            " updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS page_cards ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " offer TEXT NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " handled_at REAL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_page_cards_last_seen ON page_cards(last_seen);"
+        )
+        self.conn.commit()
+
+    def get_page(self, url: str) -> CachedPage | None:
+        if url in self._pages:
+            return self._pages[url]
+        row = self.conn.execute(
+            "SELECT url, etag, last_modified, fingerprint, cards, size, parse_seconds FROM listing_pages"
+            " WHERE url = ? AND updated_at >= ?", (url, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        return CachedPage(*row[:4], json.loads(row[4]), *row[5:])
+
+    def get_cards(self, fingerprints: list) -> dict:
+        """
+        Retorna {fingerprint: CachedCard} para os cards conhecidos e dentro do TTL.
+        """
+        found = {}
+        pending = []
+        for fingerprint in dict.fromkeys(fingerprints):
+            if fingerprint in self._cards:
+                found[fingerprint] = CachedCard(self._cards[fingerprint], self._handled.get(fingerprint))
+            else:
+                pending.append(fingerprint)
+        oldest = time.time() - self.ttl_seconds
+        for chunk in _chunks(pending):
+            rows = self.conn.execute(
+                f"SELECT fingerprint, offer, handled_at FROM page_cards"
+                f" WHERE fingerprint IN ({','.join('?' * len(chunk))}) AND last_seen >= ?", (*chunk, oldest)
+            ).fetchall()
+            found.update((fingerprint, CachedCard(tuple(json.loads(offer)), self._handled.get(fingerprint, handled_at)))
+                         for fingerprint, offer, handled_at in rows)
+        return found
+
+    def put_page(self, page: CachedPage, cards: dict = None):
+        """
+        Guarda a versão da página e os cards novos ({fingerprint: campos do Offer}) até o flush.
+        """
+        self._pages[page.url] = page
+        self._cards.update(cards or {})
+        self._touched.update(page.cards)
+
+    def mark_handled(self, fingerprints, now: float = None):
+        """Marca os cards cuja oferta já foi tratada (gravado no flush)."""
+        now = now if now is not None else time.time()
+        self._handled.update(dict.fromkeys(fingerprints, now))
+
+    def flush(self, now: float = None):
+        """
+        Grava as páginas e cards da execução, renova os cards reaproveitados, marca os tratados e
+        descarta os expirados.
+        """
+        now = now if now is not None else time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO listing_pages (url, etag, last_modified, fingerprint, cards, size, parse_seconds,"
+            " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((page.url, page.etag, page.last_modified, page.fingerprint, json.dumps(page.cards), page.size,
+              page.parse_seconds, now) for page in self._pages.values()),
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO page_cards (fingerprint, offer, last_seen, handled_at) VALUES (?, ?, ?, ?)",
+            ((fingerprint, json.dumps(fields, ensure_ascii=False), now, self._handled.get(fingerprint))
+             for fingerprint, fields in self._cards.items()),
+        )
+        self.conn.executemany("UPDATE page_cards SET last_seen = ? WHERE fingerprint = ?",
+                              ((now, fingerprint) for fingerprint in self._touched - self._cards.keys()))
+        self.conn.executemany("UPDATE page_cards SET handled_at = ? WHERE fingerprint = ?",
+                              ((handled_at, fingerprint) for fingerprint, handled_at in self._handled.items()
+                               if fingerprint not in self._cards))
+        oldest = now - self.ttl_seconds
+        expired = self.conn.execute("DELETE FROM listing_pages WHERE updated_at < ?", (oldest,)).rowcount
+        expired += self.conn.execute("DELETE FROM page_cards WHERE last_seen < ?", (oldest,)).rowcount
+        self.conn.commit()
+        self.stats["pages"] += len(self._pages)
+        self.stats["cards"] += len(self._cards)
+        self.stats["handled"] += len(self._handled)
+        self.stats["expired"] += expired
+        self._pages, self._cards, self._touched, self._handled = {}, {}, set(), {}
+
+
+TOKEN_STORE_KEY = os.getenv("TOKEN_STORE_KEY")
+# Tokens em texto puro no banco: permitido por padrão só fora do CI (no CI o banco vai para o cache do Actions).
+TOKEN_STORE_ALLOW_PLAINTEXT = os.getenv(
+    "TOKEN_STORE_ALLOW_PLAINTEXT", "0" if os.getenv("CI") or os.getenv("GITHUB_ACTIONS") else "1"
+).lower() in ("1", "true", "yes")
+
+
+class TokenStore:
+    """
+    Guarda os tokens OAuth (access token, validade e o refresh token rotacionado) por client_id.
+
+    Com TOKEN_STORE_KEY (chave Fernet), os tokens são gravados criptografados (requer o pacote
+    `cryptography`). Sem a chave, só vão em texto puro para o banco com `allow_plaintext`
+    (TOKEN_STORE_ALLOW_PLAINTEXT, padrão ligado fora do CI); senão ficam só em memória durante a
+    execução (`persistent` False), e a próxima execução renova a partir do ML_REFRESH_TOKEN.
+    """
+
+    def __init__(self, conn: sqlite3.Connection = None, key: str = TOKEN_STORE_KEY,
+                 allow_plaintext: bool = TOKEN_STORE_ALLOW_PLAINTEXT):
+        self._fernet = None
+        self._memory = None
+        if key:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                print("AVISO: TOKEN_STORE_KEY definida, mas o pacote cryptography não está instalado. "
+                      "Tokens OAuth só em memória nesta execução.")
+                self._memory = {}
+            else:
+                self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+        elif not allow_plaintext:
+            print("AVISO: TOKEN_STORE_KEY não definida: os tokens OAuth ficam só em memória nesta execução "
+                  "(o refresh token rotacionado não é salvo). Defina o secret TOKEN_STORE_KEY no workflow.")
+            self._memory = {}
+        self.conn = conn if conn is not None else open_database()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS oauth_tokens ("
+            " client_id TEXT PRIMARY KEY,"
+            " access_token TEXT,"
+            " refresh_token TEXT,"
+            " expires_at REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    @property
+    def persistent(self) -> bool:
+        return self._memory is None
+
+    def _seal(self, value: str | None) -> str | None:
+        if value is None or self._fernet is None:
+            return value
+        return "fernet:" + self._fernet.encrypt(value.encode()).decode()
+
+    def _open(self, value: str | None) -> str | None:
+        if value is None or not value.startswith("fernet:"):
+            return value
+        if self._fernet is None:
+            print("AVISO: token criptografado no banco, mas TOKEN_STORE_KEY não está disponível.")
+            return None
+        from cryptography.fernet import InvalidToken
+        try:
+            return self._fernet.decrypt(value[len("fernet:"):].encode()).decode()
+        except InvalidToken:
+            print("AVISO: TOKEN_STORE_KEY não decifra o token salvo; ignorando o token armazenado.")
+            return None
+
+    def load(self, client_id: str) -> dict | None:
+        """
+        Retorna {"access_token", "refresh_token", "expires_at"} ou None.
+        """
+        if self._memory is not None:
+            return self._memory.get(client_id)
+        row = self.conn.execute(
+            "SELECT access_token, refresh_token, expires_at FROM oauth_tokens WHERE client_id = ?", (client_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"access_token": self._open(row[0]), "refresh_token": self._open(row[1]), "expires_at": row[2]}
+
+    def save(self, client_id: str, access_token: str, refresh_token: str, expires_at: float):
+        if self._memory is not None:
+            self._memory[client_id] = {"access_token": access_token, "refresh_token": refresh_token,
+                                       "expires_at": expires_at}
+            return
+        self.conn.execute(
+            "INSERT INTO oauth_tokens (client_id, access_token, refresh_token, expires_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(client_id) DO UPDATE SET access_token = excluded.access_token,"
+            " refresh_token = excluded.refresh_token, expires_at = excluded.expires_at,"
+            " updated_at = excluded.updated_at",
+            (client_id, self._seal(access_token), self._seal(refresh_token), expires_at, time.time()),
+        )
+        self.conn.commit()
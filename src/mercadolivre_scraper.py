@@ -0,0 +1,190 @@
+import asyncio
+import os
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.metrics import run_metrics
+from src.rate_limiter import TokenBucket, backoff_delay
+
+# --- Constantes para scraping ---
+OFFERS_URL_TEMPLATE = os.getenv("OFFERS_URL_TEMPLATE", "https://www.mercadolivre.com.br/ofertas?page={page}")
+MAX_RETRIES = 3
+TIMEOUT_SECONDS = 60
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 15.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+METRICS_ENDPOINT = "mercadolivre_page"
+SCRAPING_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
+}
+
+
+def offer_page_urls(pages: int, template: str = OFFERS_URL_TEMPLATE) -> list[str]:
+    """
+    Monta as URLs das páginas de ofertas (1..pages).
+    """
+    return [template.format(page=i) for i in range(1, pages + 1)]
+
+
+class FetchResult(NamedTuple):
+    """Resposta de um GET condicional: `body` é None quando o servidor responde 304."""
+    body: str | bytes | None
+    etag: str | None
+    last_modified: str | None
+    not_modified: bool = False
+
+
+class _HostLimiter:
+    """Limites de cortesia de um host: requisições em voo e requisições por segundo."""
+
+    def __init__(self, max_in_flight: int, requests_per_second: float):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.bucket = TokenBucket(requests_per_second, capacity=1)
+
+
+class AsyncCrawler:
+    """
+    Crawler assíncrono com uma única sessão HTTP keep-alive compartilhada.
+
+    - `concurrency`: limite global de requisições simultâneas.
+    - `host_max_in_flight` / `host_rps`: cortesia por host.
+    - Retries com backoff exponencial com jitter; a espera de uma página não bloqueia as demais.
+    - `raw`: devolve o corpo em bytes, sem decodificar (ex.: para parsear num pool de processos).
+
+    Uso:
+        async with AsyncCrawler(concurrency=8) as crawler:
+            pages = await crawler.fetch_all(urls)
+    """
+
+    def __init__(self, concurrency: int = 8, host_max_in_flight: int = 4, host_rps: float = 4.0,
+                 max_retries: int = MAX_RETRIES, timeout: float = TIMEOUT_SECONDS,
+                 headers: dict = None, retry_base_delay: float = RETRY_BASE_DELAY, raw: bool = False):
+        self.concurrency = concurrency
+        self.host_max_in_flight = host_max_in_flight
+        self.host_rps = host_rps
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.headers = headers or SCRAPING_HEADERS
+        self.retry_base_delay = retry_base_delay
+        self.raw = raw
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "bytes": 0, "not_modified": 0}
+        self._session = None
+        self._global = None
+        self._hosts = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.host_max_in_flight,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._global = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _host_limiter(self, url: str) -> _HostLimiter:
+        host = urlsplit(url).netloc
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = _HostLimiter(self.host_max_in_flight, self.host_rps)
+            self._hosts[host] = limiter
+        return limiter
+
+    async def fetch(self, url: str) -> str | bytes | None:
+        """
+        Baixa uma página. Retorna o HTML (bytes se `raw`) ou None se todas as tentativas falharem.
+        """
+        result = await self._get(url)
+        return result.body if result is not None else None
+
+    async def fetch_conditional(self, url: str, etag: str = None, last_modified: str = None) -> FetchResult | None:
+        """
+        GET com If-None-Match / If-Modified-Since. Retorna None se todas as tentativas falharem.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return await self._get(url, headers)
+
+    async def _get(self, url: str, headers: dict = None) -> FetchResult | None:
+        host = self._host_limiter(url)
+        for attempt in range(self.max_retries):
+            retryable = True
+            # A espera pela taxa do host e pela vaga no host acontece antes da vaga global:
+            # um host lento não segura as vagas das páginas dos outros hosts.
+            await host.bucket.acquire()
+            async with host.semaphore, self._global:
+                self.stats["requests"] += 1
+                start = time.perf_counter()
+                status = "error"
+                try:
+                    async with self._session.get(url, headers=headers) as response:
+                        status = response.status
+                        etag = response.headers.get("ETag")
+                        last_modified = response.headers.get("Last-Modified")
+                        if response.status == 200:
+                            body = await (response.read() if self.raw else response.text())
+                            self.stats["bytes"] += len(body)
+                            run_metrics.observe_request(METRICS_ENDPOINT, time.perf_counter() - start, status)
+                            run_metrics.inc("bytes_downloaded", len(body), service="mercadolivre")
+                            return FetchResult(body, etag, last_modified)
+                        if response.status == 304 and headers:
+                            self.stats["not_modified"] += 1
+                            run_metrics.observe_request(METRICS_ENDPOINT, time.perf_counter() - start, status)
+                            return FetchResult(None, etag or headers.get("If-None-Match"),
+                                               last_modified or headers.get("If-Modified-Since"), True)
+                        error = f"HTTP {response.status}"
+                        retryable = response.status in RETRYABLE_STATUS
+                except asyncio.TimeoutError:
+                    error = "Timeout"
+                except aiohttp.ClientError as e:
+                    error = str(e) or e.__class__.__name__
+                run_metrics.observe_request(METRICS_ENDPOINT, time.perf_counter() - start, status)
+                if status == 429:
+                    run_metrics.inc("throttled", service="mercadolivre")
+
+            # A espera do retry acontece fora dos semáforos para liberar a vaga a outras páginas.
+            if not retryable or attempt == self.max_retries - 1:
+                print(f"All attempts failed for {url} (attempt {attempt + 1}/{self.max_retries}). Error: {error}")
+                self.stats["failures"] += 1
+                return None
+            delay = backoff_delay(attempt, self.retry_base_delay, RETRY_MAX_DELAY)
+            print(f"Attempt {attempt + 1}/{self.max_retries}: {error} accessing {url}. Retrying in {delay:.1f}s")
+            self.stats["retries"] += 1
+            run_metrics.inc("retries", service="mercadolivre")
+            await asyncio.sleep(delay)
+        return None
+
+    async def fetch_all(self, urls: list[str]) -> list[str | None]:
+        """
+        Baixa todas as URLs concorrentemente, preservando a ordem de entrada.
+        """
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def iter_pages(self, urls: list[str]):
+        """
+        Gera (url, html) à medida que cada página termina de baixar.
+        """
+        async def _fetch(url):
+            return url, await self.fetch(url)
+
+        for future in asyncio.as_completed([_fetch(url) for url in urls]):
+            yield await future
@@ -0,0 +1,245 @@
+"""
+Métricas da execução: tempo por estágio, contadores e histogramas de latência por endpoint HTTP.
+
+Os módulos registram no objeto global `run_metrics`; no fim da execução o main grava
+um relatório JSON e outro em texto Prometheus (METRICS_REPORT_PATH / METRICS_PROMETHEUS_PATH).
+
+Perfil opcional por estágio: PROFILE_STAGES="parse,rank" (ou "all") liga o cProfile
+e/ou o tracemalloc (PROFILE_MODE="cprofile,tracemalloc") só dentro desses estágios;
+os .prof vão para PROFILE_DIR. Em estágios assíncronos o cProfile também registra as
+outras corrotinas que rodam enquanto o estágio espera I/O.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+METRICS_REPORT_PATH = os.getenv("METRICS_REPORT_PATH", "run_report.json")
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", "run_report.prom")
+PROFILE_STAGES = {stage.strip() for stage in os.getenv("PROFILE_STAGES", "").split(",") if stage.strip()}
+PROFILE_MODE = {mode.strip() for mode in os.getenv("PROFILE_MODE", "cprofile,tracemalloc").split(",") if mode.strip()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", "run_profiles")
+PROFILE_TOP_FUNCTIONS = 15
+
+# Limites (segundos) dos buckets dos histogramas de latência.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histograma cumulativo no formato Prometheus."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+
+    def cumulative(self) -> list:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """Estimativa pelo limite superior do bucket (como histogram_quantile, sem interpolação)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in zip(self.buckets, self.cumulative()):
+            if total >= target:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 6),
+            "buckets": dict(zip([str(bound) for bound in self.buckets], self.cumulative())),
+        }
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _prom_escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prom_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_prom_escape(value)}"' for name, value in pairs) + "}"
+
+
+class RunMetrics:
+    """
+    Registro das métricas de uma execução.
+
+    - `inc(nome, valor, **labels)`: contador.
+    - `observe_request(endpoint, segundos, status)`: latência e status de uma chamada HTTP.
+    - `with stage(nome):` soma o tempo (e, se configurado, o perfil) de um estágio.
+    """
+
+    def __init__(self, profile_stages: set = None, profile_mode: set = None, profile_dir: str = PROFILE_DIR):
+        self.profile_stages = PROFILE_STAGES if profile_stages is None else profile_stages
+        self.profile_mode = PROFILE_MODE if profile_mode is None else profile_mode
+        self.profile_dir = profile_dir
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.stages = {}
+        self._profilers = {}
+        self._profiling = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels_key(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def observe_request(self, endpoint: str, seconds: float, status: int | str):
+        self.observe("http_request_duration_seconds", seconds, endpoint=endpoint)
+        self.inc("http_requests", endpoint=endpoint, status=status)
+
+    def _should_profile(self, name: str) -> bool:
+        return bool(self.profile_stages) and ("all" in self.profile_stages or name in self.profile_stages)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Soma o tempo de parede do bloco ao estágio `name`; pode envolver código síncrono ou um `await`.
+        """
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"seconds": 0.0, "calls": 0, "max_seconds": 0.0}
+        profiler = None
+        trace_memory = False
+        # Um único profiler ativo por vez: estágios aninhados ficam no perfil do externo.
+        if self._should_profile(name) and not self._profiling:
+            if "cprofile" in self.profile_mode:
+                profiler = self._profilers.setdefault(name, cProfile.Profile())
+                profiler.enable()
+            if "tracemalloc" in self.profile_mode:
+                trace_memory = True
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+            self._profiling = profiler is not None or trace_memory
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                entry["peak_traced_bytes"] = max(entry.get("peak_traced_bytes", 0), peak)
+            if profiler is not None or trace_memory:
+                self._profiling = False
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+    def _dump_profiles(self) -> dict:
+        profiles = {}
+        if not self._profilers:
+            return profiles
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profiler in self._profilers.items():
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            profiles[name] = {"path": path, "top": output.getvalue().strip().splitlines()[-PROFILE_TOP_FUNCTIONS:]}
+        return profiles
+
+    def report(self) -> dict:
+        counters = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        histograms = {}
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            histograms.setdefault(name, []).append({"labels": dict(labels), **histogram.as_dict()})
+        stages = {name: {key: round(value, 6) if isinstance(value, float) else value for key, value in entry.items()}
+                  for name, entry in self.stages.items()}
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": round(time.time() - self.started_at, 3),
+            "stages": stages,
+            "counters": counters,
+            "histograms": histograms,
+            "profiles": self._dump_profiles(),
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# TYPE bot_stage_seconds_total counter",
+            *(f'bot_stage_seconds_total{{stage="{name}"}} {entry["seconds"]:.6f}' for name, entry in self.stages.items()),
+            "# TYPE bot_stage_calls_total counter",
+            *(f'bot_stage_calls_total{{stage="{name}"}} {entry["calls"]}' for name, entry in self.stages.items()),
+        ]
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f"bot_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            metric = f"bot_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, total in zip(histogram.buckets, histogram.cumulative()):
+                lines.append(f"{metric}_bucket{_prom_labels(labels, (('le', f'{bound:g}'),))} {total}")
+            lines.append(f"{metric}_bucket{_prom_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, json_path: str = METRICS_REPORT_PATH, prometheus_path: str = METRICS_PROMETHEUS_PATH) -> dict:
+        report = self.report()
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if prometheus_path:
+            with open(prometheus_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+        return report
+
+    def stage_summary(self) -> str:
+        return " ".join(f"{name}={entry['seconds']:.2f}s/{entry['calls']}" for name, entry in self.stages.items())
+
+
+run_metrics = RunMetrics()
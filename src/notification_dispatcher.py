@@ -0,0 +1,338 @@
+"""
+Envio multicanal das ofertas: Telegram e WhatsApp (Zatten) em paralelo.
+
+Cada oferta é formatada uma vez por canal. Cada destino (chat do Telegram, número de
+WhatsApp) tem sua própria fila e worker, e cada canal seu limitador de taxa e sua fila
+de retry: um canal lento ou fora do ar só atrasa as próprias filas, nunca as dos outros.
+O resultado de cada (oferta, canal, destino) vai para o DeliveryLog.
+"""
+import abc
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, NamedTuple
+
+from src.database_manager import DeliveryLog
+from src.metrics import run_metrics
+from src.rate_limiter import TokenBucket, backoff_delay
+from src.telegram_notifier import TELEGRAM_ALBUM_MAX, TelegramNotifier
+from src.zatten_notifier import ZATTEN_BURST, ZATTEN_RATE, ZattenNotifier
+
+DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "4"))
+DISPATCH_RETRY_BASE_DELAY = float(os.getenv("DISPATCH_RETRY_BASE_DELAY", "2"))
+
+
+class SendOutcome(NamedTuple):
+    """Resultado de uma tentativa de envio de uma mensagem."""
+    ok: bool
+    error: str | None = None
+    retryable: bool = False
+    retry_after: float | None = None
+    # A requisição pode ter chegado (timeout, conexão caída): não é repetida, para não duplicar.
+    uncertain: bool = False
+
+
+@dataclass
+class DeliveryResult:
+    item_id: str | None
+    channel: str
+    target: str
+    ok: bool
+    attempts: int
+    error: str | None
+    seconds: float
+    uncertain: bool = False
+
+
+class NotificationChannel(abc.ABC):
+    """
+    Um serviço de envio. Subclasses implementam `format` (linha da oferta -> mensagem do
+    canal) e `deliver` (envia um lote de até `batch_size` mensagens a um destino e devolve
+    um SendOutcome por mensagem).
+
+    `rate`/`burst` limitam o canal inteiro (todos os destinos); rate <= 0 desliga o limite.
+    """
+    name = "canal"
+
+    def __init__(self, targets: list, rate: float = 0, burst: float = None, batch_size: int = 1,
+                 max_attempts: int = DISPATCH_MAX_ATTEMPTS, retry_base_delay: float = DISPATCH_RETRY_BASE_DELAY):
+        self.targets = list(targets)
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_delay = retry_base_delay
+
+    @abc.abstractmethod
+    def format(self, row: dict):
+        ...
+
+    @abc.abstractmethod
+    async def deliver(self, target: str, messages: list) -> list[SendOutcome]:
+        ...
+
+    async def close(self):
+        pass
+
+
+def _telegram_outcome(response: dict) -> SendOutcome:
+    if response.get("ok"):
+        return SendOutcome(True)
+    error = response.get("description") or response.get("error")
+    if response.get("uncertain"):
+        return SendOutcome(False, error, uncertain=True)
+    code = response.get("error_code")
+    # Sem error_code: a conexão nem abriu, vale tentar de novo.
+    retryable = code is None or code == 429 or code >= 500
+    retry_after = (response.get("parameters") or {}).get("retry_after")
+    return SendOutcome(False, error, retryable, retry_after)
+
+
+class TelegramChannel(NotificationChannel):
+    """
+    Canal do Telegram sobre o TelegramNotifier, que já limita a taxa por chat e no total
+    (por isso o canal não tem limitador próprio). Com `album_size` > 1, as ofertas vão em álbum.
+
+    Os retries ficam só no dispatcher: o notifier tem que fazer uma tentativa por chamada
+    (`max_retries=1`), senão cada tentativa do dispatcher viraria várias requisições.
+    """
+    name = "telegram"
+
+    def __init__(self, notifier: TelegramNotifier, chat_ids: list, formatter: Callable[[dict], str],
+                 album_size: int = 1, **kwargs):
+        if notifier.max_retries > 1:
+            raise ValueError("TelegramChannel: crie o TelegramNotifier com max_retries=1 (o retry é do dispatcher)")
+        super().__init__(chat_ids, batch_size=min(album_size, TELEGRAM_ALBUM_MAX), **kwargs)
+        self.notifier = notifier
+        self.formatter = formatter
+
+    def format(self, row: dict) -> tuple:
+        return row['Imagem'], self.formatter(row)
+
+    async def deliver(self, target: str, messages: list) -> list[SendOutcome]:
+        if len(messages) == 1:
+            image_url, text = messages[0]
+            return [_telegram_outcome(await self.notifier.send_message(target, text, image_url=image_url))]
+        # Um lote tem no máximo TELEGRAM_ALBUM_MAX itens: um único álbum.
+        responses = await self.notifier.send_album(target, messages)
+        return [_telegram_outcome(responses[0])] * len(messages)
+
+    async def close(self):
+        await self.notifier.close()
+
+
+class ZattenChannel(NotificationChannel):
+    """
+    Canal de WhatsApp pelo Zatten: uma mensagem por oferta, limitada a ZATTEN_RATE mensagens/s.
+    """
+    name = "whatsapp"
+
+    def __init__(self, client: ZattenNotifier, numbers: list, formatter: Callable[[dict], str],
+                 rate: float = ZATTEN_RATE, burst: float = ZATTEN_BURST, **kwargs):
+        super().__init__(numbers, rate=rate, burst=burst, **kwargs)
+        self.client = client
+        self.formatter = formatter
+
+    def format(self, row: dict) -> tuple:
+        return row['Imagem'], self.formatter(row)
+
+    async def deliver(self, target: str, messages: list) -> list[SendOutcome]:
+        outcomes = []
+        for image_url, text in messages:
+            response = await self.client.send_message(target, text, image_url=image_url)
+            outcomes.append(SendOutcome(response["ok"], response.get("error"), response.get("retryable", False),
+                                        response.get("retry_after"), response.get("uncertain", False)))
+        return outcomes
+
+    async def close(self):
+        await self.client.close()
+
+
+@dataclass
+class _Job:
+    """Um lote de mensagens para um destino; `pending` são os índices ainda não entregues."""
+    channel: NotificationChannel
+    target: str
+    rows: list
+    messages: list
+    future: asyncio.Future
+    pending: list = None
+    results: list = None
+    attempts: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def __post_init__(self):
+        self.pending = list(range(len(self.rows)))
+        self.results = [None] * len(self.rows)
+
+
+class NotificationDispatcher:
+    """
+    Distribui cada oferta para todos os canais ao mesmo tempo.
+
+    `dispatch(rows)` formata as linhas uma vez por canal, enfileira um job por destino
+    e retorna quando cada linha tiver sido entregue por algum canal (ou todos tiverem
+    desistido), sem esperar os canais mais lentos. Cada destino tem um worker; falhas temporárias voltam para
+    a fila do destino depois do backoff (ou do Retry-After), sem bloquear os jobs seguintes.
+    Este é o único nível de retry dos canais. Envios de resultado incerto (timeout, conexão
+    caída depois do envio) não são repetidos: ficam marcados como incertos no DeliveryLog.
+    Uma oferta conta como enviada se pelo menos um canal a entregou; o resultado por canal
+    fica em `log` (DeliveryLog) e em `stats`.
+
+    Uso:
+        async with NotificationDispatcher([TelegramChannel(...), ZattenChannel(...)], log) as dispatcher:
+            enviadas = await dispatcher.dispatch(linhas)
+    """
+
+    def __init__(self, channels: list, log: DeliveryLog = None):
+        self.channels = [channel for channel in channels if channel.targets]
+        self.log = log
+        self.stats = {channel.name: {"delivered": 0, "failed": 0, "uncertain": 0, "retries": 0}
+                      for channel in self.channels}
+        self._lanes = {}
+        self._retries = set()
+        self._jobs = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Espera as filas e os retries pendentes, encerra os workers e fecha os canais.
+        """
+        # Um job com retry agendado não está em nenhuma fila: espera cada job terminar de fato.
+        while self._jobs:
+            await asyncio.wait(list(self._jobs))
+        for _, worker in self._lanes.values():
+            worker.cancel()
+        self._lanes = {}
+        for channel in self.channels:
+            await channel.close()
+
+    def _lane(self, channel: NotificationChannel, target: str) -> asyncio.Queue:
+        lane = self._lanes.get((channel.name, target))
+        if lane is None:
+            queue = asyncio.Queue()
+            lane = self._lanes[(channel.name, target)] = (queue, asyncio.create_task(self._worker(queue)))
+        return lane[0]
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            job = await queue.get()
+            try:
+                await self._attempt(job, queue)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def _attempt(self, job: _Job, queue: asyncio.Queue):
+        channel = job.channel
+        job.attempts += 1
+        for _ in job.pending:
+            await channel.bucket.acquire()
+        try:
+            outcomes = await channel.deliver(job.target, [job.messages[i] for i in job.pending])
+        except Exception as e:
+            # Erro inesperado no meio do envio: não dá para saber o que saiu.
+            outcomes = [SendOutcome(False, f"{e.__class__.__name__}: {e}", uncertain=True)] * len(job.pending)
+
+        retry, delay = [], 0.0
+        for i, outcome in zip(job.pending, outcomes):
+            if not outcome.ok and outcome.retryable and job.attempts < channel.max_attempts:
+                retry.append(i)
+                delay = max(delay, outcome.retry_after or 0)
+                continue
+            job.results[i] = DeliveryResult(job.rows[i].get('item_id'), channel.name, job.target, outcome.ok,
+                                            job.attempts, outcome.error, time.perf_counter() - job.started,
+                                            outcome.uncertain)
+        if retry:
+            job.pending = retry
+            self.stats[channel.name]["retries"] += len(retry)
+            run_metrics.inc("retries", len(retry), service=channel.name)
+            delay = max(delay, backoff_delay(job.attempts - 1, channel.retry_base_delay))
+            task = asyncio.create_task(self._requeue(queue, job, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        self._finish(job)
+
+    @staticmethod
+    async def _requeue(queue: asyncio.Queue, job: _Job, delay: float):
+        await asyncio.sleep(delay)
+        queue.put_nowait(job)
+
+    def _finish(self, job: _Job):
+        stats = self.stats[job.channel.name]
+        for result in job.results:
+            if result.ok:
+                stats["delivered"] += 1
+            else:
+                stats["uncertain" if result.uncertain else "failed"] += 1
+            status = "ok" if result.ok else "uncertain" if result.uncertain else "failed"
+            run_metrics.inc("deliveries", channel=result.channel, status=status)
+            run_metrics.observe("delivery_seconds", result.seconds, channel=result.channel)
+        if self.log is not None:
+            self.log.record([(result.item_id, result.channel, result.target, result.ok, result.attempts,
+                              result.error, result.seconds, result.uncertain) for result in job.results])
+        if not job.future.done():
+            job.future.set_result(job.results)
+
+    async def dispatch(self, rows: list) -> list[bool]:
+        """
+        Envia as linhas por todos os canais. Retorna, por linha, se algum canal a entregou ou
+        pode ter entregue (resultado incerto): nos dois casos a oferta não deve ser reenviada.
+
+        Retorna assim que cada linha estiver decidida (entregue por um canal, ou com todos os
+        canais já finalizados); os envios dos canais mais lentos continuam nas filas deles e
+        `close()` espera por eles.
+        """
+        if not self.channels or not rows:
+            return [False] * len(rows)
+        loop = asyncio.get_running_loop()
+        decided = loop.create_future()
+        delivered = [False] * len(rows)
+        remaining = [sum(len(channel.targets) for channel in self.channels)] * len(rows)
+        undecided = len(rows)
+
+        def settle(start: int, future: asyncio.Future):
+            nonlocal undecided
+            if future.exception() is not None:
+                if not decided.done():
+                    decided.set_exception(future.exception())
+                return
+            for offset, result in enumerate(future.result()):
+                i = start + offset
+                was_open = not delivered[i] and remaining[i] > 0
+                remaining[i] -= 1
+                delivered[i] = delivered[i] or result.ok or result.uncertain
+                if was_open and (delivered[i] or remaining[i] == 0):
+                    undecided -= 1
+            if undecided == 0 and not decided.done():
+                decided.set_result(list(delivered))
+
+        # Tudo é enfileirado antes do primeiro await: a ordem das ofertas se mantém em cada fila.
+        for channel in self.channels:
+            messages = [channel.format(row) for row in rows]
+            for target in channel.targets:
+                queue = self._lane(channel, target)
+                for start in range(0, len(rows), channel.batch_size):
+                    job = _Job(channel, target, rows[start:start + channel.batch_size],
+                               messages[start:start + channel.batch_size], loop.create_future())
+                    job.future.add_done_callback(partial(settle, start))
+                    self._jobs.add(job.future)
+                    job.future.add_done_callback(self._jobs.discard)
+                    queue.put_nowait(job)
+        return await decided
+
+    def summary(self) -> str:
+        return " ".join(
+            f"{name}(entregues={stats['delivered']} falhas={stats['failed']} incertos={stats['uncertain']} "
+            f"retries={stats['retries']})"
+            for name, stats in self.stats.items()
+        ) or "nenhum canal configurado"
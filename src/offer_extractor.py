@@ -0,0 +1,389 @@
+"""
+Extrator de cards de oferta das páginas /ofertas do Mercado Livre.
+
+Cada página é parseada uma única vez pelo backend mais rápido disponível
+(selectolax > lxml > BeautifulSoup) e os cards viram registros `Offer`
+com preços em centavos inteiros. Em crawls grandes o parse pode rodar num
+ProcessPoolExecutor (extract_offers_in_pool), usando mais de um núcleo.
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import cache
+from urllib.parse import urlsplit
+
+# Os parsers são importados só quando o backend é usado pela primeira vez (ver _load_backend):
+# quem usa o selectolax não paga o import do lxml nem do BeautifulSoup.
+LexborHTMLParser = None
+etree = lxml_html = None
+BeautifulSoup = None
+
+# Classes usadas na marcação dos cards. Atributos com várias classes são comparados
+# pela string completa, como fazia o find(class_='...') do scraping original.
+CARD_CLASS = 'andes-card poly-card poly-card--grid-card poly-card--large andes-card--flat andes-card--padding-0 andes-card--animated'
+PRICE_DE_CLASS = 'andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma'
+PRICE_POR_CLASS = 'andes-money-amount andes-money-amount--cents-superscript'
+IMAGE_CLASS = 'poly-component__picture'
+TITLE_WRAPPER_CLASS = 'poly-component__title-wrapper'
+TITLE_LINK_CLASS = 'poly-component__title'
+HIGHLIGHT_CLASS = 'poly-component__highlight'
+INSTALLMENTS_CLASS = 'poly-price__installments'
+FRACTION_CLASS = 'andes-money-amount__fraction'
+CENTS_CLASS = 'andes-money-amount__cents'
+
+ITEM_ID_PATTERN = re.compile(r'MLB-?(\d+)', re.IGNORECASE)
+
+
+def canonical_item_id(url: str | None) -> str | None:
+    """
+    ID canônico do produto ("MLB123456") a partir da URL, ignorando parâmetros de rastreamento.
+    O caminho tem prioridade sobre a query; sem ID, usa a URL sem query/fragmento.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url)
+    match = ITEM_ID_PATTERN.search(parts.path) or ITEM_ID_PATTERN.search(parts.query)
+    if match:
+        return f"MLB{match.group(1)}"
+    return f"{parts.netloc}{parts.path}" or url
+
+
+@dataclass(slots=True)
+class Offer:
+    """Um card de oferta. Preços em centavos (None quando ausentes ou inválidos)."""
+    imagem: str | None
+    nome: str | None
+    preco_de: int | None
+    preco_por: int | None
+    link: str | None
+    flag: str | None
+    parcelas: str = ''
+
+    @property
+    def item_id(self) -> str | None:
+        return canonical_item_id(self.link)
+
+    def to_row(self) -> dict:
+        """
+        Linha no formato do DataFrame do scraping (preços em reais).
+        """
+        return {
+            'Imagem': self.imagem,
+            'Nome': self.nome,
+            'Preço De': self.preco_de / 100 if self.preco_de is not None else None,
+            'Preço Por': self.preco_por / 100 if self.preco_por is not None else None,
+            'Link': self.link,
+            'flag': self.flag,
+            'Parcelas': self.parcelas,
+        }
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def price_to_cents(fraction: str, cents: str) -> int | None:
+    """
+    Converte as partes do andes-money-amount ("1.299", "90") em centavos.
+    """
+    reais = fraction.replace('.', '').replace(',', '')
+    if not reais and cents == '00':
+        return None
+    if not (reais or '0').isdigit() or not cents.isdigit():
+        return None
+    return int(reais or 0) * 100 + int(cents.ljust(2, '0')[:2])
+
+
+def _image_src(src: str | None, data_src: str | None) -> str | None:
+    # Imagens lazy-load trazem um placeholder data:image no src e a URL real em data-src.
+    if src and src.startswith('data:image'):
+        return data_src
+    return src
+
+
+# --- Backend selectolax (lexbor) ---
+_SEP = '\x1f'
+
+
+def _sx_text(node, separator: str = '') -> str:
+    parts = node.text(deep=True, separator=_SEP, strip=True).split(_SEP)
+    return separator.join(part for part in parts if part)
+
+
+def _sx_price(node) -> int | None:
+    if node is None:
+        return None
+    fraction = node.css_first(f'span.{FRACTION_CLASS}')
+    cents = node.css_first(f'span.{CENTS_CLASS}')
+    return price_to_cents(_sx_text(fraction) if fraction else '', _sx_text(cents) if cents else '00')
+
+
+def _extract_selectolax(html: str | bytes) -> list[Offer]:
+    tree = LexborHTMLParser(html)
+    offers = []
+    for card in tree.css(f'div[class="{CARD_CLASS}"]'):
+        img = card.css_first(f'img.{IMAGE_CLASS}')
+        title = card.css_first(f'h3.{TITLE_WRAPPER_CLASS}')
+        link = card.css_first(f'a.{TITLE_LINK_CLASS}')
+        flag = card.css_first(f'span.{HIGHLIGHT_CLASS}')
+        installments = card.css_first(f'span.{INSTALLMENTS_CLASS}')
+        offers.append(Offer(
+            imagem=_image_src(img.attributes.get('src'), img.attributes.get('data-src')) if img else None,
+            nome=title.text(deep=True) if title else None,
+            preco_de=_sx_price(card.css_first(f's[class="{PRICE_DE_CLASS}"]')),
+            preco_por=_sx_price(card.css_first(f'span[class="{PRICE_POR_CLASS}"]')),
+            link=link.attributes.get('href') if link else None,
+            flag=_sx_text(flag) if flag else None,
+            parcelas=_sx_text(installments, ' ') if installments else '',
+        ))
+    return offers
+
+
+# --- Backend lxml (XPath pré-compilado) ---
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _compile_xpaths():
+    global _X_CARDS, _X_IMAGE, _X_TITLE, _X_PRICE_DE, _X_PRICE_POR, _X_FRACTION, _X_CENTS, _X_LINK, \
+        _X_HIGHLIGHT, _X_INSTALLMENTS
+    _X_CARDS = etree.XPath(f"//div[@class='{CARD_CLASS}']")
+    _X_IMAGE = etree.XPath(f".//img[{_has_class(IMAGE_CLASS)}]")
+    _X_TITLE = etree.XPath(f".//h3[{_has_class(TITLE_WRAPPER_CLASS)}]")
+    _X_PRICE_DE = etree.XPath(f".//s[@class='{PRICE_DE_CLASS}']")
+    _X_PRICE_POR = etree.XPath(f".//span[@class='{PRICE_POR_CLASS}']")
+    _X_FRACTION = etree.XPath(f".//span[{_has_class(FRACTION_CLASS)}]")
+    _X_CENTS = etree.XPath(f".//span[{_has_class(CENTS_CLASS)}]")
+    _X_LINK = etree.XPath(f".//a[{_has_class(TITLE_LINK_CLASS)}]")
+    _X_HIGHLIGHT = etree.XPath(f".//span[{_has_class(HIGHLIGHT_CLASS)}]")
+    _X_INSTALLMENTS = etree.XPath(f".//span[{_has_class(INSTALLMENTS_CLASS)}]")
+
+
+def _lx_first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def _lx_text(node, separator: str = '') -> str:
+    return separator.join(part.strip() for part in node.itertext() if part.strip())
+
+
+def _lx_price(node) -> int | None:
+    if node is None:
+        return None
+    fraction = _lx_first(_X_FRACTION, node)
+    cents = _lx_first(_X_CENTS, node)
+    return price_to_cents(_lx_text(fraction) if fraction is not None else '',
+                          _lx_text(cents) if cents is not None else '00')
+
+
+def _extract_lxml(html: str | bytes) -> list[Offer]:
+    tree = lxml_html.document_fromstring(html)
+    offers = []
+    for card in _X_CARDS(tree):
+        img = _lx_first(_X_IMAGE, card)
+        title = _lx_first(_X_TITLE, card)
+        link = _lx_first(_X_LINK, card)
+        flag = _lx_first(_X_HIGHLIGHT, card)
+        installments = _lx_first(_X_INSTALLMENTS, card)
+        offers.append(Offer(
+            imagem=_image_src(img.get('src'), img.get('data-src')) if img is not None else None,
+            nome=''.join(title.itertext()) if title is not None else None,
+            preco_de=_lx_price(_lx_first(_X_PRICE_DE, card)),
+            preco_por=_lx_price(_lx_first(_X_PRICE_POR, card)),
+            link=link.get('href') if link is not None else None,
+            flag=_lx_text(flag) if flag is not None else None,
+            parcelas=_lx_text(installments, ' ') if installments is not None else '',
+        ))
+    return offers
+
+
+# --- Backend BeautifulSoup (fallback) ---
+def _bs_price(node) -> int | None:
+    if node is None:
+        return None
+    fraction = node.find('span', class_=FRACTION_CLASS)
+    cents = node.find('span', class_=CENTS_CLASS)
+    return price_to_cents(fraction.get_text(strip=True) if fraction else '',
+                          cents.get_text(strip=True) if cents else '00')
+
+
+def _extract_bs4(html: str | bytes) -> list[Offer]:
+    soup = BeautifulSoup(html, 'html.parser')
+    offers = []
+    for card in soup.find_all('div', class_=CARD_CLASS):
+        img = card.find('img', class_=IMAGE_CLASS)
+        title = card.find('h3', class_=TITLE_WRAPPER_CLASS)
+        link = card.find('a', class_=TITLE_LINK_CLASS)
+        flag = card.find('span', class_=HIGHLIGHT_CLASS)
+        installments = card.find('span', class_=INSTALLMENTS_CLASS)
+        offers.append(Offer(
+            imagem=_image_src(img.get('src'), img.get('data-src')) if img else None,
+            nome=title.text if title else None,
+            preco_de=_bs_price(card.find('s', class_=PRICE_DE_CLASS)),
+            preco_por=_bs_price(card.find('span', class_=PRICE_POR_CLASS)),
+            link=link.get('href') if link else None,
+            flag=flag.get_text(strip=True) if flag else None,
+            parcelas=installments.get_text(separator=' ', strip=True) if installments else '',
+        ))
+    return offers
+
+
+BACKENDS = {
+    'selectolax': _extract_selectolax,
+    'lxml': _extract_lxml,
+    'bs4': _extract_bs4,
+}
+# Módulo que precisa estar instalado para cada backend.
+_BACKEND_MODULES = {'selectolax': 'selectolax', 'lxml': 'lxml', 'bs4': 'bs4'}
+_loaded_backends = set()
+
+
+def _load_backend(name: str):
+    global LexborHTMLParser, etree, lxml_html, BeautifulSoup
+    if name in _loaded_backends:
+        return
+    if name == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+    elif name == 'lxml':
+        from lxml import etree
+        from lxml import html as lxml_html
+        _compile_xpaths()
+    elif name == 'bs4':
+        from bs4 import BeautifulSoup
+    _loaded_backends.add(name)
+
+
+@cache
+def available_backends() -> tuple[str, ...]:
+    """
+    Backends instalados, do mais rápido para o mais lento (sem importá-los).
+    Calculado uma vez: o find_spec de um pacote não importado varre o sys.path.
+    """
+    return tuple(name for name in BACKENDS if importlib.util.find_spec(_BACKEND_MODULES[name]) is not None)
+
+
+def extract_offers(html: str | bytes, backend: str = None) -> list[Offer]:
+    """
+    Extrai as ofertas de uma página. Sem `backend`, usa o mais rápido disponível.
+    """
+    if backend is None:
+        backends = available_backends()
+        if not backends:
+            raise RuntimeError("Nenhum parser HTML instalado (selectolax, lxml ou beautifulsoup4).")
+        backend = backends[0]
+    extractor = BACKENDS.get(backend)
+    if extractor is None:
+        raise ValueError(f"Backend de extração indisponível: {backend}")
+    try:
+        _load_backend(backend)
+    except ImportError:
+        raise ValueError(f"Backend de extração indisponível: {backend}") from None
+    return extractor(html)
+
+
+# --- Cards como trechos de HTML (cache de páginas) ---
+_CARD_OPEN = re.compile(rb'<div class="' + re.escape(CARD_CLASS.encode()) + rb'"')
+_DIV_TAG = re.compile(rb'<(/?)div\b', re.IGNORECASE)
+
+
+def split_cards(html: str | bytes) -> list[bytes]:
+    """
+    Recorta o HTML de cada card (do <div> do card até o </div> que o fecha), na ordem da página,
+    sem montar a árvore. Cada trecho parseado sozinho rende exatamente a oferta daquele card.
+    """
+    if isinstance(html, str):
+        html = html.encode()
+    cards = []
+    position = 0
+    while (match := _CARD_OPEN.search(html, position)) is not None:
+        depth = 0
+        for tag in _DIV_TAG.finditer(html, match.start()):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                position = html.find(b'>', tag.end()) + 1 or len(html)
+                break
+        else:
+            position = len(html)
+        cards.append(html[match.start():position])
+    return cards
+
+
+def count_cards(html: str | bytes) -> int:
+    """
+    Ocorrências da classe dos cards, esteja o atributo onde estiver: se for maior que
+    len(split_cards(html)), a marcação mudou e os trechos não cobrem a página inteira.
+    """
+    return html.count(CARD_CLASS.encode() if isinstance(html, bytes) else CARD_CLASS)
+
+
+# --- Parse em pool de processos ---
+# Tempo máximo para todos os workers do pool subirem e importarem o backend
+PARSE_POOL_START_TIMEOUT = float(os.getenv("PARSE_POOL_START_TIMEOUT", "60"))
+
+
+def extract_offer_batch(html: str | bytes, backend: str = None) -> list[tuple]:
+    """
+    extract_offers para rodar num worker de ProcessPoolExecutor: devolve tuplas com os
+    campos do Offer, na ordem, que custam menos para serializar de volta que os objetos.
+    """
+    return [
+        (offer.imagem, offer.nome, offer.preco_de, offer.preco_por, offer.link, offer.flag, offer.parcelas)
+        for offer in extract_offers(html, backend)
+    ]
+
+
+_worker_barrier = None
+
+
+def _init_parse_worker(backend: str | None, barrier):
+    """
+    Initializer dos workers do pool de parse: importa o backend antes da primeira página.
+    """
+    global _worker_barrier
+    _worker_barrier = barrier
+    backends = available_backends()
+    if backend or backends:
+        _load_backend(backend or backends[0])
+
+
+def _parse_worker_ready(timeout: float) -> int:
+    # Cada chamada prende o seu worker na barreira até todos chegarem: nenhum processo atende
+    # duas delas, então as chamadas só terminam com todos os processos de pé.
+    _worker_barrier.wait(timeout)
+    return os.getpid()
+
+
+def start_parse_pool(workers: int, backend: str = None, timeout: float = PARSE_POOL_START_TIMEOUT) -> ProcessPoolExecutor | None:
+    """
+    Cria o pool de parse e já sobe os `workers` processos, cada um com o backend de parse
+    (`backend` ou o mais rápido instalado) importado (None se workers <= 0).
+    Chame antes de abrir sessões HTTP: o fork acontece sem as threads do aiohttp ativas.
+    """
+    if workers <= 0:
+        return None
+    context = multiprocessing.get_context()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_parse_worker,
+                               initargs=(backend, context.Barrier(workers)))
+    try:
+        for future in [pool.submit(_parse_worker_ready, timeout) for _ in range(workers)]:
+            future.result()
+    except BaseException:
+        pool.shutdown(cancel_futures=True)
+        raise
+    return pool
+
+
+def offers_from_batch(batch: list[tuple]) -> list[Offer]:
+    return [Offer(*fields) for fields in batch]
+
+
+async def extract_offers_in_pool(executor: Executor, html: str | bytes, backend: str = None) -> list[Offer]:
+    """
+    Parseia a página em `executor` sem bloquear o event loop (que segue baixando as próximas).
+    """
+    batch = await asyncio.get_running_loop().run_in_executor(executor, extract_offer_batch, html, backend)
+    return offers_from_batch(batch)
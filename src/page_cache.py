@@ -0,0 +1,231 @@
+"""
+Download condicional e parse incremental das páginas de listagem.
+
+Cada URL baixada fica no PageCache (SQLite) com o ETag/Last-Modified da resposta e o
+fingerprint de cada card (hash do HTML do card sem os parâmetros de rastreamento, que
+mudam a cada requisição). Na execução seguinte:
+
+- a página vai com If-None-Match / If-Modified-Since; num 304 nada é baixado nem parseado;
+- num 200 com os mesmos cards (mesmo fingerprint da página), nada é parseado;
+- senão, só os cards com fingerprint desconhecido são parseados (numa única chamada do
+  extrator, sobre os trechos concatenados) e os demais vêm do cache.
+
+Com PAGE_CACHE_EMIT=changed (padrão), só seguem para o filtro, os links e o ranking as
+ofertas de cards ainda não tratados: novos, alterados, ou cuja oferta não foi descartada
+pelo filtro nem entregue (tratados há mais de HISTORY_RESEND_AFTER_HOURS voltam, como no
+histórico). Com PAGE_CACHE_EMIT=all, seguem todas (o cache economiza só o download e o parse).
+A fronteira do crawl sempre recebe todas as ofertas da página, para a parada antecipada.
+"""
+import hashlib
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import NamedTuple
+
+from src.database_manager import HISTORY_RESEND_AFTER_HOURS, CachedCard, CachedPage, PageCache
+from src.mercadolivre_scraper import AsyncCrawler, FetchResult
+from src.metrics import run_metrics
+from src.offer_extractor import (Offer, count_cards, extract_offer_batch, extract_offers_in_pool,
+                                 offers_from_batch, split_cards)
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE", "1").lower() not in ("0", "false", "no")
+PAGE_CACHE_EMIT = os.getenv("PAGE_CACHE_EMIT") or "changed"  # changed | all
+# Parâmetros de URL que mudam a cada requisição sem o card mudar; ficam fora do fingerprint.
+PAGE_CACHE_VOLATILE_PARAMS = os.getenv(
+    "PAGE_CACHE_VOLATILE_PARAMS", "tracking_id,deal_print_id,c_uid,c_tracking_id,c_id,reco_id,reco_client,sid,wid"
+)
+
+
+def _volatile_pattern(params: str) -> re.Pattern:
+    names = [re.escape(name.strip().encode()) for name in params.split(",") if name.strip()]
+    return re.compile(rb'(?<=[?&;])(?:' + b'|'.join(names) + rb')=[^&"#\s]*&?')
+
+
+_VOLATILE = _volatile_pattern(PAGE_CACHE_VOLATILE_PARAMS)
+
+
+def card_fingerprint(card: bytes) -> str:
+    return hashlib.blake2b(_VOLATILE.sub(b'', card), digest_size=16).hexdigest()
+
+
+def page_fingerprint(card_fingerprints: list) -> str:
+    return hashlib.blake2b(''.join(card_fingerprints).encode(), digest_size=16).hexdigest()
+
+
+def _offer_fields(offer: Offer) -> tuple:
+    return offer.imagem, offer.nome, offer.preco_de, offer.preco_por, offer.link, offer.flag, offer.parcelas
+
+
+class PageOffers(NamedTuple):
+    """Todas as ofertas da página e as que seguem adiante no pipeline."""
+    offers: list
+    pending: list
+
+
+class IncrementalPageParser:
+    """
+    Substitui o par crawler.fetch + extract_offers por `fetch` (GET condicional) e `offers`
+    (parse só do que mudou). `fetch` devolve um FetchResult, que é o "html" repassado pela
+    CrawlFrontier/pipeline até `offers`.
+
+    Quem consome as ofertas chama `mark_handled` com os item_ids descartados pelo filtro ou
+    entregues; as gravações só vão para o banco em `flush()`, ao fim de cada execução.
+
+    Uso:
+        parser = IncrementalPageParser(PageCache(db))
+        async for url, page in frontier.iter_pages(crawler, fetch=partial(parser.fetch, crawler)):
+            page_offers = await parser.offers(url, page)
+            frontier.observe(url, page_offers.offers)
+            ...  # processa page_offers.pending; parser.mark_handled(item_ids) ao entregar
+        parser.flush()
+    """
+
+    def __init__(self, store: PageCache, emit: str = PAGE_CACHE_EMIT,
+                 resend_after_hours: float = HISTORY_RESEND_AFTER_HOURS):
+        if emit not in ("changed", "all"):
+            raise ValueError(f"PAGE_CACHE_EMIT inválido: {emit!r} (use 'changed' ou 'all')")
+        self.store = store
+        self.emit = emit
+        self.resend_after_seconds = resend_after_hours * 3600
+        self.stats = {}
+        self.reset()
+
+    def reset(self):
+        self.stats = {"pages": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "uncached": 0,
+                      "cards_reused": 0, "cards_parsed": 0, "cards_pending": 0, "cards_handled": 0,
+                      "bytes_downloaded": 0, "bytes_saved": 0, "parse_seconds": 0.0, "parse_seconds_saved": 0.0}
+        self._known = {}
+        # item_id -> fingerprints dos cards emitidos nesta execução (para o mark_handled)
+        self._fingerprints = defaultdict(set)
+
+    async def fetch(self, crawler: AsyncCrawler, url: str) -> FetchResult | None:
+        """
+        Baixa `url` com os validadores da última versão (só se os cards dela ainda estão no cache).
+        """
+        cached = self.store.get_page(url)
+        if cached is not None:
+            cards = self.store.get_cards(cached.cards)
+            if len(cards) == len(set(cached.cards)):
+                self._known[url] = (cached, cards)
+                return await crawler.fetch_conditional(url, cached.etag, cached.last_modified)
+        self._known.pop(url, None)
+        return await crawler.fetch_conditional(url)
+
+    async def offers(self, url: str, page: FetchResult, executor: Executor = None,
+                     backend: str = None) -> PageOffers:
+        """
+        Ofertas da página e as que seguem adiante: as dos cards não tratados (emit="changed") ou todas (emit="all").
+        """
+        self.stats["pages"] += 1
+        cached, known = self._known.pop(url, (None, {}))
+        if page.not_modified:
+            self._count("not_modified", cached.size, cached.parse_seconds)
+            self.store.put_page(cached._replace(etag=page.etag, last_modified=page.last_modified))
+            return self._emit(cached.cards, known, 0)
+
+        html = page.body.encode() if isinstance(page.body, str) else page.body
+        self.stats["bytes_downloaded"] += len(html)
+        cards = split_cards(html)
+        if not cards or count_cards(html) != len(cards):
+            # Marcação que o recorte não reconhece (ou página vazia): parse inteiro, sem cache.
+            self.stats["uncached"] += 1
+            run_metrics.inc("page_cache_pages", status="uncached")
+            return self._uncached(await self._parse(html, executor, backend))
+
+        fingerprints = [card_fingerprint(card) for card in cards]
+        fingerprint = page_fingerprint(fingerprints)
+        if cached is not None and cached.fingerprint == fingerprint:
+            self._count("unchanged", 0, cached.parse_seconds)
+            self.store.put_page(cached._replace(etag=page.etag, last_modified=page.last_modified, size=len(html)))
+            return self._emit(fingerprints, known, 0)
+
+        # Cards que já estavam em outra página (ou na versão anterior desta) também não são parseados.
+        known = {**known, **self.store.get_cards([fp for fp in fingerprints if fp not in known])}
+        changed = list(dict.fromkeys(fp for fp in fingerprints if fp not in known))
+        chunks = dict(zip(fingerprints, cards))
+        start = time.perf_counter()
+        parsed = await self._parse(b'<html><body>' + b''.join(chunks[fp] for fp in changed) + b'</body></html>',
+                                   executor, backend) if changed else []
+        elapsed = time.perf_counter() - start
+        if len(parsed) != len(changed):
+            self.stats["uncached"] += 1
+            run_metrics.inc("page_cache_pages", status="uncached")
+            return self._uncached(await self._parse(html, executor, backend))
+
+        new_cards = {fp: _offer_fields(offer) for fp, offer in zip(changed, parsed)}
+        # Custo do parse por card: medido agora ou, sem nada novo, o da versão anterior da página.
+        if changed:
+            per_card = elapsed / len(changed)
+        else:
+            per_card = cached.parse_seconds / len(cached.cards) if cached is not None and cached.cards else 0.0
+        reused = len(fingerprints) - len(changed)
+        self._count("changed", 0, per_card * reused)
+        self.stats["cards_parsed"] += len(changed)
+        run_metrics.inc("page_cache_cards", len(changed), status="parsed")
+        self.store.put_page(CachedPage(url, page.etag, page.last_modified, fingerprint, fingerprints, len(html),
+                                       per_card * len(fingerprints)), new_cards)
+        return self._emit(fingerprints, {**known, **{fp: CachedCard(fields, None) for fp, fields in new_cards.items()}},
+                          len(changed))
+
+    async def _parse(self, html: bytes, executor: Executor, backend: str) -> list[Offer]:
+        start = time.perf_counter()
+        if executor is not None:
+            offers = await extract_offers_in_pool(executor, html, backend)
+        else:
+            offers = offers_from_batch(extract_offer_batch(html, backend))
+        self.stats["parse_seconds"] += time.perf_counter() - start
+        return offers
+
+    def _count(self, status: str, bytes_saved: int, parse_seconds_saved: float):
+        self.stats[status] += 1
+        self.stats["bytes_saved"] += bytes_saved
+        self.stats["parse_seconds_saved"] += parse_seconds_saved
+        run_metrics.inc("page_cache_pages", status=status)
+        run_metrics.inc("page_cache_bytes_saved", bytes_saved)
+        run_metrics.inc("page_cache_parse_seconds_saved", parse_seconds_saved)
+
+    def _emit(self, fingerprints: list, cards: dict, parsed: int) -> PageOffers:
+        reused = len(fingerprints) - parsed
+        self.stats["cards_reused"] += reused
+        run_metrics.inc("page_cache_cards", reused, status="reused")
+        offers = offers_from_batch(cards[fp].offer for fp in fingerprints)
+        for fp, offer in zip(fingerprints, offers):
+            if offer.item_id:
+                self._fingerprints[offer.item_id].add(fp)
+        if self.emit == "all":
+            pending = offers
+        else:
+            oldest = time.time() - self.resend_after_seconds
+            pending = [offer for fp, offer in zip(fingerprints, offers)
+                       if cards[fp].handled_at is None or cards[fp].handled_at < oldest]
+        self.stats["cards_pending"] += len(pending)
+        return PageOffers(offers, pending)
+
+    def _uncached(self, offers: list[Offer]) -> PageOffers:
+        self.stats["cards_pending"] += len(offers)
+        return PageOffers(offers, offers)
+
+    def mark_handled(self, item_ids: list):
+        """
+        Marca os cards destes itens como tratados (descartados pelo filtro ou entregues): com
+        emit="changed", só voltam quando mudarem ou depois de `resend_after_hours`.
+        """
+        fingerprints = {fp for item_id in item_ids for fp in self._fingerprints.get(item_id, ())}
+        self.stats["cards_handled"] += len(fingerprints)
+        self.store.mark_handled(fingerprints)
+
+    def flush(self):
+        self.store.flush()
+
+    def summary(self) -> str:
+        stats = self.stats
+        return (
+            f"páginas={stats['pages']} (304={stats['not_modified']} iguais={stats['unchanged']} "
+            f"alteradas={stats['changed']} sem_cache={stats['uncached']}) "
+            f"cards_reaproveitados={stats['cards_reused']} cards_parseados={stats['cards_parsed']} "
+            f"cards_pendentes={stats['cards_pending']} cards_tratados={stats['cards_handled']} "
+            f"bytes_economizados={stats['bytes_saved']} parse={stats['parse_seconds']:.2f}s "
+            f"parse_economizado={stats['parse_seconds_saved']:.2f}s"
+        )
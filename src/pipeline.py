@@ -0,0 +1,371 @@
+"""
+Pipeline em streaming do bot: fetch -> parse -> filtro -> histórico -> link de afiliado -> ranking -> envio.
+
+Cada estágio é uma corrotina ligada ao próximo por uma asyncio.Queue limitada, então
+os itens filtrados já seguem para a geração de links enquanto as páginas seguintes
+ainda estão baixando, e a memória fica limitada pelo tamanho das filas (mais o heap
+top-k do ranking), não pelo total de produtos raspados.
+"""
+import asyncio
+import re
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable
+
+from src.crawl_frontier import CrawlFrontier
+from src.database_manager import OfferHistory
+from src.metrics import run_metrics
+from src.offer_extractor import Offer, extract_offers, extract_offers_in_pool
+from src.page_cache import IncrementalPageParser, PageOffers
+from src.ranking import INSTALLMENTS_PATTERN, INSTALLMENTS_REPLACEMENT, TopK
+
+_DONE = object()
+_INSTALLMENTS_RE = re.compile(INSTALLMENTS_PATTERN)
+
+
+def offer_to_row(offer: Offer) -> dict:
+    """
+    Linha já com o ETL do scraping aplicado: preços em reais inteiros, %_desconto e Parcelas normalizadas.
+    """
+    row = offer.to_row()
+    preco_de = round(row['Preço De'] or 0)
+    preco_por = round(row['Preço Por'] or 0)
+    row['Preço De'] = preco_de
+    row['Preço Por'] = preco_por
+    row['%_desconto'] = int((preco_de - preco_por) / preco_de * 100) if preco_de > 0 else 0
+    row['Parcelas'] = _INSTALLMENTS_RE.sub(INSTALLMENTS_REPLACEMENT, row['Parcelas'])
+    row['item_id'] = offer.item_id
+    row['preco_por_centavos'] = offer.preco_por
+    return row
+
+
+@dataclass
+class PipelineStats:
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+    ranked_at: float | None = None
+    first_message_at: float | None = None
+    pages: int = 0
+    failed_pages: int = 0
+    cards: int = 0
+    filtered: int = 0
+    skipped_by_history: int = 0
+    linked: int = 0
+    sent: int = 0
+    failed_sends: int = 0
+    sample: list = field(default_factory=list)
+
+    @property
+    def time_to_first_message(self) -> float | None:
+        """Segundos entre o início do pipeline e o primeiro envio bem-sucedido."""
+        if self.first_message_at is None:
+            return None
+        return self.first_message_at - self.started_at
+
+    @property
+    def time_to_ranking(self) -> float | None:
+        """Segundos entre o início do pipeline e a liberação do top-k (fim do crawl e dos links)."""
+        if self.ranked_at is None:
+            return None
+        return self.ranked_at - self.started_at
+
+    @property
+    def elapsed(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def counters(self) -> dict:
+        """Contadores da execução, no formato de src/metrics.py."""
+        return {
+            "pages_fetched": self.pages,
+            "pages_failed": self.failed_pages,
+            "cards_parsed": self.cards,
+            "offers_filtered": self.filtered,
+            "offers_skipped_by_history": self.skipped_by_history,
+            "offers_linked": self.linked,
+            "messages_sent": self.sent,
+            "messages_failed": self.failed_sends,
+        }
+
+    def summary(self) -> str:
+        ttfm = f"{self.time_to_first_message:.2f}s" if self.time_to_first_message is not None else "n/a"
+        ttr = f"{self.time_to_ranking:.2f}s" if self.time_to_ranking is not None else "n/a"
+        elapsed = f"{self.elapsed:.2f}s" if self.elapsed is not None else "n/a"
+        return (
+            f"páginas={self.pages} (falhas={self.failed_pages}) cards={self.cards} filtrados={self.filtered} "
+            f"já_enviados={self.skipped_by_history} "
+            f"links={self.linked} enviados={self.sent} (falhas={self.failed_sends}) "
+            f"tempo_até_ranking={ttr} tempo_até_1a_mensagem={ttfm} tempo_total={elapsed}"
+        )
+
+
+class OfferPipeline:
+    """
+    Liga os estágios do bot com filas limitadas.
+
+    - `pages`: iterável assíncrono de (url, html), ex.: AsyncCrawler.iter_pages(urls)
+      ou CrawlFrontier.iter_pages(crawler).
+    - `frontier`: a CrawlFrontier de `pages`, se houver; recebe as ofertas de cada página
+      parseada (parada antecipada) e só os itens ainda não vistos seguem adiante.
+    - `link_batch`: corrotina que recebe uma lista de URLs e devolve (shorts, longs).
+    - `notify`: corrotina que recebe a linha de um produto e devolve True se enviou; com
+      `notify` e `notify_album` None, nada é enviado e o top-k só fica em `ranked` (coleta).
+    - `notify_album`: alternativa a `notify` que recebe até `album_size` linhas de uma vez
+      e devolve um bool por linha (ex.: envio em álbum no Telegram).
+    - `weights`: critérios do ranking (ver src/ranking.py); padrão: maior %_desconto.
+    - `history`: OfferHistory opcional; só ofertas novas ou com queda de preço seguem
+      para links e envio, e os envios bem-sucedidos são marcados no histórico.
+    - `parse_executor`: ProcessPoolExecutor opcional para o parse; até `parse_workers`
+      páginas ficam em parse ao mesmo tempo enquanto o fetch continua.
+    - `carry_over`: linhas já com links, de coletas anteriores, que entram direto no ranking
+      (a versão recém-raspada do mesmo item_id tem prioridade).
+    - `notify_concurrency`: quantas chamadas de `notify` ficam em andamento ao mesmo tempo
+      (ex.: NotificationDispatcher, que enfileira na ordem da chamada em cada canal).
+    - `page_parser`: IncrementalPageParser opcional; as páginas de `pages` são os FetchResult
+      do `fetch` dele e só os cards novos/alterados são parseados. A `frontier` vê todas as ofertas
+      da página; adiante seguem as pendentes (por padrão, as ainda não tratadas), e as descartadas
+      pelo filtro ou enviadas são marcadas como tratadas no cache.
+    """
+
+    def __init__(self, pages: AsyncIterable, link_batch: Callable[[list], Awaitable[tuple[list, list]]],
+                 notify: Callable[[dict], Awaitable[bool]], top_k: int = 5, queue_size: int = 64,
+                 link_batch_size: int = 20, link_batch_wait: float = 0.5, flag: str = 'MAIS VENDIDO',
+                 parser_backend: str = None, sample_size: int = 10, history: OfferHistory = None,
+                 notify_album: Callable[[list], Awaitable[list]] = None, album_size: int = 10,
+                 weights: dict = None, parse_executor: Executor = None, parse_workers: int = 1,
+                 carry_over: list = None, notify_concurrency: int = 1, frontier: CrawlFrontier = None,
+                 page_parser: IncrementalPageParser = None):
+        self.pages = pages
+        self.link_batch = link_batch
+        self.notify = notify
+        self.top_k = top_k
+        self.queue_size = queue_size
+        self.link_batch_size = link_batch_size
+        self.link_batch_wait = link_batch_wait
+        self.flag = flag
+        self.parser_backend = parser_backend
+        self.sample_size = sample_size
+        self.history = history
+        self.notify_album = notify_album
+        self.album_size = album_size
+        self.weights = weights
+        self.parse_executor = parse_executor
+        self.parse_workers = max(1, parse_workers)
+        self.carry_over = carry_over or []
+        self.notify_concurrency = max(1, notify_concurrency)
+        self.frontier = frontier
+        self.page_parser = page_parser
+        self.ranked = []
+        self.stats = PipelineStats()
+        self._forwarded = set()
+
+    async def _fetch(self, out: asyncio.Queue):
+        # Tempo até a última página chegar (inclui a espera quando a fila do parse está cheia).
+        with run_metrics.stage("fetch"):
+            async for url, html in self.pages:
+                if html is None:
+                    print(f"Error accessing page {url}: No response")
+                    self.stats.failed_pages += 1
+                    continue
+                self.stats.pages += 1
+                await out.put((url, html))
+        await out.put(_DONE)
+
+    async def _parse(self, inq: asyncio.Queue, out: asyncio.Queue):
+        if self.parse_executor is None:
+            while (page := await inq.get()) is not _DONE:
+                url, html = page
+                with run_metrics.stage("parse"):
+                    offers = await self._parse_page(url, html)
+                await self._emit_offers(url, offers, out)
+        else:
+            async with asyncio.TaskGroup() as group:
+                for _ in range(self.parse_workers):
+                    group.create_task(self._parse_in_pool(inq, out))
+        await out.put(_DONE)
+
+    async def _parse_in_pool(self, inq: asyncio.Queue, out: asyncio.Queue):
+        while (page := await inq.get()) is not _DONE:
+            url, html = page
+            with run_metrics.stage("parse"):
+                offers = await self._parse_page(url, html)
+            await self._emit_offers(url, offers, out)
+        # Devolve o sentinela para os outros workers do parse também pararem.
+        await inq.put(_DONE)
+
+    async def _parse_page(self, url: str, html) -> PageOffers:
+        if self.page_parser is not None:
+            return await self.page_parser.offers(url, html, self.parse_executor, self.parser_backend)
+        if self.parse_executor is not None:
+            offers = await extract_offers_in_pool(self.parse_executor, html, self.parser_backend)
+        else:
+            offers = extract_offers(html, self.parser_backend)
+        return PageOffers(offers, offers)
+
+    async def _emit_offers(self, url: str, page: PageOffers, out: asyncio.Queue):
+        self.stats.cards += len(page.offers)
+        pending = page.pending
+        if self.frontier is not None:
+            # A fronteira vê a página inteira (deduplicação e parada antecipada), mesmo sem nada pendente.
+            fresh = self.frontier.observe(url, page.offers)
+            if pending is page.offers:
+                pending = fresh
+            else:
+                pending = [offer for offer in pending if (offer.item_id or offer.link) not in self._forwarded]
+                self._forwarded.update(offer.item_id or offer.link for offer in pending)
+        for offer in pending:
+            await out.put(offer)
+
+    async def _filter(self, inq: asyncio.Queue, out: asyncio.Queue):
+        while (offer := await inq.get()) is not _DONE:
+            if offer.flag == self.flag:
+                self.stats.filtered += 1
+                await out.put(offer_to_row(offer))
+            elif self.page_parser is not None:
+                self.page_parser.mark_handled([offer.item_id])
+        await out.put(_DONE)
+
+    async def _batches(self, inq: asyncio.Queue, size: int = None):
+        """
+        Micro-lotes da fila: um lote sai quando enche (`size`, padrão `link_batch_size`)
+        ou quando nenhum item novo chega dentro de `link_batch_wait` segundos.
+        """
+        size = size or self.link_batch_size
+        batch = []
+        while True:
+            try:
+                item = await (asyncio.wait_for(inq.get(), self.link_batch_wait) if batch else inq.get())
+            except asyncio.TimeoutError:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                batch.append(item)
+                if len(batch) < size:
+                    continue
+            if batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _history(self, inq: asyncio.Queue, out: asyncio.Queue):
+        async for batch in self._batches(inq):
+            with run_metrics.stage("history"):
+                selected = self.history.select_new_or_changed(batch) if self.history is not None else batch
+            self.stats.skipped_by_history += len(batch) - len(selected)
+            for row in selected:
+                await out.put(row)
+        await out.put(_DONE)
+
+    async def _link(self, inq: asyncio.Queue, out: asyncio.Queue):
+        async for batch in self._batches(inq):
+            with run_metrics.stage("link"):
+                shorts, longs = await self.link_batch([row['Link'] for row in batch])
+            for row, short_url, long_url in zip(batch, shorts, longs):
+                # Usa o link original se a geração do link de afiliado falhar
+                row['short_links'] = short_url or row['Link']
+                row['long_links'] = long_url or row['Link']
+                if short_url:
+                    self.stats.linked += 1
+                if len(self.stats.sample) < self.sample_size:
+                    self.stats.sample.append(row)
+                await out.put(row)
+        await out.put(_DONE)
+
+    async def _rank(self, inq: asyncio.Queue, out: asyncio.Queue):
+        # Barreira do pipeline: o top-k só é conhecido depois da última linha, então nada é
+        # enviado antes do fim do crawl e dos links. Até aqui os estágios se sobrepõem (fetch,
+        # parse, histórico e links em streaming); o envio começa assim que o top-k sai, e a
+        # distância entre os dois fica em `stats.time_to_ranking` e `stats.time_to_first_message`.
+        top = TopK(self.top_k, self.weights)
+        # Candidatos de coletas anteriores ainda não raspados de novo neste ciclo
+        carry_over = {row['item_id']: row for row in self.carry_over}
+        while (row := await inq.get()) is not _DONE:
+            with run_metrics.stage("rank"):
+                carry_over.pop(row['item_id'], None)
+                top.push(row)
+        with run_metrics.stage("rank"):
+            for row in carry_over.values():
+                top.push(row)
+        self.ranked = top.rows()
+        self.stats.ranked_at = time.perf_counter()
+        for row in self.ranked:
+            await out.put(row)
+        await out.put(_DONE)
+
+    def _record_send(self, row: dict, ok: bool):
+        if not ok:
+            self.stats.failed_sends += 1
+            return
+        self.stats.sent += 1
+        if self.history is not None:
+            self.history.mark_sent([row['item_id']])
+        if self.page_parser is not None:
+            self.page_parser.mark_handled([row['item_id']])
+        if self.stats.first_message_at is None:
+            self.stats.first_message_at = time.perf_counter()
+
+    async def _notify(self, inq: asyncio.Queue):
+        if self.notify is None and self.notify_album is None:
+            while await inq.get() is not _DONE:
+                pass
+            return
+        if self.notify_album is not None:
+            async for batch in self._batches(inq, self.album_size):
+                with run_metrics.stage("notify"):
+                    results = await self.notify_album(batch)
+                for row, ok in zip(batch, results):
+                    self._record_send(row, ok)
+            return
+        if self.notify_concurrency > 1:
+            await self._notify_concurrent(inq)
+            return
+        while (row := await inq.get()) is not _DONE:
+            with run_metrics.stage("notify"):
+                ok = await self.notify(row)
+            self._record_send(row, ok)
+
+    async def _notify_concurrent(self, inq: asyncio.Queue):
+        slots = asyncio.Semaphore(self.notify_concurrency)
+
+        async def send(row: dict):
+            try:
+                self._record_send(row, await self.notify(row))
+            finally:
+                slots.release()
+
+        row = await inq.get()
+        if row is _DONE:
+            return
+        # Os envios se sobrepõem: o estágio conta o tempo de parede, a partir da primeira linha.
+        with run_metrics.stage("notify"):
+            async with asyncio.TaskGroup() as group:
+                while row is not _DONE:
+                    await slots.acquire()
+                    group.create_task(send(row))
+                    row = await inq.get()
+
+    async def run(self) -> PipelineStats:
+        self.stats = PipelineStats()
+        self._forwarded = set()
+        pages, offers, filtered, fresh, linked, ranked = (asyncio.Queue(self.queue_size) for _ in range(6))
+        with run_metrics.stage("pipeline"):
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._fetch(pages))
+                group.create_task(self._parse(pages, offers))
+                group.create_task(self._filter(offers, filtered))
+                group.create_task(self._history(filtered, fresh))
+                group.create_task(self._link(fresh, linked))
+                group.create_task(self._rank(linked, ranked))
+                group.create_task(self._notify(ranked))
+        self.stats.finished_at = time.perf_counter()
+        for name, value in self.stats.counters().items():
+            run_metrics.inc(name, value)
+        if self.stats.time_to_ranking is not None:
+            run_metrics.observe("pipeline_time_to_ranking_seconds", self.stats.time_to_ranking)
+        if self.stats.time_to_first_message is not None:
+            run_metrics.observe("pipeline_time_to_first_message_seconds", self.stats.time_to_first_message)
+        return self.stats
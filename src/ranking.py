@@ -0,0 +1,84 @@
+"""
+Ranking top-k das ofertas no pipeline em streaming.
+
+Cada linha (dict de src/pipeline.offer_to_row) é pontuada ao chegar e entra num heap
+mínimo de tamanho k (seleção parcial: nada é ordenado nem guardado além do top-k).
+Os critérios de pontuação são funções da linha, combinadas pelos pesos de RANKING_WEIGHTS.
+"""
+import heapq
+
+FLAG_MAIS_VENDIDO = 'MAIS VENDIDO'
+
+INSTALLMENTS_PATTERN = r'R\$\s*(\d+\.?\d*)\s*,\s*(\d+)'
+INSTALLMENTS_REPLACEMENT = r'R$\g<1>,\g<2>'
+
+# Critérios de pontuação (maior = melhor). Unidades: % de desconto e reais.
+SCORES = {
+    'desconto': lambda offers: offers['%_desconto'],
+    'economia': lambda offers: offers['Preço De'] - offers['Preço Por'],
+    'preco': lambda offers: -offers['Preço Por'],
+}
+DEFAULT_WEIGHTS = {'desconto': 1.0}
+
+
+def parse_weights(spec: str | None) -> dict:
+    """
+    Converte "desconto=1,economia=0.1" em {'desconto': 1.0, 'economia': 0.1}.
+    """
+    if not spec:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {}
+    for part in spec.split(','):
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in SCORES:
+            raise ValueError(f"Critério de ranking desconhecido: {name!r} (use {', '.join(SCORES)})")
+        weights[name] = float(value) if value.strip() else 1.0
+    return weights
+
+
+def score(offer: dict, weights: dict = None) -> float:
+    """
+    Pontuação ponderada de uma linha.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    return sum(weight * SCORES[name](offer) for name, weight in weights.items())
+
+
+class TopK:
+    """
+    As k linhas de maior pontuação vistas até agora; em empate vence quem chegou primeiro.
+    Um item_id aparece no máximo uma vez no top-k: enquanto está no heap, as repetições do
+    mesmo produto são ignoradas. Só as linhas do heap são guardadas; a deduplicação do crawl
+    inteiro é da fronteira e do histórico.
+    """
+
+    def __init__(self, k: int, weights: dict = None):
+        self.k = k
+        self.weights = weights
+        self._heap = []
+        # item_id -> entrada no heap (só os itens do top-k atual)
+        self._entries = {}
+        self._seq = 0
+
+    def push(self, row: dict):
+        if self.k <= 0:
+            return
+        entry = (score(row, self.weights), -self._seq, row)
+        self._seq += 1
+        item_id = row.get('item_id')
+        if item_id and item_id in self._entries:
+            return
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            self._entries.pop(evicted[2].get('item_id'), None)
+        else:
+            return
+        if item_id:
+            self._entries[item_id] = entry
+
+    def rows(self) -> list:
+        """As linhas do top-k, da maior pontuação para a menor."""
+        return [row for _, _, row in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
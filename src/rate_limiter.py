@@ -0,0 +1,42 @@
+import asyncio
+import random
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de taxa assíncrono no modelo token bucket.
+    Libera `rate` tokens por segundo, acumulando no máximo `capacity`.
+    Um `rate` menor ou igual a zero desativa o limite.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        # O lock mantém a ordem de chegada: quem espera primeiro é servido primeiro.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    Atraso de retry com backoff exponencial e "full jitter" (0 a base * 2^attempt, limitado a `cap`).
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,164 @@
+"""
+Agendador assíncrono do modo daemon (main.py --daemon).
+
+Os ciclos de envio seguem expressões cron de 5 campos, como o workflow do GitHub Actions.
+Entre uma janela de envio e outra, um ciclo de coleta roda a cada `poll_interval` segundos.
+Tudo acontece no mesmo processo, reaproveitando conexões, token e caches entre os ciclos.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Awaitable, Callable
+
+# (mínimo, máximo) de cada campo: minuto, hora, dia do mês, mês, dia da semana (0 e 7 = domingo).
+_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(spec: str, low: int, high: int) -> set:
+    values = set()
+    for part in spec.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Passo inválido na expressão cron: {spec!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high and start <= end):
+            raise ValueError(f"Valor fora do intervalo {low}-{high} na expressão cron: {spec!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Expressão cron de 5 campos ("45 9,11,14 * * 1-5"), com *, listas, intervalos e passos.
+    Como no cron, se dia do mês e dia da semana forem restritos, basta um dos dois casar.
+    """
+
+    def __init__(self, expression: str, tz: tzinfo = timezone.utc):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron precisa de 5 campos: {expression!r}")
+        self.expression = expression
+        self.tz = tz
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        # datetime.weekday(): segunda = 0; no cron, domingo = 0.
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Próximo instante (minuto cheio) estritamente depois de `moment` que casa com a expressão.
+        """
+        candidate = moment.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=candidate.year + (month == 1), month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Expressão cron nunca dispara: {self.expression!r}")
+
+
+def parse_schedules(spec: str, tz: tzinfo = timezone.utc) -> list[CronSchedule]:
+    """
+    Várias expressões separadas por ';' (ex.: "45 9 * * *; 45 19 * * 1-5").
+    """
+    return [CronSchedule(expression.strip(), tz) for expression in spec.split(";") if expression.strip()]
+
+
+class Scheduler:
+    """
+    Roda `post` nos horários das expressões cron e `poll` a cada `poll_interval` segundos
+    entre eles (0 desliga a coleta). Janelas perdidas enquanto um ciclo rodava são
+    agrupadas num único envio. Erros de um ciclo são registrados e o daemon continua.
+
+    Uso:
+        scheduler = Scheduler(parse_schedules("45 9,19 * * *"), post=runtime.post, poll=runtime.poll)
+        await scheduler.run(stop_event)
+    """
+
+    def __init__(self, schedules: list[CronSchedule], post: Callable[[], Awaitable], poll: Callable[[], Awaitable] = None,
+                 poll_interval: float = 0, min_poll_gap: float = 60.0):
+        if not schedules:
+            raise ValueError("Nenhuma expressão cron para o daemon.")
+        self.schedules = schedules
+        self.post = post
+        self.poll = poll
+        self.poll_interval = poll_interval
+        # Não começa uma coleta a menos de `min_poll_gap` segundos de uma janela de envio.
+        self.min_poll_gap = min_poll_gap
+        self.stats = {"posts": 0, "polls": 0, "errors": 0, "coalesced": 0}
+
+    def next_post(self, now: datetime) -> datetime:
+        return min(schedule.next_after(now) for schedule in self.schedules)
+
+    async def _run_cycle(self, name: str, cycle: Callable[[], Awaitable]):
+        started = time.perf_counter()
+        print(f"\n[daemon] {datetime.now(timezone.utc).isoformat(timespec='seconds')} início do ciclo de {name}")
+        try:
+            await cycle()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[daemon] ERRO no ciclo de {name}: {e.__class__.__name__}: {e}")
+        print(f"[daemon] ciclo de {name} concluído em {time.perf_counter() - started:.1f}s")
+
+    async def run(self, stop: asyncio.Event = None):
+        stop = stop or asyncio.Event()
+        next_post = self.next_post(datetime.now(timezone.utc))
+        next_poll = time.monotonic() if self.poll and self.poll_interval > 0 else None
+        print(f"[daemon] próximo envio: {next_post.isoformat()}")
+        while not stop.is_set():
+            now = datetime.now(timezone.utc)
+            if now >= next_post:
+                await self._run_cycle("envio", self.post)
+                self.stats["posts"] += 1
+                after = datetime.now(timezone.utc)
+                upcoming = self.next_post(now)
+                while upcoming <= after:
+                    self.stats["coalesced"] += 1
+                    upcoming = self.next_post(upcoming)
+                next_post = upcoming
+                if next_poll is not None:
+                    next_poll = time.monotonic() + self.poll_interval
+                print(f"[daemon] próximo envio: {next_post.isoformat()}")
+                continue
+            until_post = (next_post - now).total_seconds()
+            if next_poll is not None and time.monotonic() >= next_poll:
+                if until_post > self.min_poll_gap:
+                    await self._run_cycle("coleta", self.poll)
+                    self.stats["polls"] += 1
+                next_poll = time.monotonic() + self.poll_interval
+                continue
+            wait = until_post
+            if next_poll is not None:
+                wait = min(wait, next_poll - time.monotonic())
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=max(0.0, wait))
+            except asyncio.TimeoutError:
+                pass
@@ -1,38 +1,332 @@
-import requests
-import json
-
-def send_telegram_message(bot_token: str, chat_id: str, message: str, image_url: str = None) -> dict:
-    """
-    Envia uma mensagem para um chat/grupo do Telegram.
-    Pode incluir uma imagem com a mensagem como caption.
-    """
-    if image_url:
-        url = f"https://api.telegram.org/bot{bot_token}/sendPhoto"
-        payload = {
-            "chat_id": chat_id,
-            "photo": image_url,
-            "caption": message,
-            "parse_mode": "Markdown" # Permite negrito, itálico, etc.
-        }
-    else:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-
-    headers = {"Content-Type": "application/json"}
-
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status() # Levanta um erro para status HTTP ruins
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        print(f"ERRO Telegram HTTP: {e}")
-        print(f"Conteúdo da resposta: {e.response.text}")
-        return {"error": str(e), "response_content": e.response.text}
-    except requests.exceptions.RequestException as e:
-        print(f"ERRO Telegram Request: {e}")
-        return {"error": str(e)}
-
+import os
+import asyncio
+import hashlib
+import io
+import json
+import time
+import aiohttp
+
+from src.database_manager import TelegramFileCache
+from src.metrics import run_metrics
+from src.rate_limiter import TokenBucket, backoff_delay
+
+# --- Notificador assíncrono ---
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Limites do Bot API: ~30 mensagens/s no total e ~20 mensagens/min por grupo/canal.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", str(20 / 60)))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_MAX_RETRIES = 3
+TELEGRAM_TIMEOUT_SECONDS = 30
+TELEGRAM_ALBUM_MAX = 10  # sendMediaGroup aceita de 2 a 10 itens
+# Pré-download das imagens sem file_id em cache: baixa, reduz para JPEG compacto e faz upload.
+TELEGRAM_IMAGE_PREFETCH = os.getenv("TELEGRAM_IMAGE_PREFETCH", "").lower() in ("1", "true", "yes")
+TELEGRAM_IMAGE_MAX_SIDE = int(os.getenv("TELEGRAM_IMAGE_MAX_SIDE", "800"))
+TELEGRAM_IMAGE_QUALITY = int(os.getenv("TELEGRAM_IMAGE_QUALITY", "80"))
+
+
+def compact_jpeg(data: bytes, max_side: int = TELEGRAM_IMAGE_MAX_SIDE, quality: int = TELEGRAM_IMAGE_QUALITY) -> bytes:
+    """
+    Reduz a imagem para caber em `max_side` e recodifica como JPEG.
+    Sem Pillow (ou se a imagem não puder ser lida), devolve os bytes originais.
+    """
+    try:
+        from PIL import Image  # Só com TELEGRAM_IMAGE_PREFETCH: o import do main não carrega o Pillow
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail((max_side, max_side))
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+    except OSError:
+        return data
+    compact = output.getvalue()
+    return compact if len(compact) < len(data) else data
+
+
+def _sent_photo(message: dict) -> tuple:
+    """(file_id, file_size) da maior versão da foto numa mensagem enviada."""
+    sizes = (message or {}).get("photo") or []
+    if not sizes:
+        return None, None
+    largest = sizes[-1]
+    return largest.get("file_id"), largest.get("file_size")
+
+
+class _ChatChannel:
+    """Fila de saída, limitador e worker de um chat."""
+
+    def __init__(self, rate: float, burst: float, queue_size: int):
+        self.queue = asyncio.Queue(queue_size)
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.worker = None
+
+
+class TelegramNotifier:
+    """
+    Cliente assíncrono do Bot API com sessão HTTP compartilhada.
+
+    Cada chat tem sua própria fila de saída e token bucket (TELEGRAM_CHAT_RATE), com um
+    limite global (TELEGRAM_GLOBAL_RATE) por cima; chats diferentes são atendidos em
+    paralelo. Até `max_retries` tentativas por chamada: respostas 429 são reenviadas após o
+    `retry_after` indicado pelo Telegram, pausando só o chat afetado, e 5xx e falhas de conexão
+    após o backoff. Timeouts e conexões caídas no meio do envio não são repetidos: a resposta
+    volta com `uncertain`, porque a mensagem pode ter sido publicada.
+
+    Com `file_cache`, fotos já enviadas são reenviadas pelo `file_id` do Telegram (sem novo
+    download da imagem); com `prefetch_images`, imagens sem `file_id` são baixadas,
+    reduzidas (compact_jpeg) e enviadas como upload.
+
+    Uso:
+        async with TelegramNotifier(bot_token) as notifier:
+            response = await notifier.send_message(chat_id, texto, image_url=imagem)
+    """
+
+    def __init__(self, bot_token: str, api_url: str = TELEGRAM_API_URL,
+                 global_rate: float = TELEGRAM_GLOBAL_RATE, chat_rate: float = TELEGRAM_CHAT_RATE,
+                 chat_burst: float = TELEGRAM_CHAT_BURST, max_retries: int = TELEGRAM_MAX_RETRIES,
+                 queue_size: int = 100, file_cache: TelegramFileCache = None,
+                 prefetch_images: bool = TELEGRAM_IMAGE_PREFETCH):
+        self.bot_token = bot_token
+        self.api_url = api_url.rstrip("/")
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self.file_cache = file_cache
+        self.prefetch_images = prefetch_images
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "throttled": 0, "retry_after_seconds": 0,
+                      "file_id_hits": 0, "file_id_misses": 0, "bytes_avoided": 0, "bytes_uploaded": 0,
+                      "prefetch_bytes_saved": 0}
+        self._global_bucket = TokenBucket(global_rate)
+        self._channels = {}
+        self._session = None
+
+    def _open(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=TELEGRAM_TIMEOUT_SECONDS),
+            )
+
+    async def __aenter__(self):
+        self._open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Espera as filas de saída esvaziarem e fecha a sessão.
+        """
+        for channel in self._channels.values():
+            await channel.queue.join()
+            channel.worker.cancel()
+        self._channels = {}
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _channel(self, chat_id: str) -> _ChatChannel:
+        channel = self._channels.get(chat_id)
+        if channel is None:
+            channel = _ChatChannel(self.chat_rate, self.chat_burst, self.queue_size)
+            channel.worker = asyncio.create_task(self._worker(channel))
+            self._channels[chat_id] = channel
+        return channel
+
+    async def _worker(self, channel: _ChatChannel):
+        while True:
+            method, payload, files, messages, future = await channel.queue.get()
+            try:
+                for _ in range(messages):
+                    await channel.bucket.acquire()
+                    await self._global_bucket.acquire()
+                result = await self._call(method, payload, files)
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                channel.queue.task_done()
+
+    @staticmethod
+    def _form(payload: dict, files: dict) -> aiohttp.FormData:
+        # Um FormData novo por tentativa: o aiohttp não reaproveita o corpo multipart.
+        form = aiohttp.FormData()
+        for key, value in payload.items():
+            form.add_field(key, value if isinstance(value, str) else json.dumps(value))
+        for key, (filename, data) in files.items():
+            form.add_field(key, data, filename=filename, content_type="image/jpeg")
+        return form
+
+    async def _call(self, method: str, payload: dict, files: dict = None) -> dict:
+        url = f"{self.api_url}/bot{self.bot_token}/{method}"
+        for attempt in range(self.max_retries):
+            request = {"data": self._form(payload, files)} if files else {"json": payload}
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with self._session.post(url, **request) as response:
+                    status = response.status
+                    body = await response.json(content_type=None)
+            except aiohttp.ClientConnectorError as e:
+                # A conexão nem abriu: a mensagem não saiu, pode tentar de novo.
+                error = str(e) or e.__class__.__name__
+                run_metrics.observe_request(f"telegram_{method}", time.perf_counter() - start, status)
+                print(f"ERRO Telegram Request ({method}): {error}")
+                body = {"ok": False, "error": error}
+                retry_after = backoff_delay(attempt)
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as e:
+                # Timeout, conexão caída ou resposta ilegível: o Telegram pode ter publicado a
+                # mensagem, e repetir duplicaria o post. Volta como incerto, sem retry.
+                error = str(e) or e.__class__.__name__
+                run_metrics.observe_request(f"telegram_{method}", time.perf_counter() - start, status)
+                print(f"ERRO Telegram Request ({method}), resultado incerto: {error}")
+                body = {"ok": False, "error": error, "uncertain": True}
+                break
+            else:
+                run_metrics.observe_request(f"telegram_{method}", time.perf_counter() - start, status)
+                if body.get("ok"):
+                    self.stats["sent"] += 1
+                    return body
+                if body.get("error_code") != 429 and response.status < 500:
+                    print(f"ERRO Telegram HTTP {response.status} ({method}): {body.get('description')}")
+                    break
+                if response.status == 429 or body.get("error_code") == 429:
+                    retry_after = (body.get("parameters") or {}).get("retry_after", 1)
+                    self.stats["throttled"] += 1
+                    self.stats["retry_after_seconds"] += retry_after
+                    run_metrics.inc("throttled", service="telegram")
+                    run_metrics.inc("retry_after_seconds", retry_after, service="telegram")
+                    print(f"AVISO Telegram 429 ({method}): aguardando retry_after={retry_after}s")
+                else:
+                    retry_after = backoff_delay(attempt)
+            if attempt == self.max_retries - 1:
+                break
+            self.stats["retries"] += 1
+            run_metrics.inc("retries", service="telegram")
+            # O worker é por chat: esta espera só segura a fila do chat afetado.
+            await asyncio.sleep(retry_after)
+        self.stats["failed"] += 1
+        return body
+
+    async def _enqueue(self, chat_id: str, method: str, payload: dict, messages: int = 1, files: dict = None) -> dict:
+        self._open()
+        future = asyncio.get_running_loop().create_future()
+        await self._channel(chat_id).queue.put((method, payload, files, messages, future))
+        return await future
+
+    def _cached_file(self, image_url: str) -> str | None:
+        if self.file_cache is None:
+            return None
+        cached = self.file_cache.get(image_url)
+        if cached is None:
+            self.stats["file_id_misses"] += 1
+            return None
+        self.stats["file_id_hits"] += 1
+        self.stats["bytes_avoided"] += cached[1] or 0
+        return cached[0]
+
+    def _remember_file(self, image_keys: list, message: dict):
+        file_id, file_size = _sent_photo(message)
+        if self.file_cache is not None and file_id:
+            self.file_cache.put(image_keys, file_id, file_size)
+
+    async def _prefetch(self, image_url: str) -> tuple:
+        """
+        Baixa e compacta a imagem. Retorna (chave sha256 do conteúdo original, bytes para upload) ou (None, None).
+        """
+        try:
+            async with self._session.get(image_url) as response:
+                if response.status != 200:
+                    return None, None
+                data = await response.read()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            print(f"AVISO: falha ao pré-baixar imagem {image_url}: {e or e.__class__.__name__}")
+            return None, None
+        compact = await asyncio.to_thread(compact_jpeg, data)
+        self.stats["prefetch_bytes_saved"] += len(data) - len(compact)
+        return f"sha256:{hashlib.sha256(data).hexdigest()}", compact
+
+    async def _send_photo(self, chat_id: str, message: str, image_url: str) -> dict:
+        payload = {"chat_id": chat_id, "caption": message, "parse_mode": "Markdown"}
+
+        file_id = self._cached_file(image_url)
+        if file_id:
+            response = await self._enqueue(chat_id, "sendPhoto", {**payload, "photo": file_id})
+            if response.get("ok") or response.get("error_code") != 400:
+                return response
+            # file_id recusado (expirado ou de outro bot): descarta e envia a imagem de novo.
+            self.file_cache.invalidate(image_url)
+
+        keys = [image_url]
+        if self.prefetch_images:
+            self._open()
+            content_key, data = await self._prefetch(image_url)
+            if data is not None:
+                keys.append(content_key)
+                file_id = self._cached_file(content_key)
+                if file_id:
+                    response = await self._enqueue(chat_id, "sendPhoto", {**payload, "photo": file_id})
+                    if response.get("ok"):
+                        self._remember_file(keys, response.get("result"))
+                        return response
+                    if response.get("error_code") != 400:
+                        # Só um file_id recusado justifica o upload; outra falha (ou incerta) volta como está.
+                        return response
+                self.stats["bytes_uploaded"] += len(data)
+                response = await self._enqueue(chat_id, "sendPhoto", payload, files={"photo": ("photo.jpg", data)})
+                if response.get("ok"):
+                    self._remember_file(keys, response.get("result"))
+                return response
+
+        response = await self._enqueue(chat_id, "sendPhoto", {**payload, "photo": image_url})
+        if response.get("ok"):
+            self._remember_file(keys, response.get("result"))
+        return response
+
+    async def send_message(self, chat_id: str, message: str, image_url: str = None) -> dict:
+        """
+        Envia uma mensagem (ou foto com legenda, se houver `image_url`) pela fila do chat.
+        """
+        if image_url:
+            return await self._send_photo(chat_id, message, image_url)
+        payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
+        return await self._enqueue(chat_id, "sendMessage", payload)
+
+    async def send_album(self, chat_id: str, items: list) -> list:
+        """
+        Agrupa ofertas [(image_url, legenda), ...] em álbuns via sendMediaGroup (até 10 por álbum).
+        Retorna a resposta de cada álbum; um item isolado vai como sendPhoto.
+        """
+        responses = []
+        for i in range(0, len(items), TELEGRAM_ALBUM_MAX):
+            chunk = items[i:i + TELEGRAM_ALBUM_MAX]
+            if len(chunk) == 1:
+                image_url, caption = chunk[0]
+                responses.append(await self.send_message(chat_id, caption, image_url=image_url))
+                continue
+            file_ids = [self._cached_file(image_url) for image_url, _ in chunk]
+            media = [{"type": "photo", "media": file_id or image_url, "caption": caption, "parse_mode": "Markdown"}
+                     for file_id, (image_url, caption) in zip(file_ids, chunk)]
+            response = await self._enqueue(chat_id, "sendMediaGroup",
+                                           {"chat_id": chat_id, "media": media}, messages=len(chunk))
+            if not response.get("ok") and response.get("error_code") == 400 and any(file_ids):
+                # Algum file_id foi recusado: descarta os usados e reenvia o álbum pelas URLs.
+                for file_id, (image_url, _) in zip(file_ids, chunk):
+                    if file_id:
+                        self.file_cache.invalidate(image_url)
+                for item, (image_url, _) in zip(media, chunk):
+                    item["media"] = image_url
+                response = await self._enqueue(chat_id, "sendMediaGroup",
+                                               {"chat_id": chat_id, "media": media}, messages=len(chunk))
+            if response.get("ok"):
+                for (image_url, _), message in zip(chunk, response.get("result") or []):
+                    self._remember_file([image_url], message)
+            responses.append(response)
+        return responses
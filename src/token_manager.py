@@ -0,0 +1,212 @@
+"""
+Gerenciador do Access Token OAuth do Mercado Livre.
+
+O access token, sua validade e o refresh token rotacionado ficam no TokenStore
+(banco local), então uma execução com token ainda válido não faz nenhuma chamada
+de rede. Perto do vencimento o token é renovado em segundo plano, e chamadas
+concorrentes compartilham uma única renovação em andamento.
+"""
+import asyncio
+import os
+import time
+from typing import Callable
+
+import aiohttp
+
+from src.database_manager import TokenStore
+from src.metrics import run_metrics
+from src.rate_limiter import backoff_delay
+
+OAUTH_TOKEN_URL = os.getenv("OAUTH_TOKEN_URL", "https://api.mercadolibre.com/oauth/token")
+# Abaixo desta folga (segundos) o token é tratado como vencido e a renovação bloqueia quem pede.
+OAUTH_EXPIRY_MARGIN_SECONDS = int(os.getenv("OAUTH_EXPIRY_MARGIN_SECONDS", "120"))
+# Dentro desta janela antes do vencimento, o token atual é usado e a renovação roda em segundo plano.
+OAUTH_REFRESH_AHEAD_SECONDS = int(os.getenv("OAUTH_REFRESH_AHEAD_SECONDS", "1800"))
+OAUTH_MAX_RETRIES = 3
+OAUTH_TIMEOUT_SECONDS = 15
+OAUTH_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class OAuthTokenManager:
+    """
+    Fornece o Access Token, renovando-o só quando necessário.
+
+    - Token válido no banco: devolvido sem I/O de rede.
+    - Token perto de vencer (`refresh_ahead`): devolvido, e a renovação é disparada em segundo plano.
+    - Token vencido ou ausente: quem pede espera a renovação, que é única para todos os chamadores.
+
+    O refresh token é de uso único: o novo valor é gravado no banco assim que chega.
+    Se o refresh token salvo for rejeitado, tenta uma vez o `refresh_token` inicial
+    (ex.: secret ML_REFRESH_TOKEN atualizado manualmente).
+
+    Uso:
+        async with OAuthTokenManager(client_id, client_secret, refresh_token, store) as tokens:
+            access_token = await tokens.get_token()
+    """
+
+    def __init__(self, client_id: str, client_secret: str, refresh_token: str = None, store: TokenStore = None,
+                 token_url: str = OAUTH_TOKEN_URL, expiry_margin: float = OAUTH_EXPIRY_MARGIN_SECONDS,
+                 refresh_ahead: float = OAUTH_REFRESH_AHEAD_SECONDS, max_retries: int = OAUTH_MAX_RETRIES,
+                 retry_base_delay: float = 1.0):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.initial_refresh_token = refresh_token
+        self.store = store if store is not None else TokenStore()
+        self.token_url = token_url
+        self.expiry_margin = expiry_margin
+        self.refresh_ahead = max(refresh_ahead, expiry_margin)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.stats = {"hits": 0, "refreshes": 0, "background_refreshes": 0, "waits": 0, "failures": 0}
+        self._state = None
+        self._inflight = None
+        self._session = None
+
+    @classmethod
+    def from_env(cls, store: TokenStore | Callable[[], TokenStore] = None, **kwargs) -> "OAuthTokenManager | None":
+        """
+        Cria o gerenciador a partir de ML_CLIENT_ID, ML_CLIENT_SECRET e ML_REFRESH_TOKEN.
+        O ML_REFRESH_TOKEN pode faltar se o banco já tiver um refresh token salvo.
+        `store` pode ser uma função que cria o TokenStore: só é chamada se houver credenciais.
+        """
+        client_id = os.getenv("ML_CLIENT_ID")
+        client_secret = os.getenv("ML_CLIENT_SECRET")
+        if not client_id or not client_secret:
+            print("ERRO FATAL: Credenciais OAuth incompletas. Verifique os GitHub Secrets.")
+            return None
+        if callable(store):
+            store = store()
+        return cls(client_id, client_secret, os.getenv("ML_REFRESH_TOKEN"), store, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        # Espera uma renovação em andamento: o refresh token rotacionado precisa chegar ao banco.
+        if self._inflight is not None and not self._inflight.done():
+            await asyncio.wait([self._inflight])
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _load(self) -> dict:
+        if self._state is None:
+            self._state = self.store.load(self.client_id) or {}
+        return self._state
+
+    def invalidate(self):
+        """
+        Descarta o access token atual (ex.: a API respondeu 401); o próximo get_token renova.
+        """
+        state = self._load()
+        if state.get("access_token"):
+            state["expires_at"] = 0
+
+    def _remaining(self) -> float:
+        state = self._load()
+        if not state.get("access_token") or not state.get("expires_at"):
+            return 0.0
+        return state["expires_at"] - time.time()
+
+    async def get_token(self) -> str | None:
+        """
+        Access Token válido, ou None se a renovação falhar.
+        """
+        remaining = self._remaining()
+        if remaining > self.expiry_margin:
+            self.stats["hits"] += 1
+            if remaining <= self.refresh_ahead and (self._inflight is None or self._inflight.done()):
+                self.stats["background_refreshes"] += 1
+                self._start_refresh()
+            return self._state["access_token"]
+        self.stats["waits"] += 1
+        # shield: cancelar um chamador não cancela a renovação que os outros aguardam.
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh())
+        return self._inflight
+
+    def _open(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=OAUTH_TIMEOUT_SECONDS))
+
+    async def _request(self, refresh_token: str) -> tuple[dict | None, bool]:
+        """
+        Uma troca do refresh token. Retorna (tokens, refresh_token_rejeitado).
+        """
+        payload = {
+            "grant_type": "refresh_token",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": refresh_token,
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded", "Accept": "application/json"}
+        for attempt in range(self.max_retries):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with self._session.post(self.token_url, data=payload, headers=headers) as response:
+                    status = response.status
+                    if response.status == 200:
+                        return await response.json(content_type=None), False
+                    text = await response.text()
+                    print(f"ERRO: Falha ao renovar Access Token HTTP {response.status}: {text[:200]}")
+                    if response.status not in OAUTH_RETRYABLE_STATUS:
+                        return None, response.status in (400, 401)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                print(f"ERRO: Falha ao renovar Access Token Request: {e or e.__class__.__name__}")
+            finally:
+                run_metrics.observe_request("oauth_token", time.perf_counter() - start, status)
+            if attempt < self.max_retries - 1:
+                run_metrics.inc("retries", service="oauth")
+                await asyncio.sleep(backoff_delay(attempt, self.retry_base_delay))
+        return None, False
+
+    async def _refresh(self) -> str | None:
+        self._open()
+        state = self._load()
+        candidates = [token for token in dict.fromkeys([state.get("refresh_token"), self.initial_refresh_token]) if token]
+        if not candidates:
+            print("ERRO FATAL: Nenhum refresh token disponível (ML_REFRESH_TOKEN ou banco local).")
+            self.stats["failures"] += 1
+            return None
+
+        print("DEBUG: Tentando renovar o Access Token com Refresh Token...")
+        for refresh_token in candidates:
+            tokens, rejected = await self._request(refresh_token)
+            if tokens and tokens.get("access_token"):
+                expires_at = time.time() + float(tokens.get("expires_in") or 0)
+                new_state = {
+                    "access_token": tokens["access_token"],
+                    # Se a resposta não trouxer um refresh token novo, o atual continua valendo.
+                    "refresh_token": tokens.get("refresh_token") or refresh_token,
+                    "expires_at": expires_at,
+                }
+                self.store.save(self.client_id, **new_state)
+                self._state = new_state
+                self.stats["refreshes"] += 1
+                run_metrics.inc("oauth_refreshes")
+                print("DEBUG: Access Token renovado com sucesso; refresh token rotacionado salvo no banco local.")
+                return new_state["access_token"]
+            if not rejected:
+                break
+
+        self.stats["failures"] += 1
+        # Um token ainda não vencido continua utilizável se a renovação antecipada falhar.
+        if self._remaining() > 0:
+            return state["access_token"]
+        return None
+
+    def summary(self) -> str:
+        stats = self.stats
+        remaining = max(0, int(self._remaining()))
+        return (
+            f"reaproveitado={stats['hits']} renovações={stats['refreshes']} "
+            f"(em segundo plano={stats['background_refreshes']}, esperas={stats['waits']}, falhas={stats['failures']}) "
+            f"validade_restante={remaining}s"
+        )
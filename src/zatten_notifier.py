@@ -0,0 +1,125 @@
+"""
+Cliente assíncrono da API de mensagens do Zatten (WhatsApp).
+
+A URL base e o caminho do envio são configuráveis (ZATTEN_API_URL / ZATTEN_SEND_PATH),
+assim como o limite de taxa (ZATTEN_RATE mensagens/s, rajada ZATTEN_BURST) que o
+NotificationDispatcher aplica ao canal.
+"""
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from src.metrics import run_metrics
+
+ZATTEN_API_URL = os.getenv("ZATTEN_API_URL", "https://api.zatten.com.br")
+ZATTEN_SEND_PATH = os.getenv("ZATTEN_SEND_PATH", "/v1/messages/send")
+# O WhatsApp bloqueia números que disparam rápido demais: o padrão é conservador.
+ZATTEN_RATE = float(os.getenv("ZATTEN_RATE", "1"))
+ZATTEN_BURST = float(os.getenv("ZATTEN_BURST", "3"))
+ZATTEN_TIMEOUT_SECONDS = 30
+ZATTEN_RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def _retry_after(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ZattenNotifier:
+    """
+    Envia mensagens de WhatsApp pelo Zatten com uma sessão HTTP compartilhada.
+
+    Cada `send_message` é uma única tentativa e devolve um dict com `ok`; em falha, traz
+    também `retryable` e o `retry_after` pedido pela API, ou `uncertain` num timeout ou
+    conexão caída depois do envio (a mensagem pode ter saído). Retries e limite de taxa ficam
+    com o NotificationDispatcher, que não segura os outros canais enquanto espera.
+
+    Uso:
+        async with ZattenNotifier(api_key, attendant_id) as zatten:
+            response = await zatten.send_message("5511999999999", texto, image_url=imagem)
+    """
+
+    def __init__(self, api_key: str, attendant_id: str = None, api_url: str = ZATTEN_API_URL,
+                 send_path: str = ZATTEN_SEND_PATH):
+        self.api_key = api_key
+        self.attendant_id = attendant_id
+        self.url = api_url.rstrip("/") + send_path
+        self.stats = {"sent": 0, "failed": 0, "throttled": 0}
+        self._session = None
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "ZattenNotifier | None":
+        """
+        Cria o cliente a partir de ZATTEN_API_KEY e ZATTEN_ATTENDANT_ID (None sem a chave).
+        """
+        api_key = os.getenv("ZATTEN_API_KEY")
+        if not api_key:
+            return None
+        return cls(api_key, os.getenv("ZATTEN_ATTENDANT_ID") or None, **kwargs)
+
+    def _open(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=ZATTEN_TIMEOUT_SECONDS),
+                headers={"Authorization": f"Bearer {self.api_key}", "Accept": "application/json"},
+            )
+
+    async def __aenter__(self):
+        self._open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def send_message(self, number: str, message: str, image_url: str = None) -> dict:
+        """
+        Envia `message` (com a imagem, se houver) para o número de WhatsApp `number`.
+        """
+        self._open()
+        payload = {"number": number, "body": message}
+        if image_url:
+            payload["mediaUrl"] = image_url
+        if self.attendant_id:
+            payload["attendantId"] = self.attendant_id
+        start = time.perf_counter()
+        status = "error"
+        try:
+            async with self._session.post(self.url, json=payload) as response:
+                status = response.status
+                text = await response.text()
+                retry_after = _retry_after(response.headers.get("Retry-After"))
+        except aiohttp.ClientConnectorError as e:
+            # A conexão nem abriu: a mensagem não saiu.
+            self.stats["failed"] += 1
+            error = str(e) or e.__class__.__name__
+            print(f"ERRO Zatten Request: {error}")
+            return {"ok": False, "error": error, "retryable": True}
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            # A API pode ter aceitado a mensagem: repetir poderia duplicá-la no WhatsApp.
+            self.stats["failed"] += 1
+            error = str(e) or e.__class__.__name__
+            print(f"ERRO Zatten Request, resultado incerto: {error}")
+            return {"ok": False, "error": error, "uncertain": True}
+        finally:
+            run_metrics.observe_request("zatten_send", time.perf_counter() - start, status)
+
+        if 200 <= status < 300:
+            self.stats["sent"] += 1
+            return {"ok": True, "status": status, "result": text}
+        self.stats["failed"] += 1
+        if status == 429:
+            self.stats["throttled"] += 1
+            run_metrics.inc("throttled", service="zatten")
+        print(f"ERRO Zatten HTTP {status}: {text[:200]}")
+        return {"ok": False, "status": status, "error": text[:200],
+                "retryable": status in ZATTEN_RETRYABLE_STATUS, "retry_after": retry_after}
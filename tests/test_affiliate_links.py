@@ -0,0 +1,37 @@
+"""
+Associação dos itens da resposta do createLink às URLs do lote (_match_batch_results).
+"""
+from src.affiliate_link_generator import _match_batch_results
+
+A = "https://www.mercadolivre.com.br/p/MLB123?tracking_id=x"
+B = "https://produto.mercadolivre.com.br/MLB-456-fone"
+
+
+def _links(name: str) -> dict:
+    return {"short_url": f"https://mercadolivre.com/sec/{name}", "long_url": f"https://lnk/{name}"}
+
+
+def test_origin_url_wins_over_position():
+    items = [{"origin_url": B, **_links("b")}, {"origin_url": A, **_links("a")}]
+    results = _match_batch_results([A, B], items)
+    assert results[A][0].endswith("/a") and results[B][0].endswith("/b")
+
+
+def test_normalized_origin_url_and_item_id():
+    items = [{"origin_url": "https://mercadolivre.com.br/p/MLB123", **_links("a")},
+             {"origin_url": "https://produto.mercadolivre.com.br/MLB-456-outro-slug", **_links("b")}]
+    results = _match_batch_results([A, B], items)
+    assert results[A][0].endswith("/a") and results[B][0].endswith("/b")
+
+
+def test_position_only_with_one_item_per_url_and_no_origin():
+    assert set(_match_batch_results([A, B], [_links("a"), _links("b")])) == {A, B}
+    # Um item faltando: não dá para saber de qual URL é, fica sem link.
+    assert _match_batch_results([A, B], [_links("b")]) == {}
+    assert _match_batch_results([A, B], [{"item_id": "MLB456", **_links("b")}]) == {B: (
+        "https://mercadolivre.com/sec/b", "https://lnk/b")}
+
+
+def test_unknown_origin_is_left_unset():
+    items = [{"origin_url": "https://www.mercadolivre.com.br/p/MLB999", **_links("x")}, {"origin_url": B, **_links("b")}]
+    assert set(_match_batch_results([A, B], items)) == {B}
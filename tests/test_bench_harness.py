@@ -0,0 +1,54 @@
+"""
+Harness offline (benchmarks/stubs.py e benchmarks/bench_e2e.py): páginas gravadas servidas em
+ciclo com ETag, rotação do refresh token no stub OAuth e detecção de regressão contra a baseline.
+"""
+import asyncio
+
+import aiohttp
+
+from benchmarks.bench_e2e import _compare
+from benchmarks.stubs import StubServer, oauth_app, offer_pages_app
+
+
+async def _get(url: str, headers: dict = None) -> tuple:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers=headers) as response:
+            return response.status, await response.text(), response.headers.get("ETag")
+
+
+async def _refresh(url: str, refresh_token: str) -> tuple:
+    form = {"grant_type": "refresh_token", "client_id": "c", "client_secret": "s", "refresh_token": refresh_token}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, data=form) as response:
+            return response.status, await response.json()
+
+
+def test_recorded_pages_are_served_in_cycle_with_etag(tmp_path):
+    for n in (1, 2):
+        (tmp_path / f"page-{n:03d}.html").write_text(f"<html>pagina gravada {n}</html>", encoding="utf-8")
+    with StubServer(offer_pages_app(latency=0, recorded_dir=str(tmp_path), etag=True)) as server:
+        status, first, etag = asyncio.run(_get(server.url("/ofertas?page=1")))
+        assert status == 200 and "gravada 1" in first
+        assert "gravada 1" in asyncio.run(_get(server.url("/ofertas?page=3")))[1]
+        assert asyncio.run(_get(server.url("/ofertas?page=1"), {"If-None-Match": etag}))[0] == 304
+    assert server.app["stats"]["not_modified"] == 1
+
+
+def test_oauth_stub_rotates_refresh_tokens():
+    with StubServer(oauth_app(latency=0)) as server:
+        status, tokens = asyncio.run(_refresh(server.url("/oauth/token"), "TG-seed"))
+        assert status == 200 and tokens["refresh_token"] != "TG-seed"
+        assert asyncio.run(_refresh(server.url("/oauth/token"), "TG-seed")) == (
+            400, {"error": "invalid_grant", "message": "Error validating grant."})
+        assert asyncio.run(_refresh(server.url("/oauth/token"), tokens["refresh_token"]))[0] == 200
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"wall_seconds": 10.0, "peak_rss_mb": 50.0,
+                "throughput": {"link": {"seconds": 2.0, "per_second": 100.0},
+                               "rank": {"seconds": 0.001, "per_second": 1e6}}}
+    same = {"wall_seconds": 11.0, "peak_rss_mb": 52.0,
+            "throughput": {"link": {"seconds": 2.2, "per_second": 90.0}, "rank": {"seconds": 0.01, "per_second": 1e4}}}
+    assert _compare("fria", same, baseline, tolerance=0.3, min_stage_seconds=0.05) == []
+    slower = {"wall_seconds": 14.0, "peak_rss_mb": 80.0, "throughput": {"link": {"seconds": 4.0, "per_second": 50.0}}}
+    assert len(_compare("fria", slower, baseline, tolerance=0.3, min_stage_seconds=0.05)) == 3
@@ -0,0 +1,83 @@
+"""
+Fronteira do crawl com um crawler falso: sementes de CRAWL_SEEDS, rodízio ponderado dentro do
+orçamento, deduplicação entre listagens e parada antecipada das listagens que não rendem.
+"""
+import asyncio
+
+import pytest
+
+from src.crawl_frontier import CrawlFrontier, Listing, load_seeds
+from src.offer_extractor import Offer
+
+
+class FakeCrawler:
+    concurrency = 4
+
+    def __init__(self, failing: set = frozenset()):
+        self.failing = failing
+        self.urls = []
+
+    async def fetch(self, url: str):
+        self.urls.append(url)
+        await asyncio.sleep(0)
+        return None if url in self.failing else url
+
+
+def _offer(item: int, flag: str | None = 'MAIS VENDIDO') -> Offer:
+    return Offer(None, f"Produto {item}", 1000, 900, f"https://www.mercadolivre.com.br/p/MLB{item}", flag)
+
+
+def _crawl(frontier: CrawlFrontier, crawler: FakeCrawler, pages: dict) -> list:
+    async def run():
+        fresh = []
+        async for url, html in frontier.iter_pages(crawler):
+            if html is not None:
+                fresh += frontier.observe(url, pages.get(url, []))
+        return fresh
+
+    return asyncio.run(run())
+
+
+def test_load_seeds():
+    assert [(s.name, s.max_pages) for s in load_seeds(None, 7)] == [("ofertas", 7)]
+    listings = load_seeds('[{"name": "celulares", "category": "MLB1055", "max_pages": 3, "weight": 2},'
+                          ' {"url": "https://x/{page}"}]', base_template="https://ml/ofertas?page={page}")
+    assert listings[0].url_template == "https://ml/ofertas?page={page}&category=MLB1055"
+    assert (listings[0].weight, listings[1].name) == (2.0, "listagem-2")
+    with pytest.raises(ValueError):
+        load_seeds('[{"url": "https://x/sem-pagina"}]')
+
+
+def test_weighted_round_robin_within_budget():
+    crawler = FakeCrawler()
+    frontier = CrawlFrontier([Listing("a", "a/{page}", 10, weight=2), Listing("b", "b/{page}", 10)],
+                             budget=6, min_new_per_page=0, max_in_flight=1)
+    pages = {f"{name}/{n}": [_offer(ord(name) * 100 + n)] for name in "ab" for n in range(1, 11)}
+    _crawl(frontier, crawler, pages)
+    assert crawler.urls == ["a/1", "b/1", "a/2", "a/3", "b/2", "a/4"]
+    assert frontier.requested == 6
+
+
+def test_duplicates_across_listings_and_repeated_urls():
+    crawler = FakeCrawler()
+    pages = {"a/1": [_offer(1), _offer(2)], "b/1": [_offer(2), _offer(3)]}
+    frontier = CrawlFrontier([Listing("a", "a/{page}", 1), Listing("b", "b/{page}", 1),
+                              Listing("c", "a/{page}", 1)], min_new_per_page=0)
+    fresh = _crawl(frontier, crawler, pages)
+    assert sorted(offer.item_id for offer in fresh) == ["MLB1", "MLB2", "MLB3"]
+    # A URL repetida na listagem "c" não é baixada de novo nem gasta orçamento.
+    assert sorted(crawler.urls) == ["a/1", "b/1"] and frontier.requested == 2
+    assert sum(listing.duplicates for listing in frontier.listings) == 1
+
+
+def test_low_yield_and_empty_pages_stop_the_listing():
+    crawler = FakeCrawler(failing={"c/1"})
+    pages = {f"a/{n}": [_offer(n, flag=None)] for n in range(1, 11)}
+    pages |= {f"b/{n}": [_offer(100 + n)] for n in range(1, 3)}
+    frontier = CrawlFrontier([Listing("a", "a/{page}", 10), Listing("b", "b/{page}", 10),
+                              Listing("c", "c/{page}", 1)], patience=2, listing_in_flight=1)
+    _crawl(frontier, crawler, pages)
+    a, b, c = frontier.listings
+    assert a.fetched == 2 and a.stopped.startswith("menos de 1")
+    assert b.fetched == 3 and b.stopped == "página vazia"
+    assert c.failed == 1 and not c.stopped
@@ -0,0 +1,55 @@
+"""
+AsyncCrawler contra stubs locais: um host limitado pela taxa não segura as vagas globais
+dos outros hosts, e os retries respeitam os status temporários.
+"""
+import asyncio
+import time
+
+from aiohttp import web
+
+from benchmarks.stubs import StubServer
+from src.mercadolivre_scraper import AsyncCrawler
+
+HOST_RPS = 4
+
+
+def _app(statuses: list = None) -> web.Application:
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+
+    async def page(request):
+        app["stats"]["requests"] += 1
+        status = statuses.pop(0) if statuses else 200
+        return web.Response(status=status, text=f"pagina {request.query.get('page')}")
+
+    app.router.add_get("/ofertas", page)
+    return app
+
+
+def test_rate_limited_host_does_not_hold_global_slots():
+    with StubServer(_app()) as slow, StubServer(_app()) as fast:
+        async def run() -> float:
+            async with AsyncCrawler(concurrency=1, host_max_in_flight=4, host_rps=HOST_RPS) as crawler:
+                slow_pages = [asyncio.create_task(crawler.fetch(slow.url(f"/ofertas?page={n}"))) for n in range(4)]
+                await asyncio.sleep(0.01)
+                start = time.perf_counter()
+                assert await crawler.fetch(fast.url("/ofertas?page=1")) == "pagina 1"
+                elapsed = time.perf_counter() - start
+                await asyncio.gather(*slow_pages)
+                return elapsed
+
+        # Antes, a página do outro host esperava as 3 fichas restantes do host lento (~0,75s).
+        assert asyncio.run(run()) < 1 / HOST_RPS
+
+
+def test_retries_temporary_errors_only():
+    with StubServer(_app([503, 200])) as retried, StubServer(_app([404])) as missing:
+        async def run() -> tuple:
+            async with AsyncCrawler(host_rps=0, retry_base_delay=0.01) as crawler:
+                return (await crawler.fetch(retried.url("/ofertas?page=2")),
+                        await crawler.fetch(missing.url("/ofertas?page=3")), crawler.stats)
+
+        body, missing_body, stats = asyncio.run(run())
+    assert body == "pagina 2" and missing_body is None
+    assert stats["retries"] == 1 and stats["failures"] == 1
+    assert retried.app["stats"]["requests"] == 2 and missing.app["stats"]["requests"] == 1
@@ -0,0 +1,16 @@
+"""
+`import main` não carrega dependências pesadas que só alguns caminhos usam.
+"""
+import os
+import subprocess
+import sys
+
+LAZY = ("PIL", "pandas", "numpy", "playwright", "bs4", "requests", "cryptography")
+
+
+def test_main_import_keeps_optional_dependencies_lazy():
+    code = f"import sys, main; print(sorted({{name.split('.')[0] for name in sys.modules}} & {set(LAZY)!r}))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env={**os.environ, "ML_AFFILIATE_TAG": "teste"})
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,58 @@
+"""
+Cache de links de afiliado (AffiliateLinkCache + generate_affiliate_links_with_cache): chave pelo
+ID canônico do produto, persistência entre execuções, TTL e limite de tamanho.
+"""
+import asyncio
+import time
+
+from src.affiliate_link_generator import generate_affiliate_links_with_cache
+from src.database_manager import AffiliateLinkCache, open_database
+
+A = "https://www.mercadolivre.com.br/fone/p/MLB123?tracking_id=abc&pdp_filters=deal"
+A_OTHER_TRACKING = "https://www.mercadolivre.com.br/fone/p/MLB123?tracking_id=xyz"
+B = "https://produto.mercadolivre.com.br/MLB-456-relogio"
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, urls: list) -> tuple[list, list]:
+        self.calls.append(list(urls))
+        return [f"short:{url}" for url in urls], [f"long:{url}" for url in urls]
+
+
+def _links(cache: AffiliateLinkCache, urls: list, api: FakeApi) -> tuple[list, list]:
+    return asyncio.run(generate_affiliate_links_with_cache(urls, cache, api))
+
+
+def test_only_misses_reach_the_api_and_links_survive_a_restart(tmp_path):
+    path = str(tmp_path / "links.sqlite3")
+    api = FakeApi()
+    shorts, _ = _links(AffiliateLinkCache(open_database(path)), [A, A_OTHER_TRACKING, B], api)
+    # Mesmo produto com rastreamento diferente: uma chamada, o mesmo link nas duas posições.
+    assert api.calls == [[A, B]] and shorts == [f"short:{A}", f"short:{A}", f"short:{B}"]
+
+    restarted = AffiliateLinkCache(open_database(path))
+    assert _links(restarted, [A_OTHER_TRACKING, B], api)[0] == [f"short:{A}", f"short:{B}"]
+    assert len(api.calls) == 1 and restarted.stats["hits"] == 2
+
+
+def test_expired_links_are_generated_again(tmp_path):
+    conn = open_database(str(tmp_path / "links.sqlite3"))
+    cache = AffiliateLinkCache(conn, ttl_hours=1)
+    cache.put_many({"MLB123": ("s", "l")})
+    conn.execute("UPDATE affiliate_links SET created_at = ?", (time.time() - 2 * 3600,))
+    conn.commit()
+    api = FakeApi()
+    _links(AffiliateLinkCache(conn, ttl_hours=1), [A], api)
+    assert api.calls == [[A]]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    conn = open_database(str(tmp_path / "links.sqlite3"))
+    cache = AffiliateLinkCache(conn, max_entries=2)
+    cache.put_many({"MLB1": ("s1", "l1"), "MLB2": ("s2", "l2")})
+    conn.execute("UPDATE affiliate_links SET last_used = last_used - 60 WHERE item_id = 'MLB1'")
+    cache.put_many({"MLB3": ("s3", "l3")})
+    assert set(AffiliateLinkCache(conn).get_many(["MLB1", "MLB2", "MLB3"])) == {"MLB2", "MLB3"}
@@ -0,0 +1,44 @@
+"""
+RunMetrics: tempo por estágio, contadores e histogramas no relatório JSON e no texto Prometheus,
+e o perfil opcional só nos estágios pedidos.
+"""
+import json
+import time
+import tracemalloc
+
+from src.metrics import RunMetrics
+
+
+def test_report_and_prometheus_text(tmp_path):
+    metrics = RunMetrics(profile_stages=set())
+    for _ in range(2):
+        with metrics.stage("parse"):
+            time.sleep(0.01)
+    metrics.inc("cards_parsed", 48)
+    metrics.observe_request("telegram", 0.03, 200)
+    metrics.observe_request("telegram", 2.0, 429)
+
+    report = metrics.write_report(str(tmp_path / "run_report.json"), str(tmp_path / "run_report.prom"))
+    assert json.loads((tmp_path / "run_report.json").read_text()) == json.loads(json.dumps(report))
+    assert report["stages"]["parse"]["calls"] == 2 and report["stages"]["parse"]["seconds"] >= 0.02
+    assert report["counters"]["cards_parsed"] == [{"labels": {}, "value": 48}]
+    [latency] = report["histograms"]["http_request_duration_seconds"]
+    assert latency["labels"] == {"endpoint": "telegram"} and latency["count"] == 2 and latency["p95"] == 2.5
+
+    prom = (tmp_path / "run_report.prom").read_text()
+    assert 'bot_stage_calls_total{stage="parse"} 2' in prom
+    assert 'bot_http_requests_total{endpoint="telegram",status="429"} 1' in prom
+    assert 'bot_http_request_duration_seconds_bucket{endpoint="telegram",le="+Inf"} 2' in prom
+
+
+def test_profiles_only_selected_stages(tmp_path):
+    metrics = RunMetrics(profile_stages={"rank"}, profile_mode={"cprofile", "tracemalloc"},
+                         profile_dir=str(tmp_path))
+    with metrics.stage("rank"):
+        sorted(range(10_000), reverse=True)
+    with metrics.stage("fetch"):
+        pass
+    report = metrics.report()
+    tracemalloc.stop()
+    assert set(report["profiles"]) == {"rank"} and (tmp_path / "rank.prof").exists()
+    assert "peak_traced_bytes" in report["stages"]["rank"] and "peak_traced_bytes" not in report["stages"]["fetch"]
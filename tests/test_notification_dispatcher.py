@@ -0,0 +1,121 @@
+"""
+Retries do NotificationDispatcher: falhas temporárias voltam para a fila, envios de resultado
+incerto (timeout, conexão caída depois do envio) não são repetidos e ficam marcados no DeliveryLog.
+"""
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from aiohttp import web
+
+from benchmarks.stubs import StubServer
+from src.database_manager import DeliveryLog
+from src.notification_dispatcher import NotificationChannel, NotificationDispatcher, SendOutcome, TelegramChannel
+from src.telegram_notifier import TelegramNotifier
+
+ROWS = [{"item_id": "MLB1", "Nome": "Oferta"}]
+
+
+class ScriptedChannel(NotificationChannel):
+    name = "teste"
+
+    def __init__(self, outcomes: list, **kwargs):
+        super().__init__(["destino"], retry_base_delay=0.01, **kwargs)
+        self.outcomes = outcomes
+        self.calls = 0
+
+    def format(self, row: dict) -> str:
+        return row["Nome"]
+
+    async def deliver(self, target: str, messages: list) -> list[SendOutcome]:
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        return [outcome] * len(messages)
+
+
+class SlowChannel(ScriptedChannel):
+    name = "lento"
+    delay = 0.2
+
+    async def deliver(self, target: str, messages: list) -> list[SendOutcome]:
+        await asyncio.sleep(self.delay)
+        return await super().deliver(target, messages)
+
+
+async def _dispatch(channel: NotificationChannel, log: DeliveryLog) -> list:
+    async with NotificationDispatcher([channel], log) as dispatcher:
+        return await dispatcher.dispatch(ROWS)
+
+
+def _logged(log: DeliveryLog) -> list:
+    return log.conn.execute("SELECT ok, attempts, uncertain FROM deliveries").fetchall()
+
+
+def test_retryable_failures_are_retried():
+    log = DeliveryLog(sqlite3.connect(":memory:"))
+    channel = ScriptedChannel([SendOutcome(False, "502", retryable=True), SendOutcome(True)])
+    assert asyncio.run(_dispatch(channel, log)) == [True]
+    assert channel.calls == 2 and _logged(log) == [(1, 2, 0)]
+
+
+def test_uncertain_sends_are_not_retried():
+    log = DeliveryLog(sqlite3.connect(":memory:"))
+    channel = ScriptedChannel([SendOutcome(False, "timeout", uncertain=True), SendOutcome(True)])
+    # Incerto conta como possivelmente entregue: a oferta não volta a ser enviada.
+    assert asyncio.run(_dispatch(channel, log)) == [True]
+    assert channel.calls == 1 and _logged(log) == [(0, 1, 1)]
+
+
+def test_telegram_disconnect_after_send_is_uncertain():
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+
+    async def send(request):
+        app["stats"]["requests"] += 1
+        await request.read()
+        request.transport.close()  # o Telegram recebeu a mensagem e a conexão caiu antes da resposta
+        return web.json_response({"ok": True})
+
+    app.router.add_post("/bot{token}/sendMessage", send)
+
+    async def run(api_url: str) -> dict:
+        async with TelegramNotifier("123:teste", api_url=api_url, global_rate=0, chat_rate=0) as notifier:
+            return await notifier.send_message("-1001", "oi")
+
+    with StubServer(app) as server:
+        response = asyncio.run(run(server.url()))
+    assert response.get("uncertain") and app["stats"]["requests"] == 1
+
+
+def test_telegram_channel_requires_single_attempt_notifier():
+    with pytest.raises(ValueError):
+        TelegramChannel(TelegramNotifier("123:teste"), ["-1001"], str)
+
+
+def test_slow_channel_does_not_hold_dispatch():
+    log = DeliveryLog(sqlite3.connect(":memory:"))
+    rows = [{"item_id": f"MLB{n}", "Nome": f"Oferta {n}"} for n in range(4)]
+
+    async def run() -> tuple:
+        async with NotificationDispatcher([ScriptedChannel([SendOutcome(True)]),
+                                           SlowChannel([SendOutcome(False, "502", retryable=True)], max_attempts=2)],
+                                          log) as dispatcher:
+            start = time.perf_counter()
+            delivered = await asyncio.gather(*(dispatcher.dispatch([row]) for row in rows))
+            return delivered, time.perf_counter() - start
+
+    delivered, elapsed = asyncio.run(run())
+    assert delivered == [[True]] * 4 and elapsed < SlowChannel.delay
+    # O close esperou o canal lento: todos os envios dele, com retries, estão no log.
+    assert log.conn.execute("SELECT channel, COUNT(*), SUM(attempts) FROM deliveries GROUP BY channel "
+                            "ORDER BY channel").fetchall() == [("lento", 4, 8), ("teste", 4, 4)]
+
+
+def test_channel_without_deliver_fails_on_instantiation():
+    class NoDeliver(NotificationChannel):
+        def format(self, row: dict) -> str:
+            return row["Nome"]
+
+    with pytest.raises(TypeError):
+        NoDeliver(["destino"])
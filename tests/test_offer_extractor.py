@@ -0,0 +1,76 @@
+"""
+Paridade do src/offer_extractor.py com o extrator original (benchmarks/legacy_extractor.py),
+campo a campo, em cada backend instalado: nas páginas sintéticas de benchmarks/fixtures.py e
+nas páginas reais gravadas em tests/fixtures/ofertas (e em OFFER_FIXTURES_DIR, se definido).
+"""
+import glob
+import os
+
+import pytest
+
+from benchmarks.fixtures import render_offer_page
+from benchmarks.legacy_extractor import parse_products_page
+from src.offer_extractor import CARD_CLASS, available_backends, count_cards, extract_offers, split_cards
+
+RECORDED_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "ofertas")
+# Páginas baixadas na hora (job de paridade do CI): com OFFER_FIXTURES_DIR definido, tem que haver páginas.
+LIVE_DIR = os.getenv("OFFER_FIXTURES_DIR")
+RECORDED = sorted(glob.glob(os.path.join(RECORDED_DIR, "*.html"))
+                  + (glob.glob(os.path.join(LIVE_DIR, "*.html")) if LIVE_DIR else []))
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _cents(value):
+    return round(value * 100) if value is not None else None
+
+
+def _assert_parity(html: str, backend: str):
+    expected = parse_products_page(html)
+    got = [offer.to_row() for offer in extract_offers(html, backend)]
+    assert len(got) == len(expected)
+    for n, (actual, row) in enumerate(zip(got, expected)):
+        for field, value in row.items():
+            if field in ('Preço De', 'Preço Por'):
+                assert _cents(actual[field]) == _cents(value), f"card {n}, campo {field!r}"
+            else:
+                assert actual[field] == value, f"card {n}, campo {field!r}"
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("page", [1, 2, 7])
+def test_parity_synthetic_pages(backend, page):
+    _assert_parity(render_offer_page(page, seed=7), backend)
+
+
+@pytest.mark.skipif(not LIVE_DIR, reason="OFFER_FIXTURES_DIR não definido")
+def test_live_pages_were_recorded():
+    assert glob.glob(os.path.join(LIVE_DIR, "*.html")), f"nenhuma página gravada em {LIVE_DIR}"
+
+
+@pytest.mark.skipif(not RECORDED, reason="nenhuma página real gravada em tests/fixtures/ofertas")
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("path", RECORDED, ids=os.path.basename)
+def test_parity_recorded_pages(backend, path):
+    _assert_parity(_read(path), backend)
+
+
+@pytest.mark.skipif(not RECORDED, reason="nenhuma página real gravada em tests/fixtures/ofertas")
+@pytest.mark.parametrize("path", RECORDED, ids=os.path.basename)
+def test_recorded_pages_still_match_card_markup(path):
+    # Se a classe dos cards mudar no site, a página gravada nova rende zero cards.
+    html = _read(path)
+    offers = extract_offers(html)
+    assert offers, f"nenhum card com a classe {CARD_CLASS!r}"
+    assert all(offer.nome and offer.link and offer.preco_por is not None for offer in offers)
+    assert len(split_cards(html)) == count_cards(html) == len(offers)
+
+
+def test_split_cards_yield_one_offer_each():
+    html = render_offer_page(3)
+    cards = split_cards(html)
+    assert len(cards) == count_cards(html) == 48
+    assert [extract_offers(card)[0] for card in cards] == extract_offers(html)
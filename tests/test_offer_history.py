@@ -0,0 +1,30 @@
+"""
+OfferHistory: quedas de preço contam em relação ao preço do último envio.
+"""
+import sqlite3
+
+from src.database_manager import OfferHistory
+
+HOUR = 3600.0
+
+
+def _row(price: int) -> dict:
+    return {"item_id": "MLB1", "Nome": "Oferta", "preco_por_centavos": price}
+
+
+def test_gradual_price_decline_counts_against_last_sent_price():
+    history = OfferHistory(sqlite3.connect(":memory:"), resend_after_hours=24, min_price_drop_pct=5)
+    assert history.select_new_or_changed([_row(10000)], now=0)
+    history.mark_sent(["MLB1"], now=0)
+    # Cada passo cai menos de 5% em relação ao visto antes, mas o acumulado desde o envio passa de 5%.
+    selected = [bool(history.select_new_or_changed([_row(price)], now=step * HOUR))
+                for step, price in enumerate((9800, 9600, 9400), start=1)]
+    assert selected == [False, False, True]
+
+
+def test_recently_sent_without_drop_is_skipped():
+    history = OfferHistory(sqlite3.connect(":memory:"), resend_after_hours=24, min_price_drop_pct=5)
+    history.select_new_or_changed([_row(10000)], now=0)
+    history.mark_sent(["MLB1"], now=0)
+    assert history.select_new_or_changed([_row(10000)], now=HOUR) == []
+    assert history.select_new_or_changed([_row(10000)], now=25 * HOUR)
@@ -0,0 +1,91 @@
+"""
+Cache de páginas no pipeline com a CrawlFrontier, contra um stub local de /ofertas com ETag:
+execuções quentes (304) continuam percorrendo a listagem e só os cards tratados deixam de seguir.
+"""
+import asyncio
+import hashlib
+import sqlite3
+from functools import partial
+
+import pytest
+from aiohttp import web
+
+from benchmarks.fixtures import render_offer_page
+from benchmarks.stubs import StubServer
+from src.crawl_frontier import CrawlFrontier, load_seeds
+from src.database_manager import PageCache
+from src.mercadolivre_scraper import AsyncCrawler
+from src.page_cache import IncrementalPageParser
+from src.pipeline import OfferPipeline
+
+PAGES = 12
+CHANGED_PAGE = 10
+
+
+def _pages_app(pages: dict) -> web.Application:
+    app = web.Application()
+    app["stats"] = {"requests": 0, "not_modified": 0}
+
+    async def ofertas(request):
+        app["stats"]["requests"] += 1
+        html = pages[int(request.query["page"])]
+        etag = '"' + hashlib.blake2b(html.encode(), digest_size=8).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            app["stats"]["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    app.router.add_get("/ofertas", ofertas)
+    return app
+
+
+@pytest.fixture
+def site():
+    pages = {page: render_offer_page(page, cards=12) for page in range(1, PAGES + 1)}
+    with StubServer(_pages_app(pages)) as server:
+        yield server, pages
+
+
+async def _run(server: StubServer, parser: IncrementalPageParser, delivered: bool = True) -> list:
+    sent = []
+
+    async def link_batch(urls):
+        return [None] * len(urls), [None] * len(urls)
+
+    async def notify(row):
+        sent.append(row['item_id'])
+        return delivered
+
+    parser.reset()
+    frontier = CrawlFrontier(load_seeds(None, PAGES, server.url("/ofertas?page={page}")), min_new_per_page=0)
+    async with AsyncCrawler(concurrency=8, host_max_in_flight=8, host_rps=0, raw=True) as crawler:
+        pipeline = OfferPipeline(frontier.iter_pages(crawler, fetch=partial(parser.fetch, crawler)), link_batch,
+                                 notify, top_k=1000, link_batch_wait=0.01, frontier=frontier, page_parser=parser)
+        try:
+            await pipeline.run()
+        finally:
+            parser.flush()
+    return sent
+
+
+def test_warm_run_crawls_every_page_and_emits_only_changed_cards(site):
+    server, pages = site
+    parser = IncrementalPageParser(PageCache(sqlite3.connect(":memory:")))
+    first = asyncio.run(_run(server, parser))
+    assert first and server.app["stats"]["requests"] == PAGES
+
+    pages[CHANGED_PAGE] = render_offer_page(CHANGED_PAGE, cards=12, version=1, churn=1.0, flags=["MAIS VENDIDO"])
+    server.app["stats"].update(requests=0, not_modified=0)
+    second = asyncio.run(_run(server, parser))
+    assert server.app["stats"] == {"requests": PAGES, "not_modified": PAGES - 1}
+    first_id = 1000000000 + CHANGED_PAGE * 1000
+    assert sorted(second) == [f"MLB{first_id + n}" for n in range(12)]
+
+
+def test_failed_sends_are_emitted_again(site):
+    server, _ = site
+    parser = IncrementalPageParser(PageCache(sqlite3.connect(":memory:")))
+    failed = asyncio.run(_run(server, parser, delivered=False))
+    retried = asyncio.run(_run(server, parser))
+    assert failed and sorted(retried) == sorted(failed)
+    assert asyncio.run(_run(server, parser)) == []
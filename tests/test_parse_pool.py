@@ -0,0 +1,39 @@
+"""
+Pool de parse (start_parse_pool): todos os workers sobem com o backend já importado e o parse
+no pool devolve as mesmas ofertas que no próprio processo.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.fixtures import render_offer_page
+from src import offer_extractor
+from src.offer_extractor import available_backends, extract_offers, extract_offers_in_pool, start_parse_pool
+
+WORKERS = 3
+
+
+def _loaded_backends() -> set:
+    return set(offer_extractor._loaded_backends)
+
+
+@pytest.fixture
+def pool():
+    pool = start_parse_pool(WORKERS, available_backends()[0])
+    yield pool
+    pool.shutdown()
+
+
+def test_every_worker_is_started_with_the_backend_imported(pool):
+    assert len(pool._processes) == WORKERS
+    loaded = [pool.submit(_loaded_backends).result() for _ in range(WORKERS)]
+    assert all(available_backends()[0] in backends for backends in loaded)
+
+
+def test_pool_parse_matches_in_process(pool):
+    pages = [render_offer_page(page, cards=12).encode() for page in range(1, 5)]
+
+    async def run() -> list:
+        return await asyncio.gather(*(extract_offers_in_pool(pool, html) for html in pages))
+
+    assert asyncio.run(run()) == [extract_offers(html) for html in pages]
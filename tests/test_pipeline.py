@@ -0,0 +1,51 @@
+"""
+OfferPipeline em streaming: os links começam antes do fim do crawl, o top-k sai na ordem do
+ranking assim que a última linha chega, e o envio vem logo depois dessa barreira.
+"""
+import asyncio
+import time
+
+from benchmarks.fixtures import render_offer_page
+from src.pipeline import OfferPipeline
+from src.ranking import score
+
+PAGES = 6
+PAGE_DELAY = 0.05
+
+
+def _run(top_k: int = 5) -> tuple:
+    events = {"link": [], "last_page": None}
+    sent = []
+
+    async def pages():
+        for page in range(1, PAGES + 1):
+            await asyncio.sleep(PAGE_DELAY)
+            yield f"https://example.test/ofertas?page={page}", render_offer_page(page, cards=12, flags=["MAIS VENDIDO"])
+        events["last_page"] = time.perf_counter()
+
+    async def link_batch(urls):
+        events["link"].append(time.perf_counter())
+        return [f"{url}#curto" for url in urls], [f"{url}#longo" for url in urls]
+
+    async def notify(row):
+        sent.append(row)
+        return True
+
+    pipeline = OfferPipeline(pages(), link_batch, notify, top_k=top_k, link_batch_size=12, link_batch_wait=0.01)
+    stats = asyncio.run(pipeline.run())
+    return pipeline, stats, events, sent
+
+
+def test_links_overlap_the_crawl():
+    _, stats, events, _ = _run()
+    assert stats.pages == PAGES and stats.linked == PAGES * 12
+    assert events["link"][0] < events["last_page"]
+
+
+def test_top_k_is_sent_in_rank_order_right_after_the_barrier():
+    pipeline, stats, _, sent = _run(top_k=5)
+    assert sent == pipeline.ranked and len(sent) == 5
+    assert [score(row) for row in sent] == sorted((score(row) for row in sent), reverse=True)
+    assert all(row['short_links'].endswith("#curto") for row in sent)
+    assert stats.sent == 5
+    assert stats.time_to_ranking <= stats.time_to_first_message < stats.time_to_ranking + 0.5
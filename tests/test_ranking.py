@@ -0,0 +1,57 @@
+"""
+TopK de src/ranking.py: ordem, empates, deduplicação por item_id e memória limitada ao top-k;
+estágio de ranking do pipeline com candidatos de coletas anteriores.
+"""
+import asyncio
+
+import pytest
+
+from src.pipeline import _DONE, OfferPipeline
+from src.ranking import TopK, parse_weights, score
+
+
+def _row(item_id: str, desconto: int, preco: int = 100) -> dict:
+    return {'item_id': item_id, '%_desconto': desconto, 'Preço De': preco * 2, 'Preço Por': preco}
+
+
+def test_keeps_highest_scores_in_order_and_first_arrival_on_ties():
+    top = TopK(3)
+    for n, desconto in enumerate([10, 50, 30, 50, 5, 40]):
+        top.push(_row(f"MLB{n}", desconto))
+    assert [row['item_id'] for row in top.rows()] == ["MLB1", "MLB3", "MLB5"]
+
+
+def test_repeated_item_keeps_first_version_once():
+    top = TopK(3)
+    for row in (_row("MLB1", 20), _row("MLB2", 30), _row("MLB1", 60), _row("MLB1", 10), _row("MLB3", 5)):
+        top.push(row)
+    assert [(row['item_id'], row['%_desconto']) for row in top.rows()] == [("MLB2", 30), ("MLB1", 20), ("MLB3", 5)]
+
+
+def test_state_is_bounded_by_k():
+    top = TopK(5)
+    for n in range(10_000):
+        top.push(_row(f"MLB{n}", n % 97))
+    assert len(top._heap) == 5 and len(top._entries) == 5
+    assert len(top.rows()) == len({row['item_id'] for row in top.rows()}) == 5
+
+
+def test_weights():
+    assert parse_weights("desconto=1,economia=0.5") == {'desconto': 1.0, 'economia': 0.5}
+    assert score(_row("MLB1", 50, preco=100), {'desconto': 1, 'economia': 0.5}) == 100
+    with pytest.raises(ValueError):
+        parse_weights("popularidade=1")
+
+
+def test_rescraped_item_wins_over_carry_over():
+    stale, fresh = _row("MLB1", 70), _row("MLB1", 20)
+    pipeline = OfferPipeline(None, None, None, top_k=2, carry_over=[stale, _row("MLB2", 50)])
+
+    async def run() -> list:
+        inq, out = asyncio.Queue(), asyncio.Queue()
+        for row in (fresh, _row("MLB3", 10), _DONE):
+            inq.put_nowait(row)
+        await pipeline._rank(inq, out)
+        return [out.get_nowait() for _ in range(out.qsize())]
+
+    assert asyncio.run(run()) == [_row("MLB2", 50), fresh, _DONE]
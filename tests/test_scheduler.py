@@ -0,0 +1,61 @@
+"""
+Agendador do modo daemon: próximas janelas das expressões cron (fuso, listas, passos e a regra
+dia do mês OU dia da semana) e ciclos de coleta entre os envios, sobrevivendo a erros.
+"""
+import asyncio
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.scheduler import CronSchedule, Scheduler, parse_schedules
+
+BRT = ZoneInfo("America/Sao_Paulo")
+
+
+def test_next_after_in_local_timezone():
+    schedule = CronSchedule("45 9,19 * * *", BRT)
+    # 12:50 UTC = 09:50 BRT: a próxima janela é 19:45 BRT do mesmo dia.
+    assert schedule.next_after(datetime(2026, 3, 10, 12, 50, tzinfo=timezone.utc)) == \
+        datetime(2026, 3, 10, 19, 45, tzinfo=BRT)
+
+
+def test_steps_ranges_and_rollover():
+    assert CronSchedule("*/20 8-9 * * *").next_after(datetime(2026, 1, 1, 9, 41, tzinfo=timezone.utc)) == \
+        datetime(2026, 1, 2, 8, 0, tzinfo=timezone.utc)
+    assert CronSchedule("0 0 1 * *").next_after(datetime(2026, 12, 15, tzinfo=timezone.utc)) == \
+        datetime(2027, 1, 1, tzinfo=timezone.utc)
+
+
+def test_day_of_month_or_weekday():
+    # Dia 13 ou qualquer sexta: depois de quarta, 7/1/2026, vem a sexta 9/1.
+    schedule = CronSchedule("0 12 13 * 5")
+    assert schedule.next_after(datetime(2026, 1, 7, tzinfo=timezone.utc)).day == 9
+    assert CronSchedule("0 12 * * 0").next_after(datetime(2026, 1, 7, tzinfo=timezone.utc)).day == 11
+
+
+def test_invalid_expressions():
+    assert len(parse_schedules("45 9 * * *; 45 19 * * 1-5")) == 2
+    for expression in ("45 9 * *", "61 9 * * *", "0 0 30 2 *"):
+        with pytest.raises(ValueError):
+            CronSchedule(expression).next_after(datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+
+def test_polls_between_posts_and_survives_errors():
+    calls = []
+
+    async def poll():
+        calls.append("coleta")
+        if len(calls) == 2:
+            raise RuntimeError("falha de rede")
+        if len(calls) == 4:
+            stop.set()
+
+    async def post():
+        calls.append("envio")
+
+    stop = asyncio.Event()
+    scheduler = Scheduler(parse_schedules("0 0 1 1 *"), post=post, poll=poll, poll_interval=0.01, min_poll_gap=0)
+    asyncio.run(asyncio.wait_for(scheduler.run(stop), 5))
+    assert calls == ["coleta"] * 4
+    assert scheduler.stats == {"posts": 0, "polls": 4, "errors": 1, "coalesced": 0}
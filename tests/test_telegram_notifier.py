@@ -0,0 +1,55 @@
+"""
+TelegramNotifier contra o stub do Bot API (benchmarks/stubs.py): 429 com retry_after, limite
+por chat sem atrasar os outros chats e reaproveitamento do file_id das fotos já enviadas.
+"""
+import asyncio
+import sqlite3
+import time
+
+from benchmarks.stubs import StubServer, telegram_app
+from src.database_manager import TelegramFileCache
+from src.telegram_notifier import TelegramNotifier
+
+IMAGE = "https://http2.mlstatic.com/D_123-O.webp"
+
+
+def test_429_is_retried_after_retry_after():
+    with StubServer(telegram_app(latency=0, chat_limit=2, chat_window=1.0)) as server:
+        async def run() -> list:
+            async with TelegramNotifier("123:teste", api_url=server.url(), global_rate=0, chat_rate=0) as notifier:
+                return await asyncio.gather(*(notifier.send_message("-1001", f"oferta {n}") for n in range(3)))
+
+        start = time.perf_counter()
+        responses = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    assert all(response.get("ok") for response in responses)
+    assert server.app["stats"]["throttled"] == 1 and elapsed >= 1
+
+
+def test_rate_limited_chat_does_not_delay_other_chats():
+    with StubServer(telegram_app(latency=0)) as server:
+        async def run() -> tuple:
+            async with TelegramNotifier("123:teste", api_url=server.url(), global_rate=0, chat_rate=4,
+                                        chat_burst=1) as notifier:
+                busy = [asyncio.create_task(notifier.send_message("-1001", f"oferta {n}")) for n in range(3)]
+                start = time.perf_counter()
+                await notifier.send_message("-1002", "outra")
+                other = time.perf_counter() - start
+                await asyncio.gather(*busy)
+                return other, time.perf_counter() - start
+
+        other, busy = asyncio.run(run())
+    assert other < 0.2 <= busy
+
+
+def test_photo_is_resent_by_file_id_across_runs():
+    conn = sqlite3.connect(":memory:")
+    with StubServer(telegram_app(latency=0)) as server:
+        async def run() -> dict:
+            async with TelegramNotifier("123:teste", api_url=server.url(), global_rate=0, chat_rate=0,
+                                        file_cache=TelegramFileCache(conn)) as notifier:
+                return await notifier.send_message("-1001", "oferta", image_url=IMAGE)
+
+        assert asyncio.run(run()).get("ok") and asyncio.run(run()).get("ok")
+    stats = server.app["stats"]
+    assert stats["url_photos"] == 1 and stats["file_id_photos"] == 1
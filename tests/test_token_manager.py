@@ -0,0 +1,115 @@
+"""
+OAuthTokenManager contra o stub local do /oauth/token (benchmarks/stubs.py): renovação única
+sob concorrência, reuso do token salvo, renovação antecipada, 401 e rotação do refresh token.
+"""
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stubs import StubServer, oauth_app
+from src.database_manager import TokenStore, open_database
+from src.token_manager import OAuthTokenManager
+
+LATENCY = 0.05
+
+
+@pytest.fixture
+def oauth():
+    with StubServer(oauth_app(latency=LATENCY)) as server:
+        yield server
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "tokens.sqlite3")
+
+
+def _manager(oauth, db_path, **kwargs) -> OAuthTokenManager:
+    return OAuthTokenManager("client", "secret", "TG-seed", TokenStore(open_database(db_path), allow_plaintext=True),
+                             token_url=oauth.url("/oauth/token"), retry_base_delay=0.01, **kwargs)
+
+
+def _set_expiry(db_path: str, expires_at: float):
+    conn = open_database(db_path)
+    conn.execute("UPDATE oauth_tokens SET expires_at = ?", (expires_at,))
+    conn.commit()
+    conn.close()
+
+
+async def _tokens(manager: OAuthTokenManager, workers: int = 1) -> list:
+    async with manager as tokens:
+        return await asyncio.gather(*(tokens.get_token() for _ in range(workers)))
+
+
+def test_concurrent_callers_share_one_refresh(oauth, db_path):
+    tokens = asyncio.run(_tokens(_manager(oauth, db_path), workers=200))
+    assert oauth.app["stats"]["requests"] == 1
+    assert len(set(tokens)) == 1 and tokens[0]
+
+
+def test_next_run_reuses_stored_token_without_network(oauth, db_path):
+    [first] = asyncio.run(_tokens(_manager(oauth, db_path)))
+    [second] = asyncio.run(_tokens(_manager(oauth, db_path)))
+    assert second == first
+    assert oauth.app["stats"]["requests"] == 1
+
+
+def test_refresh_ahead_returns_current_token_and_renews_in_background(oauth, db_path):
+    [first] = asyncio.run(_tokens(_manager(oauth, db_path)))
+    _set_expiry(db_path, time.time() + 600)
+
+    async def scenario():
+        async with _manager(oauth, db_path, refresh_ahead=1800) as tokens:
+            start = time.perf_counter()
+            token = await tokens.get_token()
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(LATENCY * 3)
+            return token, elapsed, await tokens.get_token()
+
+    token, elapsed, renewed = asyncio.run(scenario())
+    assert token == first and elapsed < LATENCY
+    assert renewed != token
+    assert oauth.app["stats"]["requests"] == 2
+
+
+def test_invalidate_after_401_renews_once_with_rotated_refresh_token(oauth, db_path):
+    async def scenario():
+        async with _manager(oauth, db_path) as tokens:
+            old = await tokens.get_token()
+            tokens.invalidate()
+            return old, await asyncio.gather(*(tokens.get_token() for _ in range(50)))
+
+    old, new = asyncio.run(scenario())
+    assert len(set(new)) == 1 and new[0] != old
+    assert oauth.app["stats"]["requests"] == 2
+    assert oauth.app["stats"]["invalid_grant"] == 0
+
+
+def test_stored_refresh_token_wins_over_stale_secret(oauth, db_path):
+    asyncio.run(_tokens(_manager(oauth, db_path)))
+    _set_expiry(db_path, 0)
+    # O secret "TG-seed" já foi consumido pelo stub; só o refresh token rotacionado do banco vale.
+    [token] = asyncio.run(_tokens(_manager(oauth, db_path)))
+    assert token is not None
+    assert oauth.app["stats"]["requests"] == 2
+    assert oauth.app["stats"]["invalid_grant"] == 0
+
+
+def test_store_keeps_tokens_in_memory_without_key(oauth, db_path):
+    conn = open_database(db_path)
+    store = TokenStore(conn, key=None, allow_plaintext=False)
+    manager = OAuthTokenManager("client", "secret", "TG-seed", store,
+                                token_url=oauth.url("/oauth/token"), retry_base_delay=0.01)
+    [token] = asyncio.run(_tokens(manager))
+    assert token and not store.persistent and store.load("client")["access_token"] == token
+    # Nada vai para o banco em texto puro
+    assert conn.execute("SELECT COUNT(*) FROM oauth_tokens").fetchone() == (0,)
+
+
+def test_from_env_builds_store_only_with_credentials(monkeypatch):
+    built = []
+    monkeypatch.delenv("ML_CLIENT_ID", raising=False)
+    monkeypatch.delenv("ML_CLIENT_SECRET", raising=False)
+    assert OAuthTokenManager.from_env(lambda: built.append(1)) is None
+    assert built == []